@@ -0,0 +1,601 @@
+"""
+Re-indexación incremental a nivel de chunk.
+
+Cada documento guarda en MySQL (tabla vector_chunks) la lista ordenada de
+sus chunks: hash del contenido, punto de Qdrant y texto del chunk (el payload
+del punto solo lleva los campos de filtro, ver vector_store.PAYLOAD_FIELDS). El ID de cada punto es
+determinista (vector_store.point_id), así que al re-indexar:
+- Chunks cuyo punto está en Qdrant lo conservan (no se vectorizan de nuevo)
+- Chunks nuevos, o cuyo punto falta en Qdrant, se vectorizan e insertan
+- Chunks que ya no existen se eliminan de Qdrant
+- Chunks que una pasada interrumpida alcanzó a escribir no se repiten
+
+Qdrant decide qué existe; vector_chunks solo registra la lista del documento.
+
+Con límites de chunk definidos por contenido (text_chunking), editar un
+custom text o re-scrapear una URL solo cambia unos pocos chunks.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from qdrant_client.models import (
+    DeletePayload, DeletePayloadOperation, FieldCondition, Filter, FilterSelector, HasIdCondition, MatchValue,
+    SetPayload, SetPayloadOperation
+)
+
+from .db_utils import EMBEDDING_BATCH_SIZE, batch_get_embeddings
+from .embedding_cache import chunk_hash
+from .embedding_pool import EMBEDDING_POOL_MIN_TEXTS, EMBEDDING_POOL_WORKERS
+from .near_duplicates import get_near_duplicate_index
+from .semantic_tags import SEMANTIC_TAGS, get_semantic_tagger
+from .tag_inference import DocumentTags, TAG_FIELDS
+from .text_chunking import iter_chunk_windows, CHUNK_WINDOW_SIZE
+from .vector_store import PointWriter, compact_payload, ensure_tenant_route, point_id, tenant_route
+
+_table_ready = False
+
+# Operaciones de payload por request de batch_update_points (puntos reutilizados)
+_PAYLOAD_UPDATE_BATCH = 256
+
+# Columnas agregadas a vector_chunks después de su primera versión
+_ADDED_COLUMNS = {
+    "chunk_text": "ADD COLUMN chunk_text MEDIUMTEXT NULL AFTER qdrant_id, ADD INDEX idx_vector_chunks_point (qdrant_id)",
+    "simhash": "ADD COLUMN simhash BIGINT NULL AFTER chunk_text",
+}
+
+
+def chunk_window_size() -> int:
+    """
+    Chunks por ventana al indexar: CHUNK_WINDOW_SIZE, ampliada con el pool de
+    embeddings para que cada worker reciba al menos dos lotes por ventana
+    (y la ventana alcance EMBEDDING_POOL_MIN_TEXTS, el mínimo para usar el pool).
+    """
+    if EMBEDDING_POOL_WORKERS <= 0:
+        return CHUNK_WINDOW_SIZE
+    return max(CHUNK_WINDOW_SIZE, EMBEDDING_POOL_WORKERS * EMBEDDING_BATCH_SIZE * 2, EMBEDDING_POOL_MIN_TEXTS)
+
+
+def ensure_chunk_table(conn) -> None:
+    """Crea la tabla vector_chunks si no existe (una vez por proceso)."""
+    global _table_ready
+
+    if _table_ready:
+        return
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS vector_chunks (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                bot_id INT NOT NULL,
+                source VARCHAR(20) NOT NULL,
+                doc_id INT NOT NULL,
+                chunk_number INT NOT NULL,
+                chunk_hash CHAR(64) NOT NULL,
+                qdrant_id VARCHAR(64) NOT NULL,
+                chunk_text MEDIUMTEXT NULL,
+                simhash BIGINT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                INDEX idx_vector_chunks_doc (source, doc_id),
+                INDEX idx_vector_chunks_bot (bot_id),
+                INDEX idx_vector_chunks_point (qdrant_id)
+            )
+        """)
+        # Tablas creadas antes de agregar cada columna
+        for column, alter in _ADDED_COLUMNS.items():
+            cursor.execute(f"SHOW COLUMNS FROM vector_chunks LIKE '{column}'")
+            if not cursor.fetchall():
+                cursor.execute(f"ALTER TABLE vector_chunks {alter}")
+        conn.commit()
+        _table_ready = True
+    finally:
+        cursor.close()
+
+
+def load_document_chunks(conn, source: str, doc_id: int) -> List[Dict]:
+    """Chunks indexados de un documento, en orden."""
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("""
+            SELECT chunk_number, chunk_hash, qdrant_id
+            FROM vector_chunks
+            WHERE source = %s AND doc_id = %s
+            ORDER BY chunk_number
+        """, (source, doc_id))
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def save_document_chunks(
+    conn,
+    bot_id: int,
+    source: str,
+    doc_id: int,
+    rows: List[Tuple[int, str, str, str, Optional[int]]]
+) -> None:
+    """
+    Reemplaza la lista de chunks del documento:
+    rows = (chunk_number, chunk_hash, qdrant_id, chunk_text, simhash).
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "DELETE FROM vector_chunks WHERE source = %s AND doc_id = %s",
+            (source, doc_id)
+        )
+        if rows:
+            cursor.executemany("""
+                INSERT INTO vector_chunks
+                    (bot_id, source, doc_id, chunk_number, chunk_hash, qdrant_id, chunk_text, simhash)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            """, [(bot_id, source, doc_id, *row) for row in rows])
+    finally:
+        cursor.close()
+
+
+def _forget_near_duplicates(bot_ids: Optional[List[int]] = None) -> None:
+    """Descarta el índice de casi-duplicados en memoria (sus huellas ya no están en MySQL)."""
+    near_dups = get_near_duplicate_index()
+    if near_dups is not None:
+        near_dups.forget_bots(bot_ids)
+
+
+def delete_document_chunks(conn, source: str, doc_id: int) -> None:
+    """Olvida los chunks (y huellas) de un documento: sus puntos se borraron."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "SELECT DISTINCT bot_id FROM vector_chunks WHERE source = %s AND doc_id = %s",
+            (source, doc_id)
+        )
+        bot_ids = [bot_id for (bot_id,) in cursor.fetchall()]
+        cursor.execute(
+            "DELETE FROM vector_chunks WHERE source = %s AND doc_id = %s",
+            (source, doc_id)
+        )
+    finally:
+        cursor.close()
+    _forget_near_duplicates(bot_ids)
+
+
+def delete_point_chunks(conn, qdrant_ids: List[str]) -> None:
+    """Olvida los chunks (y huellas) de puntos eliminados de Qdrant."""
+    if not qdrant_ids:
+        return
+    placeholders = ", ".join(["%s"] * len(qdrant_ids))
+    ids = [str(qdrant_id) for qdrant_id in qdrant_ids]
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"SELECT DISTINCT bot_id FROM vector_chunks WHERE qdrant_id IN ({placeholders})", ids)
+        bot_ids = [bot_id for (bot_id,) in cursor.fetchall()]
+        cursor.execute(f"DELETE FROM vector_chunks WHERE qdrant_id IN ({placeholders})", ids)
+    finally:
+        cursor.close()
+    _forget_near_duplicates(bot_ids)
+
+
+def delete_collection_chunks(conn, collection_name: str) -> List[int]:
+    """
+    Olvida los chunks (y huellas) de todos los bots cuya ruta apunta a la colección
+    (después de vaciarla o recrearla). Retorna los bots afectados.
+    """
+    ensure_chunk_table(conn)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT DISTINCT bot_id FROM vector_chunks")
+        bot_ids = [
+            bot_id for (bot_id,) in cursor.fetchall()
+            if tenant_route(bot_id).collection_name == collection_name
+        ]
+        if bot_ids:
+            cursor.execute(
+                f"DELETE FROM vector_chunks WHERE bot_id IN ({', '.join(['%s'] * len(bot_ids))})",
+                bot_ids
+            )
+    finally:
+        cursor.close()
+    _forget_near_duplicates(bot_ids)
+    return bot_ids
+
+
+# Fuente de vector_chunks de cada tabla de contenido
+SOURCE_TABLES = {
+    "uploaded_documents": "document",
+    "training_urls": "url",
+    "training_custom_texts": "custom_text",
+}
+
+
+# Texto completo de cada fuente en MySQL (y el nombre de archivo, que usa el etiquetado)
+SOURCE_TEXT_QUERIES = {
+    "url": "SELECT extracted_text AS text, NULL AS file_name FROM training_urls WHERE id = %s",
+    "custom_text": "SELECT content AS text, NULL AS file_name FROM training_custom_texts WHERE id = %s",
+    "document": "SELECT extracted_text AS text, file_name FROM uploaded_documents WHERE id = %s",
+}
+
+
+def load_document_source(cursor, source: str, doc_id) -> Optional[Dict]:
+    """Texto y file_name del documento original (None si no está). cursor: dictionary=True."""
+    query = SOURCE_TEXT_QUERIES.get(source)
+    if query is None or doc_id is None:
+        return None
+    cursor.execute(query, (doc_id,))
+    row = cursor.fetchone()
+    return row if row and row["text"] else None
+
+
+def load_document_text(cursor, bot_id, source: str, doc_id) -> Optional[Dict]:
+    """
+    Texto completo y file_name del documento, para etiquetarlo. cursor: dictionary=True.
+
+    extracted_text de URLs y documentos se guarda recortado a 10000
+    caracteres: el texto se arma con los chunks del documento en
+    vector_chunks, en orden (cada chunk queda como subcadena, que es lo que
+    necesita DocumentTags para ubicarlo). custom_text guarda el contenido
+    completo. Sin chunks guardados se usa el texto de la fuente.
+
+    Returns:
+        dict con "text", "file_name" y "from_chunks" (None si no hay texto)
+    """
+    source_row = load_document_source(cursor, source, doc_id)
+    if source != "custom_text" and doc_id is not None:
+        cursor.execute(
+            "SELECT chunk_text FROM vector_chunks "
+            "WHERE bot_id = %s AND source = %s AND doc_id = %s AND chunk_text IS NOT NULL "
+            "ORDER BY chunk_number",
+            (bot_id, source, doc_id)
+        )
+        chunks = [row["chunk_text"] for row in cursor.fetchall()]
+        if chunks:
+            file_name = source_row["file_name"] if source_row else None
+            return {"text": " ".join(chunks), "file_name": file_name, "from_chunks": True}
+    return {**source_row, "from_chunks": False} if source_row else None
+
+
+def fetch_chunk_texts(conn, qdrant_ids: List[str]) -> Dict[str, Dict]:
+    """
+    Texto de los chunks y metadata de su documento, en una sola consulta.
+
+    Returns:
+        dict qdrant_id -> {"original_text", "file_name", "url"}
+    """
+    if not qdrant_ids:
+        return {}
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(f"""
+            SELECT vc.qdrant_id, vc.chunk_text, d.file_name, u.url
+            FROM vector_chunks vc
+            LEFT JOIN uploaded_documents d ON vc.source = 'document' AND d.id = vc.doc_id
+            LEFT JOIN training_urls u ON vc.source = 'url' AND u.id = vc.doc_id
+            WHERE vc.qdrant_id IN ({", ".join(["%s"] * len(qdrant_ids))})
+        """, list(qdrant_ids))
+        return {
+            row["qdrant_id"]: {
+                "original_text": row["chunk_text"],
+                "file_name": row["file_name"],
+                "url": row["url"],
+            }
+            for row in cursor.fetchall()
+        }
+    finally:
+        cursor.close()
+
+
+def hydrate_payloads(points) -> List[Dict]:
+    """
+    Payloads de los resultados (top-k) con el texto del chunk desde MySQL.
+
+    Los puntos con el esquema anterior ya traen original_text en el payload;
+    si MySQL no responde se retornan los payloads tal cual.
+    """
+    payloads = [dict(point.payload or {}) for point in points]
+    missing = [str(point.id) for point, payload in zip(points, payloads) if "original_text" not in payload]
+    if not missing:
+        return payloads
+
+    try:
+        from .db_utils import get_pooled_connection
+
+        conn = get_pooled_connection()
+        try:
+            texts = fetch_chunk_texts(conn, missing)
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"⚠️ No se pudo traer el texto de los chunks: {e}")
+        return payloads
+
+    for point, payload in zip(points, payloads):
+        extra = texts.get(str(point.id))
+        if extra:
+            payload.update({key: value for key, value in extra.items() if value is not None})
+    return payloads
+
+
+def load_near_duplicates(conn, bot_id: int):
+    """Índice de casi-duplicados con las huellas actuales del bot (None si está deshabilitado)."""
+    near_dups = get_near_duplicate_index()
+    if near_dups is None:
+        return None
+    try:
+        ensure_chunk_table(conn)
+        near_dups.load_bot(conn, bot_id)
+    except Exception as e:
+        print(f"⚠️ No se pudieron cargar las huellas del bot {bot_id}, sin filtro de casi-duplicados: {e}")
+        return None
+    return near_dups
+
+
+def chunk_tag_fields(doc_tags: DocumentTags, chunk: str, semantic: Optional[Dict] = None) -> Dict:
+    """Campos de etiquetas propios del chunk (chunk_tags y, si aplica, semantic_tags)."""
+    if semantic is not None and SEMANTIC_TAGS == "only":
+        return {"chunk_tags": semantic}
+    fields = {"chunk_tags": doc_tags.chunk_tags(chunk)}
+    if semantic is not None:
+        fields["semantic_tags"] = semantic
+    return fields
+
+
+def stale_tag_fields(doc_tags: DocumentTags, fields: Dict) -> List[str]:
+    """
+    Campos de etiquetas a borrar del punto: los del documento que ya no aplican
+    y semantic_tags si chunk_tag_fields no lo trae (SEMANTIC_TAGS=off u only).
+    """
+    stale = [field for field in TAG_FIELDS if field not in doc_tags.tags]
+    if "semantic_tags" not in fields:
+        stale.append("semantic_tags")
+    return stale
+
+
+def index_content_chunks(
+    client,
+    conn,
+    content: str,
+    base_payload: Dict,
+    near_dups=None
+) -> Dict:
+    """
+    Chunking, vectorización e indexación incremental de un documento.
+
+    Args:
+        client: Cliente Qdrant
+        conn: Conexión MySQL (la lista de chunks se confirma aquí mismo)
+        content: Texto completo del documento
+        base_payload: Payload común a todos los chunks; debe incluir
+                      bot_id, source, doc_id y content_hash
+        near_dups: Índice de casi-duplicados del proceso (opcional)
+
+    Returns:
+        dict: {
+            "point_ids": [...],     # puntos del documento, en orden
+            "total_chunks": int,
+            "embedded": int,        # chunks vectorizados en esta pasada
+            "reused": int,          # chunks que conservaron su punto
+            "resumed": int,         # de ellos, escritos por una pasada interrumpida
+            "deleted": int,         # puntos de chunks que ya no existen
+            "skipped": int          # chunks casi-duplicados omitidos
+        }
+    """
+    bot_id = base_payload["bot_id"]
+    source = base_payload["source"]
+    doc_id = base_payload["doc_id"]
+
+    # Colección (y shard key) del bot según QDRANT_TENANCY
+    route = tenant_route(bot_id)
+    ensure_tenant_route(client, route)
+
+    ensure_chunk_table(conn)
+    previous = load_document_chunks(conn, source, doc_id)
+    previous_numbers = {row["qdrant_id"]: row["chunk_number"] for row in previous}
+
+    # Etiquetas: una pasada sobre el documento completo; cada chunk recibe las
+    # del documento y, en chunk_tags, las de las coincidencias dentro de él
+    doc_tags = DocumentTags(base_payload, content)
+    semantic_tagger = get_semantic_tagger()
+
+    point_ids: List[str] = []
+    new_ids: List[str] = []
+    rows: List[Tuple[int, str, str, str, Optional[int]]] = []
+    reused: List[Tuple[str, Dict]] = []
+    occurrences: Dict[str, int] = {}
+    skipped = 0
+    resumed = 0
+
+    if near_dups is not None:
+        near_dups.load_bot(conn, bot_id, reload=False)
+        near_dups.forget_document(bot_id, source, doc_id)
+
+    def prepare_window(chunks, chunk_token_ids, executor):
+        """IDs y puntos existentes de la ventana; su vectorización queda en curso."""
+        nonlocal skipped, resumed
+
+        # ✅ Omitir casi-duplicados de lo ya indexado para el bot (headers, footers, menús)
+        fingerprints = [None] * len(chunks)
+        if near_dups is not None:
+            keep, fingerprints = near_dups.filter_chunks(bot_id, source, doc_id, chunks)
+            skipped += len(chunks) - len(keep)
+            chunks = [chunks[i] for i in keep]
+            if chunk_token_ids is not None:
+                chunk_token_ids = [chunk_token_ids[i] for i in keep]
+            if not chunks:
+                return None
+
+        # ✅ ID determinista por chunk: los que ya existen conservan su punto
+        hashes = [chunk_hash(chunk) for chunk in chunks]
+        window_ids = []
+        for h in hashes:
+            window_ids.append(point_id(bot_id, source, doc_id, h, occurrences.get(h, 0)))
+            occurrences[h] = occurrences.get(h, 0) + 1
+
+        # Solo se reutilizan los puntos que Qdrant confirma (un retrieve por
+        # ventana): vector_chunks puede listar puntos ya borrados (cleanup,
+        # reparación de sync) y los de una pasada interrumpida no están en él
+        # (con etiquetador semántico también sus vectores, para re-etiquetarlos)
+        known = {
+            str(point.id): point
+            for point in client.retrieve(
+                **route.kwargs, ids=window_ids, with_payload=["chunk_number"],
+                with_vectors=semantic_tagger is not None
+            )
+        }
+        resumed += sum(1 for qdrant_id in known if qdrant_id not in previous_numbers)
+        to_embed = [i for i, qdrant_id in enumerate(window_ids) if qdrant_id not in known]
+
+        embedding = None
+        if to_embed:
+            embedding = executor.submit(
+                embed_window,
+                [chunks[i] for i in to_embed],
+                [chunk_token_ids[i] for i in to_embed] if chunk_token_ids is not None else None
+            )
+        return chunks, hashes, fingerprints, window_ids, known, to_embed, embedding
+
+    def embed_window(texts, token_ids):
+        embed_started = time.perf_counter()
+        embedded = batch_get_embeddings(texts, use_fallback=False, token_ids=token_ids)
+        if near_dups is not None:
+            near_dups.record_embedding_time(len(texts), time.perf_counter() - embed_started)
+        return embedded
+
+    def write_window(chunks, hashes, fingerprints, window_ids, known, to_embed, embedding):
+        """Espera los vectores de la ventana y encola sus puntos en el writer."""
+        vectors = {}
+        if embedding is not None:
+            embedded = embedding.result()
+            failed = [len(point_ids) + i + 1 for i, vector in zip(to_embed, embedded) if vector is None]
+            if failed:
+                raise Exception(f"No se pudo generar embedding para los chunks {failed[:10]}")
+            vectors = dict(zip(to_embed, embedded))
+
+        # Etiquetas semánticas de toda la ventana (un producto matricial): vectores
+        # recién calculados y los de los puntos reutilizados
+        semantic = {}
+        if semantic_tagger is not None and chunks:
+            window_vectors = [
+                vectors[i] if qdrant_id not in known else known[qdrant_id].vector
+                for i, qdrant_id in enumerate(window_ids)
+            ]
+            semantic = dict(enumerate(semantic_tagger.tag_vectors(window_vectors)))
+
+        for i, (chunk, qdrant_id) in enumerate(zip(chunks, window_ids)):
+            chunk_number = len(point_ids) + 1
+
+            # En orden de documento: DocumentTags ubica cada chunk desde el anterior
+            fields = chunk_tag_fields(doc_tags, chunk, semantic.get(i))
+            if qdrant_id not in known:
+                # El texto del chunk va a vector_chunks, no al payload
+                payload = compact_payload({
+                    **base_payload,
+                    **route.payload,
+                    "chunk_number": chunk_number,
+                    **doc_tags.tags,
+                    "taxonomy_version": doc_tags.version,
+                    **fields,
+                })
+                writer.add({"id": qdrant_id, "vector": vectors[i], "payload": payload})
+                new_ids.append(qdrant_id)
+            else:
+                if (known[qdrant_id].payload or {}).get("chunk_number") != chunk_number:
+                    fields["chunk_number"] = chunk_number
+                reused.append((qdrant_id, fields))
+
+            point_ids.append(qdrant_id)
+            rows.append((chunk_number, hashes[i], qdrant_id, chunk, fingerprints[i]))
+
+    # Upserts en lotes con requests en vuelo; flush() confirma antes de commitear
+    writer = PointWriter(client, collection_name=route.collection_name, shard_key=route.shard_key)
+
+    try:
+        # ✅ Pipeline entre ventanas: la ventana N+1 se vectoriza en otro hilo
+        # mientras la ventana N se etiqueta y se escribe en Qdrant
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="chunk-embedding") as executor:
+            in_flight = prepared = None
+            try:
+                for chunks, chunk_token_ids in iter_chunk_windows(content, window=chunk_window_size()):
+                    prepared = prepare_window(chunks, chunk_token_ids, executor)
+                    if prepared is None:
+                        continue
+                    if in_flight is not None:
+                        write_window(*in_flight)
+                    in_flight, prepared = prepared, None
+                if in_flight is not None:
+                    write_window(*in_flight)
+            except Exception:
+                # No vectorizar ventanas pendientes de un documento que falló
+                for window in (in_flight, prepared):
+                    if window is not None and window[-1] is not None:
+                        window[-1].cancel()
+                raise
+
+        # Confirmar todas las escrituras antes de tocar payloads o MySQL
+        writer.flush()
+
+        # Puntos que ya estaban en Qdrant (los nuevos se escribieron completos):
+        # content_hash, etiquetas del documento y del chunk y taxonomy_version
+        # actuales, para que retag no los dé por vigentes con chunk_tags viejas
+        operations = []
+        for qdrant_id, fields in reused:
+            operations.append(DeletePayloadOperation(delete_payload=DeletePayload(
+                keys=stale_tag_fields(doc_tags, fields), points=[qdrant_id], shard_key=route.shard_key
+            )))
+            operations.append(SetPayloadOperation(set_payload=SetPayload(
+                payload={
+                    "content_hash": base_payload.get("content_hash"),
+                    **doc_tags.tags,
+                    "taxonomy_version": doc_tags.version,
+                    **fields,
+                },
+                points=[qdrant_id],
+                shard_key=route.shard_key
+            )))
+        for start in range(0, len(operations), _PAYLOAD_UPDATE_BATCH):
+            client.batch_update_points(
+                collection_name=route.collection_name,
+                update_operations=operations[start:start + _PAYLOAD_UPDATE_BATCH]
+            )
+    except Exception:
+        # Los puntos ya escritos se conservan: sus IDs son deterministas y al
+        # reintentar se reutilizan sin vectorizar (los que sobren se borran abajo)
+        writer.discard()
+        raise
+
+    # Confirmar la nueva lista antes de borrar lo obsoleto: si algo falla después,
+    # quedan puntos huérfanos (los detecta sync) y nunca referencias a puntos borrados
+    current = set(point_ids)
+    removed = [qdrant_id for qdrant_id in previous_numbers if qdrant_id not in current]
+    save_document_chunks(conn, bot_id, source, doc_id, rows)
+    conn.commit()
+
+    # Un solo delete por filtro: chunks que ya no existen, puntos de pasadas
+    # interrumpidas y puntos anteriores a vector_chunks / a los IDs deterministas
+    client.delete(
+        **route.kwargs,
+        points_selector=FilterSelector(filter=Filter(
+            must=route.filter(
+                FieldCondition(key="source", match=MatchValue(value=source)),
+                FieldCondition(key="doc_id", match=MatchValue(value=doc_id)),
+            ).must,
+            must_not=[HasIdCondition(has_id=point_ids)] if point_ids else None
+        ))
+    )
+
+    if previous or resumed:
+        print(
+            f"   🔁 Re-indexación incremental: {len(new_ids)} nuevos, "
+            f"{len(point_ids) - len(new_ids)} sin cambios ({resumed} de una pasada anterior), "
+            f"{len(removed)} eliminados"
+        )
+
+    return {
+        "point_ids": point_ids,
+        "total_chunks": len(point_ids),
+        "embedded": len(new_ids),
+        "reused": len(point_ids) - len(new_ids),
+        "resumed": resumed,
+        "deleted": len(removed),
+        "skipped": skipped,
+    }
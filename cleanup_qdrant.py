@@ -2,19 +2,43 @@
 """
 🧹 CLEANUP SCRIPT: Limpia y reconstruye la colección Qdrant
 Elimina puntos corruptos que causan errores de lectura.
+
+Uso:
+    python -m voia_vector_services.cleanup_qdrant [--recreate]
 """
 
-from qdrant_client import QdrantClient
 from qdrant_client.models import VectorParams, Distance
 
+from .chunk_index import delete_collection_chunks
+from .db_utils import get_connection
+from .service_registry import get_qdrant_client
+from .vector_store import COLLECTION_NAME, reset_vector_store_cache
+
+
+def forget_collection_chunks(collection_name: str) -> None:
+    """
+    Borra de vector_chunks los chunks de la colección limpiada: sin esto, la
+    re-indexación los daría por existentes.
+    """
+    try:
+        conn = get_connection()
+        try:
+            bot_ids = delete_collection_chunks(conn, collection_name)
+            conn.commit()
+        finally:
+            conn.close()
+        print(f"   🧾 vector_chunks limpiado ({len(bot_ids)} bots)")
+    except Exception as e:
+        print(f"   ⚠️  No se pudo limpiar vector_chunks: {str(e)[:200]}")
+
 def cleanup_qdrant():
     """
     Limpia la colección Qdrant eliminando todos los puntos corruptos.
     Opción 1: Eliminar todos los puntos (más seguro)
     Opción 2: Recrear la colección completamente
     """
-    client = QdrantClient(host="localhost", port=6333)
-    collection_name = "voia_vectors"
+    client = get_qdrant_client()
+    collection_name = COLLECTION_NAME
     
     print("🧹 Iniciando limpieza de Qdrant...")
     
@@ -74,6 +98,9 @@ def cleanup_qdrant():
                 print(f"   ⚠️  Error en lote: {str(batch_error)[:100]}")
                 break
         
+        if deleted_total:
+            forget_collection_chunks(collection_name)
+        
         # Verificar que quedó vacía
         collection_info = client.get_collection(collection_name)
         final_count = collection_info.points_count
@@ -94,8 +121,8 @@ def recreate_collection():
     """
     Opción más drástica: Elimina y recrea la colección desde cero.
     """
-    client = QdrantClient(host="localhost", port=6333)
-    collection_name = "voia_vectors"
+    client = get_qdrant_client()
+    collection_name = COLLECTION_NAME
     
     print("🔄 Recreando colección desde cero...")
     
@@ -113,6 +140,8 @@ def recreate_collection():
             vectors_config=VectorParams(size=384, distance=Distance.COSINE)
         )
         print("   ✅ Colección recreada exitosamente")
+        reset_vector_store_cache()
+        forget_collection_chunks(collection_name)
         
         return True
         
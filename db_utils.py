@@ -1,19 +1,27 @@
 import mysql.connector
+from mysql.connector import pooling
 from dotenv import load_dotenv
 import os
+import threading
 import time
 import random
-from sentence_transformers import SentenceTransformer
+from .service_registry import get_embedding_model, get_embedding_model_id
+from .embedding_cache import get_embedding_cache
+from .embedding_pool import get_embedding_pool, EMBEDDING_POOL_MIN_TEXTS
+from .embedding_backends import encode_token_ids
+from .text_chunking import truncate_to_token_budget
 
 load_dotenv()
 
-def get_connection():
-    print("DB_HOST:", os.getenv("DB_HOST"))
-    print("DB_PORT:", os.getenv("DB_PORT"))
-    print("DB_USER:", os.getenv("DB_USER"))
-    print("DB_PASSWORD:", os.getenv("DB_PASSWORD"))
-    print("DB_NAME:", os.getenv("DB_NAME"))
-    return mysql.connector.connect(
+# Conexiones del pool de lecturas de consulta (máximo de mysql-connector: 32)
+MYSQL_POOL_SIZE = min(int(os.getenv("MYSQL_POOL_SIZE", "16")), pooling.CNX_POOL_MAXSIZE)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _connection_params():
+    return dict(
         host=os.getenv("DB_HOST"),
         port=os.getenv("DB_PORT"),
         user=os.getenv("DB_USER"),
@@ -21,16 +29,96 @@ def get_connection():
         database=os.getenv("DB_NAME"),
     )
 
-# Carga del modelo de embeddings
-model = SentenceTransformer("all-MiniLM-L6-v2")
 
-def get_embedding(text, max_length=8000, max_retries=3):
+def get_connection():
+    return mysql.connector.connect(**_connection_params())
+
+
+def get_pooled_connection():
+    """
+    Conexión de solo lectura del pool del proceso, para rutas de consulta
+    (hidratación de resultados de búsqueda): evita abrir TCP + autenticar en
+    cada request. close() la devuelve al pool. Si el pool está agotado se
+    abre una conexión directa.
+    """
+    global _pool
+
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # autocommit: sin transacciones abiertas entre requests, así que
+                # no hace falta resetear la sesión al devolverla al pool
+                _pool = pooling.MySQLConnectionPool(
+                    pool_name="voia_queries",
+                    pool_size=max(1, MYSQL_POOL_SIZE),
+                    pool_reset_session=False,
+                    autocommit=True,
+                    **_connection_params()
+                )
+
+    try:
+        return _pool.get_connection()
+    except mysql.connector.errors.PoolError:
+        return mysql.connector.connect(autocommit=True, **_connection_params())
+
+# El modelo de embeddings (backend según EMBEDDER_PROVIDER) se carga de forma
+# perezosa en service_registry.get_embedding_model(), no al importar este módulo.
+
+EMBEDDING_DIM = 384
+# Textos por forward pass en batch_get_embeddings
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+# Agrupar textos de longitud similar en el mismo lote (menos padding)
+EMBEDDING_LENGTH_BUCKETING = os.getenv("EMBEDDING_LENGTH_BUCKETING", "true").lower() == "true"
+
+# Tokens reales vs. tokens con padding en los lotes de batch_get_embeddings
+_batching_stats = {
+    "batches": 0,
+    "real_tokens": 0,
+    "padded_tokens": 0,
+    "padded_tokens_unsorted": 0,
+}
+
+def _fit_texts(texts, max_length=None):
+    """
+    Recorta los textos a la ventana del modelo (en tokens) y retorna sus token ids.
+    Si el tokenizer no está disponible, retorna los textos sin ids.
+    """
+    if max_length:
+        texts = [text[:max_length] for text in texts]
+    try:
+        return truncate_to_token_budget(texts)
+    except Exception as e:
+        print(f"⚠️ No se pudo tokenizar ({str(e)[:100]}), vectorizando desde texto")
+        return list(texts), None
+
+
+def _encode(texts, token_ids=None, batch_size=None):
+    """
+    Vectoriza en forward passes de batch_size textos (default: EMBEDDING_BATCH_SIZE);
+    reutiliza token ids ya calculados si se proporcionan.
+    """
+    model = get_embedding_model()
+    batch_size = batch_size or EMBEDDING_BATCH_SIZE
+    if token_ids is not None:
+        try:
+            return encode_token_ids(model, token_ids, batch_size)
+        except Exception as e:
+            print(f"⚠️ Vectorización desde token ids falló ({str(e)[:100]}), usando texto")
+    return model.encode(
+        texts,
+        batch_size=batch_size,
+        convert_to_numpy=True,
+        show_progress_bar=False
+    )
+
+
+def get_embedding(text, max_length=None, max_retries=3):
     """
     Genera embedding con reintentos automáticos y manejo de textos largos.
     
     Args:
-        text: Texto a vectorizar
-        max_length: Máximo de caracteres (si excede, trunca)
+        text: Texto a vectorizar (se recorta a la ventana del modelo en tokens)
+        max_length: Máximo de caracteres adicional (opcional)
         max_retries: Número de reintentos en caso de error
     
     Returns:
@@ -39,16 +127,24 @@ def get_embedding(text, max_length=8000, max_retries=3):
     Raises:
         Exception: Si falla después de max_retries intentos
     """
-    # ✅ Limitar longitud si es muy largo
-    if len(text) > max_length:
-        print(f"⚠️ Texto muy largo ({len(text)} chars), truncando a {max_length}")
-        text = text[:max_length]
+    # ✅ Recortar a lo que el modelo realmente ve (256 word-pieces)
+    fitted, token_ids = _fit_texts([text], max_length)
+    text = fitted[0]
+    
+    # ✅ Caché por contenido: si el texto ya se vectorizó, no tocar el modelo
+    cache = get_embedding_cache(get_embedding_model_id(), EMBEDDING_DIM)
+    if cache is not None:
+        cached = cache.get(text)
+        if cached is not None:
+            return cached
     
     # ✅ Reintentos exponenciales
     for attempt in range(max_retries):
         try:
-            embedding = model.encode(text, convert_to_numpy=True)
-            return embedding.tolist()
+            embedding = _encode([text], token_ids)[0].tolist()
+            if cache is not None:
+                cache.put(text, embedding)
+            return embedding
         
         except RuntimeError as e:
             if "out of memory" in str(e).lower():
@@ -85,7 +181,7 @@ def get_embedding(text, max_length=8000, max_retries=3):
             time.sleep(wait_time)
 
 
-def get_embedding_with_fallback(text, max_length=8000):
+def get_embedding_with_fallback(text, max_length=None):
     """
     Genera embedding con fallback a embedding aleatorio si falla.
     Útil para asegurar que el procesamiento continúe incluso si SentenceTransformer falla.
@@ -98,29 +194,168 @@ def get_embedding_with_fallback(text, max_length=8000):
         return [random.random() for _ in range(384)]
 
 
-def batch_get_embeddings(texts, max_length=8000, batch_size=10):
+def _padded_tokens(batches, lengths):
+    """Tokens procesados si cada lote se rellena hasta su texto más largo."""
+    return sum(len(batch) * max(lengths[idx] for idx in batch) for batch in batches if batch)
+
+
+def _record_padding(batches, unsorted_batches, lengths):
+    _batching_stats["batches"] += len(batches)
+    _batching_stats["real_tokens"] += sum(lengths[idx] for batch in batches for idx in batch)
+    _batching_stats["padded_tokens"] += _padded_tokens(batches, lengths)
+    _batching_stats["padded_tokens_unsorted"] += _padded_tokens(unsorted_batches, lengths)
+
+
+def get_embedding_batching_stats():
+    """Padding ratio de los lotes de indexación (con y sin agrupar por longitud)."""
+    stats = dict(_batching_stats)
+    padded = stats["padded_tokens"]
+    padded_unsorted = stats["padded_tokens_unsorted"]
+    stats["length_bucketing"] = EMBEDDING_LENGTH_BUCKETING
+    stats["padding_ratio"] = round(1 - stats["real_tokens"] / padded, 4) if padded else 0.0
+    stats["padding_ratio_unsorted"] = (
+        round(1 - stats["real_tokens"] / padded_unsorted, 4) if padded_unsorted else 0.0
+    )
+    return stats
+
+
+def batch_get_embeddings(texts, max_length=None, batch_size=None, use_fallback=True, token_ids=None):
     """
-    Genera embeddings en lotes para mejor rendimiento.
+    Genera embeddings en lotes reales: cada lote pasa por una sola llamada a model.encode.
+    
+    Los textos presentes en el caché persistente no se vuelven a vectorizar.
+    Si un lote completo falla, se reintenta texto por texto para aislar el error
+    y no perder los demás textos del lote.
+    Con EMBEDDING_POOL_WORKERS > 0, las cargas grandes se reparten entre los
+    procesos del pool multi-proceso (embedding_pool).
     
     Args:
         texts: Lista de textos
-        max_length: Máximo de caracteres por texto
-        batch_size: Cantidad de textos a procesar juntos
+        max_length: Máximo de caracteres por texto (opcional; siempre se recorta
+                    a la ventana del modelo en tokens)
+        batch_size: Cantidad de textos por forward pass (default: EMBEDDING_BATCH_SIZE)
+        use_fallback: Si True, los textos fallidos reciben un vector aleatorio;
+                      si False, su posición queda en None
+        token_ids: Token ids por texto ya calculados por el chunker
+                   (iter_chunk_windows); evita volver a tokenizar
     
     Returns:
-        list: Lista de embeddings
+        list: Lista de embeddings en el mismo orden que texts
     """
-    embeddings = []
+    batch_size = batch_size or EMBEDDING_BATCH_SIZE
+    if token_ids is None:
+        texts, token_ids = _fit_texts(texts, max_length)
+    embeddings = [None] * len(texts)
+    
+    # ✅ Caché por contenido: solo los textos nunca vistos pasan por el modelo
+    cache = get_embedding_cache(get_embedding_model_id(), EMBEDDING_DIM)
+    if cache is not None:
+        embeddings = cache.get_many(texts)
+    pending = [i for i, vector in enumerate(embeddings) if vector is None]
+    
+    if cache is not None and len(pending) < len(texts):
+        print(f"♻️ Caché de embeddings: {len(texts) - len(pending)}/{len(texts)} textos reutilizados")
+    
+    unsorted_batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+    batches = unsorted_batches
+    
+    # ✅ Lotes por longitud tokenizada: cada lote se rellena hasta su texto más
+    # largo, así que mezclar chunks cortos con largos desperdicia cómputo.
+    # El orden original se conserva porque cada vector vuelve a su índice.
+    if pending:
+        try:
+            if token_ids is not None:
+                lengths = {idx: len(token_ids[idx]) + 2 for idx in pending}
+            else:
+                lengths = {idx: len(texts[idx]) // 4 + 2 for idx in pending}
+            if EMBEDDING_LENGTH_BUCKETING:
+                by_length = sorted(pending, key=lambda idx: lengths[idx])
+                batches = [by_length[i:i + batch_size] for i in range(0, len(by_length), batch_size)]
+            _record_padding(batches, unsorted_batches, lengths)
+        except Exception as e:
+            print(f"⚠️ No se pudo agrupar por longitud ({str(e)[:100]}), usando orden de llegada")
+            batches = unsorted_batches
+    
+    # ✅ Re-indexación masiva: repartir lotes entre los procesos del pool
+    pool = get_embedding_pool() if len(pending) >= EMBEDDING_POOL_MIN_TEXTS else None
+    futures = []
+    if pool is not None:
+        print(f"🧵 {len(batches)} lotes repartidos en el pool de embeddings ({pool.workers} workers)")
+        try:
+            for batch_indices in batches:
+                futures.append(pool.submit(
+                    [texts[idx] for idx in batch_indices],
+                    batch_size,
+                    token_ids=[token_ids[idx] for idx in batch_indices] if token_ids is not None else None
+                ))
+        except Exception as e:
+            print(f"⚠️ Pool de embeddings no disponible ({str(e)[:100]}), continuando en este proceso")
     
-    for i in range(0, len(texts), batch_size):
-        batch = texts[i:i + batch_size]
-        print(f"📦 Procesando lote {i // batch_size + 1} ({len(batch)} textos)...")
+    for batch_number, batch_indices in enumerate(batches):
+        batch = [texts[idx] for idx in batch_indices]
+        print(f"📦 Procesando lote {batch_number + 1} ({len(batch)} textos)...")
         
-        for text in batch:
+        try:
+            if batch_number < len(futures):
+                vectors = futures[batch_number].result()
+            else:
+                vectors = _encode(
+                    batch,
+                    [token_ids[idx] for idx in batch_indices] if token_ids is not None else None,
+                    batch_size
+                )
+            for idx, vector in zip(batch_indices, vectors):
+                embeddings[idx] = vector.tolist()
+            if cache is not None:
+                cache.put_many(batch, [embeddings[idx] for idx in batch_indices])
+            continue
+        except Exception as e:
+            print(f"⚠️ Lote {batch_number + 1} falló ({str(e)[:100]}), reintentando texto por texto...")
+        
+        # ✅ Aislamiento por item: un texto problemático no tumba el lote
+        for idx, text in zip(batch_indices, batch):
             try:
-                embedding = get_embedding(text, max_length=max_length, max_retries=2)
-                embeddings.append(embedding)
+                embeddings[idx] = get_embedding(text, max_retries=2)
             except Exception as e:
-                embeddings.append([random.random() for _ in range(384)])
+                print(f"❌ Texto {idx + 1} sin embedding: {str(e)[:100]}")
+                if use_fallback:
+                    embeddings[idx] = [random.random() for _ in range(EMBEDDING_DIM)]
+    
+    return embeddings
+
+
+def encode_batch(texts, max_length=None, batch_size=None):
+    """
+    Vectoriza una lista de textos en lotes de EMBEDDING_BATCH_SIZE (sin logs por lote).
+    
+    Pensado para rutas de consulta (scheduler de /search y /embed): usa el caché
+    persistente y propaga la excepción si el modelo falla, para que cada
+    llamador reciba el error en lugar de un vector aleatorio.
+    
+    Returns:
+        list: Lista de embeddings en el mismo orden que texts
+    """
+    texts, token_ids = _fit_texts(texts, max_length)
+    cache = get_embedding_cache(get_embedding_model_id(), EMBEDDING_DIM)
+    embeddings = cache.get_many(texts) if cache is not None else [None] * len(texts)
+    pending = [i for i, vector in enumerate(embeddings) if vector is None]
+    
+    if pending:
+        batch = [texts[i] for i in pending]
+        vectors = _encode(
+            batch,
+            [token_ids[i] for i in pending] if token_ids is not None else None,
+            batch_size
+        )
+        for i, vector in zip(pending, vectors):
+            embeddings[i] = vector.tolist()
+        if cache is not None:
+            cache.put_many(batch, [embeddings[i] for i in pending])
     
     return embeddings
+
+
+def get_embedding_cache_stats():
+    """Estadísticas del caché persistente de embeddings (None si está deshabilitado)."""
+    cache = get_embedding_cache(get_embedding_model_id(), EMBEDDING_DIM)
+    return cache.get_stats() if cache is not None else None
@@ -0,0 +1,223 @@
+"""
+Backends de inferencia para el modelo de embeddings (all-MiniLM-L6-v2).
+
+Se selecciona con EMBEDDER_PROVIDER:
+- torch (alias: huggingface, pytorch): SentenceTransformer en PyTorch eager (default)
+- onnx: ONNX Runtime FP32
+- onnx-int8: ONNX Runtime con cuantización dinámica INT8
+
+Los backends ONNX requieren sentence-transformers >= 3.2 y
+`pip install "optimum[onnxruntime]"`. Si no están disponibles se usa PyTorch.
+
+Uso como script (paridad y throughput entre backends):
+    python -m voia_vector_services.embedding_backends
+"""
+
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+
+PROVIDER_ALIASES = {
+    "torch": "torch",
+    "pytorch": "torch",
+    "huggingface": "torch",
+    "onnx": "onnx",
+    "onnx-fp32": "onnx",
+    "onnx-int8": "onnx-int8",
+    "onnx_int8": "onnx-int8",
+}
+
+# Variantes cuantizadas publicadas en el repo del modelo (onnx/model_qint8_<config>.onnx)
+ONNX_INT8_FILES = {
+    "avx2": "onnx/model_quint8_avx2.onnx",
+    "avx512": "onnx/model_qint8_avx512.onnx",
+    "avx512_vnni": "onnx/model_qint8_avx512_vnni.onnx",
+    "arm64": "onnx/model_qint8_arm64.onnx",
+}
+
+
+def resolve_provider(provider: Optional[str] = None) -> str:
+    """Normaliza EMBEDDER_PROVIDER a torch | onnx | onnx-int8."""
+    raw = (provider or os.getenv("EMBEDDER_PROVIDER", "torch")).strip().lower()
+    resolved = PROVIDER_ALIASES.get(raw)
+    if resolved is None:
+        print(f"⚠️ EMBEDDER_PROVIDER='{raw}' no soportado, usando torch")
+        return "torch"
+    return resolved
+
+
+def embedding_model_id(provider: str) -> str:
+    """
+    Identificador del modelo efectivo (forma parte de la clave del caché).
+    INT8 produce vectores ligeramente distintos, así que no comparte caché con FP32.
+    """
+    return EMBEDDING_MODEL_NAME if provider == "torch" else f"{EMBEDDING_MODEL_NAME}+{provider}"
+
+
+def _load_onnx_model(provider: str):
+    from sentence_transformers import SentenceTransformer
+
+    if provider == "onnx":
+        return SentenceTransformer(EMBEDDING_MODEL_NAME, device="cpu", backend="onnx")
+
+    quantization = os.getenv("EMBEDDER_ONNX_QUANTIZATION", "avx2").lower()
+    file_name = ONNX_INT8_FILES.get(quantization)
+    if file_name is None:
+        raise ValueError(
+            f"EMBEDDER_ONNX_QUANTIZATION='{quantization}' inválido "
+            f"(opciones: {', '.join(ONNX_INT8_FILES)})"
+        )
+    return SentenceTransformer(
+        EMBEDDING_MODEL_NAME,
+        device="cpu",
+        backend="onnx",
+        model_kwargs={"file_name": file_name}
+    )
+
+
+def load_embedding_model(provider: Optional[str] = None) -> Tuple[object, str]:
+    """
+    Carga el modelo con el backend solicitado.
+
+    Returns:
+        (modelo con API .encode() de SentenceTransformer, provider efectivo)
+    """
+    from sentence_transformers import SentenceTransformer
+
+    provider = resolve_provider(provider)
+
+    if provider != "torch":
+        try:
+            model = _load_onnx_model(provider)
+            print(f"✅ Modelo de embeddings cargado con ONNX Runtime ({provider})")
+            return model, provider
+        except Exception as e:
+            print(f"⚠️ Backend {provider} no disponible ({str(e)[:150]}), usando PyTorch")
+            provider = "torch"
+
+    model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+    print(f"✅ Modelo de embeddings cargado con PyTorch")
+    return model, provider
+
+
+def encode_token_ids(model, token_id_lists: List[List[int]], batch_size: int = 32) -> np.ndarray:
+    """
+    Vectoriza secuencias ya tokenizadas (sin [CLS]/[SEP]) sin volver a tokenizar.
+
+    Equivale a model.encode(textos) cuando los ids provienen del mismo tokenizer
+    con add_special_tokens=False y caben en la ventana del modelo. Procesa
+    batch_size secuencias por forward pass, ordenadas por largo y cada lote
+    rellenado solo hasta su secuencia más larga (la memoria de atención no
+    crece con el total de textos).
+    """
+    import torch
+
+    tokenizer = model.tokenizer
+    rows = [[tokenizer.cls_token_id, *ids, tokenizer.sep_token_id] for ids in token_id_lists]
+    order = sorted(range(len(rows)), key=lambda i: len(rows[i]))
+    embeddings = [None] * len(rows)
+
+    for start in range(0, len(order), max(1, batch_size)):
+        batch = order[start:start + max(1, batch_size)]
+        width = max(len(rows[i]) for i in batch)
+
+        input_ids = torch.full((len(batch), width), tokenizer.pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(batch), width), dtype=torch.long)
+        for j, i in enumerate(batch):
+            input_ids[j, :len(rows[i])] = torch.tensor(rows[i], dtype=torch.long)
+            attention_mask[j, :len(rows[i])] = 1
+
+        features = {
+            "input_ids": input_ids.to(model.device),
+            "attention_mask": attention_mask.to(model.device),
+            "token_type_ids": torch.zeros_like(input_ids).to(model.device),
+        }
+        with torch.inference_mode():
+            vectors = model(features)["sentence_embedding"].float().cpu().numpy()
+        for i, vector in zip(batch, vectors):
+            embeddings[i] = vector
+
+    return np.stack(embeddings)
+
+
+# ============================================
+# PARIDAD Y THROUGHPUT
+# ============================================
+
+SAMPLE_TEXTS = [
+    "hola",
+    "¿Cuáles son los precios del plan empresarial?",
+    "Horario de atención al cliente de lunes a viernes de 8 a.m. a 6 p.m.",
+    "El contrato de arrendamiento se renueva automáticamente cada año salvo aviso previo.",
+    "Para solicitar el certificado laboral envíe un correo a recursos humanos con su cédula.",
+    "La factura electrónica se genera al confirmar el pago y se envía al correo registrado.",
+    "Nuestra plataforma permite crear bots personalizados con IA y entrenarlos con documentos, URLs y textos.",
+    "La EPS autoriza el procedimiento médico después de la valoración por medicina general.",
+] * 8
+
+
+def _throughput(model, texts: List[str], batch_size: int, repeats: int) -> float:
+    """Textos por segundo (mejor de N repeticiones)."""
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        model.encode(texts, batch_size=batch_size, convert_to_numpy=True, show_progress_bar=False)
+        best = min(best, time.perf_counter() - started)
+    return len(texts) / best if best > 0 else 0.0
+
+
+def compare_backends(
+    texts: Optional[List[str]] = None,
+    providers: Tuple[str, ...] = ("torch", "onnx", "onnx-int8"),
+    batch_size: int = 32,
+    repeats: int = 3
+) -> Dict:
+    """
+    Compara backends contra la referencia PyTorch.
+
+    Reporta por backend:
+    - Drift coseno vs. vectores de referencia (media, mínimo)
+    - Throughput de consultas (batch 1) y de ingesta (batch_size)
+    """
+    texts = texts or SAMPLE_TEXTS
+    reference_model, _ = load_embedding_model("torch")
+    reference = reference_model.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+
+    report = {"texts": len(texts), "batch_size": batch_size, "backends": {}}
+
+    for requested in providers:
+        model, effective = (reference_model, "torch") if requested == "torch" else load_embedding_model(requested)
+        if effective != requested:
+            report["backends"][requested] = {"available": False}
+            continue
+
+        vectors = model.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+        cosine = np.sum(vectors * reference, axis=1)
+        query_texts = texts[:16]
+
+        report["backends"][requested] = {
+            "available": True,
+            "cosine_mean": round(float(cosine.mean()), 6),
+            "cosine_min": round(float(cosine.min()), 6),
+            "max_drift": round(float(1.0 - cosine.min()), 6),
+            "query_texts_per_sec": round(_throughput(model, query_texts, 1, repeats), 1),
+            "ingest_texts_per_sec": round(_throughput(model, texts, batch_size, repeats), 1),
+        }
+
+    torch_stats = report["backends"].get("torch", {})
+    for name, stats in report["backends"].items():
+        if stats.get("available") and torch_stats.get("ingest_texts_per_sec"):
+            stats["query_speedup"] = round(stats["query_texts_per_sec"] / torch_stats["query_texts_per_sec"], 2)
+            stats["ingest_speedup"] = round(stats["ingest_texts_per_sec"] / torch_stats["ingest_texts_per_sec"], 2)
+
+    return report
+
+
+if __name__ == "__main__":
+    import json
+
+    print(json.dumps(compare_backends(), indent=2))
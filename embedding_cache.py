@@ -0,0 +1,295 @@
+"""
+Caché persistente de embeddings direccionada por contenido.
+
+Cada vector se guarda bajo un sha256 de (modelo, texto normalizado del chunk),
+de modo que un chunk ya vectorizado no vuelve a pasar por el modelo aunque:
+- Sync lo marque con indexed = 0 y se reindexe
+- La misma plantilla o documento se cargue en otro bot
+
+Funcionalidades:
+- Almacenamiento en SQLite (un archivo, sin servicios extra)
+- Vectores float32 compactos (BLOB de dim * 4 bytes)
+- Evicción LRU por número máximo de entradas (last_access de los hits se
+  acumula en memoria y se escribe en lote, fuera del camino de las consultas)
+- Contadores de hits/misses
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+def normalize_chunk_text(text: str) -> str:
+    """Normaliza espacios para que variaciones de formato compartan hash."""
+    return " ".join(text.split())
+
+
+def chunk_hash(text: str) -> str:
+    """Hash SHA256 del chunk normalizado (equivalente a content_hash por chunk)."""
+    return hashlib.sha256(normalize_chunk_text(text).encode("utf-8")).hexdigest()
+
+
+def embedding_cache_key(model_name: str, text: str) -> str:
+    """Clave de caché: sha256 de (modelo, texto normalizado)."""
+    raw = f"{model_name}\x00{normalize_chunk_text(text)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Caché LRU de embeddings respaldado por SQLite.
+
+    Tabla:
+    embeddings(key TEXT PRIMARY KEY, vector BLOB, last_access REAL)
+    """
+
+    def __init__(
+        self,
+        path: str,
+        model_name: str,
+        dim: int = 384,
+        max_entries: int = 500_000,
+        touch_interval: float = 30.0
+    ):
+        """
+        Inicializa el caché.
+
+        Args:
+            path: Ruta del archivo SQLite
+            model_name: Nombre del modelo (forma parte de la clave)
+            dim: Dimensiones del vector
+            max_entries: Máximo de vectores antes de evictar los menos usados
+            touch_interval: Segundos entre escrituras en lote de last_access
+                            (0 = solo al escribir vectores, evictar o cerrar)
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.model_name = model_name
+        self.dim = dim
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                vector BLOB NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings (last_access)"
+        )
+        self._conn.commit()
+
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "evictions": 0,
+            "touch_flushes": 0,
+        }
+
+        # last_access pendiente de los hits (key -> timestamp)
+        self._touched: Dict[str, float] = {}
+        self._closed = threading.Event()
+        if touch_interval > 0:
+            threading.Thread(
+                target=self._touch_loop,
+                args=(touch_interval,),
+                name="embedding-cache-touch",
+                daemon=True
+            ).start()
+
+    def get_many(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Busca varios textos en una sola consulta.
+
+        Returns:
+            Lista alineada con texts; None donde no hay vector en caché
+        """
+        if not texts:
+            return []
+
+        keys = [embedding_cache_key(self.model_name, text) for text in texts]
+        found: Dict[str, List[float]] = {}
+        unique_keys = list(dict.fromkeys(keys))
+
+        with self._lock:
+            # SQLite limita los parámetros por consulta; consultar en bloques
+            for i in range(0, len(unique_keys), 500):
+                block = unique_keys[i:i + 500]
+                placeholders = ",".join("?" * len(block))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    block
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+
+            # Sin escrituras en la consulta: last_access se confirma en lote
+            if found:
+                now = time.time()
+                for key in found:
+                    self._touched[key] = now
+
+            results = [found.get(key) for key in keys]
+            hits = sum(1 for r in results if r is not None)
+            self.stats["hits"] += hits
+            self.stats["misses"] += len(results) - hits
+
+        return results
+
+    def get(self, text: str) -> Optional[List[float]]:
+        """Busca un solo texto."""
+        return self.get_many([text])[0]
+
+    def put_many(self, texts: List[str], vectors: List[List[float]]) -> None:
+        """Guarda vectores para los textos dados (ignora entradas None)."""
+        now = time.time()
+        rows = []
+        for text, vector in zip(texts, vectors):
+            if vector is None:
+                continue
+            blob = np.asarray(vector, dtype=np.float32).tobytes()
+            rows.append((embedding_cache_key(self.model_name, text), blob, now))
+
+        if not rows:
+            return
+
+        with self._lock:
+            self._write_touched_locked()
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+            inserted = self._conn.total_changes - before
+            self._entries += inserted
+            self.stats["writes"] += inserted
+
+            if self._entries > self.max_entries:
+                self._evict_locked()
+
+    def put(self, text: str, vector: List[float]) -> None:
+        """Guarda un solo vector."""
+        self.put_many([text], [vector])
+
+    def _write_touched_locked(self) -> None:
+        """Escribe los last_access pendientes (sin commit; el llamador confirma)."""
+        if not self._touched:
+            return
+        self._conn.executemany(
+            "UPDATE embeddings SET last_access = ? WHERE key = ?",
+            [(when, key) for key, when in self._touched.items()]
+        )
+        self._touched.clear()
+        self.stats["touch_flushes"] += 1
+
+    def flush_touched(self) -> None:
+        """Confirma en una sola transacción los last_access de los hits acumulados."""
+        with self._lock:
+            if self._touched:
+                self._write_touched_locked()
+                self._conn.commit()
+
+    def _touch_loop(self, interval: float) -> None:
+        while not self._closed.wait(interval):
+            try:
+                self.flush_touched()
+            except Exception as e:
+                print(f"⚠️ Caché de embeddings: no se pudo registrar last_access ({str(e)[:100]})")
+
+    def _evict_locked(self) -> None:
+        """Elimina las entradas menos usadas hasta quedar en ~90% de max_entries."""
+        self._write_touched_locked()
+        target = int(self.max_entries * 0.9)
+        to_delete = self._entries - target
+        self._conn.execute("""
+            DELETE FROM embeddings WHERE key IN (
+                SELECT key FROM embeddings ORDER BY last_access ASC LIMIT ?
+            )
+        """, (to_delete,))
+        self._conn.commit()
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        self.stats["evictions"] += to_delete
+        print(f"🧹 Caché de embeddings: {to_delete} entradas evictadas (LRU)")
+
+    def clear(self) -> None:
+        """Vacía el caché."""
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self._touched.clear()
+            self._entries = 0
+
+    def get_stats(self) -> Dict:
+        """Retorna estadísticas del caché."""
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                "path": str(self.path),
+                "model_name": self.model_name,
+                "entries": self._entries,
+                "max_entries": self.max_entries,
+                "approx_size_bytes": self._entries * self.dim * 4,
+                "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+                "pending_touches": len(self._touched),
+                **self.stats,
+            }
+
+    def close(self) -> None:
+        """Confirma los last_access pendientes y cierra la conexión SQLite."""
+        self._closed.set()
+        with self._lock:
+            self._write_touched_locked()
+            self._conn.commit()
+            self._conn.close()
+
+
+# ============================================
+# INSTANCIA COMPARTIDA
+# ============================================
+
+_cache: Optional[EmbeddingCache] = None
+_cache_failed = False
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache(model_name: str, dim: int = 384) -> Optional[EmbeddingCache]:
+    """
+    Retorna el caché del proceso (None si EMBEDDING_CACHE_ENABLED=false).
+    """
+    global _cache, _cache_failed
+
+    if _cache_failed or os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() != "true":
+        return None
+
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None and not _cache_failed:
+                try:
+                    _cache = EmbeddingCache(
+                        path=os.getenv("EMBEDDING_CACHE_PATH", "./cache/embeddings.sqlite3"),
+                        model_name=model_name,
+                        dim=dim,
+                        max_entries=int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "500000")),
+                        touch_interval=float(os.getenv("EMBEDDING_CACHE_TOUCH_SECONDS", "30"))
+                    )
+                    print(f"✅ Caché de embeddings en {_cache.path} ({_cache._entries} entradas)")
+                except Exception as e:
+                    print(f"⚠️ Caché de embeddings no disponible: {e}")
+                    _cache_failed = True
+                    return None
+
+    return _cache
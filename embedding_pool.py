@@ -0,0 +1,375 @@
+"""
+Pool multi-proceso de embeddings para re-indexación masiva.
+
+Un solo proceso con un modelo deja ociosa la mayoría de los cores en las
+máquinas de ingesta. El pool arranca N procesos worker (cada uno con su
+propia copia del modelo), reparte los lotes entre ellos y devuelve los
+vectores en el mismo orden en que se enviaron.
+
+Se usa desde batch_get_embeddings (pipelines de ingesta, sync, migraciones)
+cuando EMBEDDING_POOL_WORKERS > 0. Hay una sola instancia por proceso: los
+handlers de requests nunca arrancan procesos propios.
+
+Funcionalidades:
+- Cola de entrada acotada (backpressure hacia el productor)
+- Salida ordenada vía Futures por lote
+- Detección de workers caídos (los lotes pendientes reciben error)
+- Apagado limpio (sentinelas, join y terminate como último recurso)
+"""
+
+import atexit
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+
+_READY = "__ready__"
+
+
+def _worker_main(task_queue, result_queue, provider: str, num_threads: int) -> None:
+    """Loop del proceso worker: carga el modelo y vectoriza lotes hasta recibir None."""
+    # Limitar hilos antes de importar torch/onnxruntime para no sobre-suscribir cores
+    os.environ["OMP_NUM_THREADS"] = str(num_threads)
+    os.environ["MKL_NUM_THREADS"] = str(num_threads)
+
+    from .embedding_backends import load_embedding_model, encode_token_ids
+
+    try:
+        import torch
+        torch.set_num_threads(num_threads)
+    except ImportError:
+        pass
+
+    try:
+        model, _ = load_embedding_model(provider)
+    except Exception as e:
+        result_queue.put((_READY, os.getpid(), f"Error cargando modelo: {str(e)[:200]}"))
+        return
+    result_queue.put((_READY, os.getpid(), None))
+
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+
+        batch_id, texts, batch_size, token_ids = task
+        try:
+            vectors = None
+            if token_ids is not None:
+                try:
+                    vectors = encode_token_ids(model, token_ids, batch_size)
+                except Exception:
+                    vectors = None
+            if vectors is None:
+                vectors = model.encode(
+                    texts,
+                    batch_size=batch_size,
+                    convert_to_numpy=True,
+                    show_progress_bar=False
+                )
+            result_queue.put((batch_id, vectors.astype("float32"), None))
+        except Exception as e:
+            result_queue.put((batch_id, None, str(e)[:200]))
+
+
+class EmbeddingPool:
+    """
+    Pool de procesos con el modelo de embeddings cargado.
+
+    Uso:
+        pool = EmbeddingPool(workers=8).start()
+        vectors = pool.encode(texts, batch_size=64)   # mismo orden que texts
+        pool.close()
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        provider: str = "torch",
+        threads_per_worker: Optional[int] = None,
+        max_pending_batches: Optional[int] = None
+    ):
+        """
+        Inicializa el pool (no arranca procesos hasta start()).
+
+        Args:
+            workers: Cantidad de procesos worker
+            provider: Backend del modelo en los workers (torch | onnx | onnx-int8)
+            threads_per_worker: Hilos de inferencia por worker (default: cores / workers)
+            max_pending_batches: Lotes máximos en la cola de entrada (default: 2 por worker)
+        """
+        self.workers = max(1, workers)
+        self.provider = provider
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // self.workers)
+        self.max_pending_batches = max_pending_batches or self.workers * 2
+
+        # spawn: torch no es seguro tras fork con hilos ya creados
+        self._ctx = mp.get_context("spawn")
+        self._task_queue = None
+        self._result_queue = None
+        self._processes: List = []
+        self._collector: Optional[threading.Thread] = None
+        self._closing = threading.Event()
+        self._broken: Optional[str] = None
+
+        self._futures: Dict[int, Future] = {}
+        self._futures_lock = threading.Lock()
+        self._ids = itertools.count()
+        self._ready_workers = 0
+
+        self.stats = {
+            "batches": 0,
+            "texts": 0,
+            "errors": 0,
+        }
+
+    # ------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------
+
+    def start(self, timeout: float = 300.0) -> "EmbeddingPool":
+        """Arranca los workers y espera a que todos tengan el modelo cargado."""
+        if self._processes:
+            return self
+
+        self._task_queue = self._ctx.Queue(maxsize=self.max_pending_batches)
+        self._result_queue = self._ctx.Queue()
+
+        for _ in range(self.workers):
+            process = self._ctx.Process(
+                target=_worker_main,
+                args=(self._task_queue, self._result_queue, self.provider, self.threads_per_worker),
+                daemon=True
+            )
+            process.start()
+            self._processes.append(process)
+
+        deadline = time.monotonic() + timeout
+        while self._ready_workers < self.workers:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.close()
+                raise RuntimeError("Timeout esperando workers del pool de embeddings")
+            try:
+                tag, _, error = self._result_queue.get(timeout=min(remaining, 1.0))
+            except queue.Empty:
+                if any(not p.is_alive() for p in self._processes):
+                    self.close()
+                    raise RuntimeError("Un worker del pool de embeddings terminó durante el arranque")
+                continue
+            if tag == _READY:
+                if error:
+                    self.close()
+                    raise RuntimeError(error)
+                self._ready_workers += 1
+
+        self._collector = threading.Thread(
+            target=self._collect_results, name="embedding-pool-collector", daemon=True
+        )
+        self._collector.start()
+        print(f"✅ Pool de embeddings iniciado ({self.workers} workers x {self.threads_per_worker} hilos)")
+        return self
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Detiene los workers; los lotes pendientes reciben error."""
+        if self._closing.is_set():
+            return
+        self._closing.set()
+
+        for _ in self._processes:
+            try:
+                self._task_queue.put(None, timeout=1.0)
+            except (queue.Full, ValueError, OSError):
+                break
+
+        deadline = time.monotonic() + timeout
+        for process in self._processes:
+            process.join(timeout=max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.terminate()
+                process.join(timeout=1.0)
+
+        if self._collector is not None:
+            self._collector.join(timeout=2.0)
+
+        self._fail_pending("Pool de embeddings cerrado")
+
+        for q in (self._task_queue, self._result_queue):
+            if q is not None:
+                q.cancel_join_thread()
+                q.close()
+
+        self._processes = []
+        print("🛑 Pool de embeddings detenido")
+
+    @property
+    def running(self) -> bool:
+        return bool(self._processes) and not self._closing.is_set() and self._broken is None
+
+    # ------------------------------------------
+    # API pública
+    # ------------------------------------------
+
+    def submit(
+        self,
+        texts: List[str],
+        batch_size: int = 32,
+        token_ids: Optional[List[List[int]]] = None
+    ) -> Future:
+        """
+        Encola un lote y retorna un Future con su matriz (len(texts) x dim, float32).
+        Con token_ids el worker vectoriza sin volver a tokenizar.
+        Bloquea si la cola de entrada está llena.
+        """
+        if not self.running:
+            raise RuntimeError(self._broken or "Pool de embeddings no iniciado")
+
+        batch_id = next(self._ids)
+        future: Future = Future()
+        with self._futures_lock:
+            self._futures[batch_id] = future
+
+        while True:
+            try:
+                self._task_queue.put((batch_id, list(texts), batch_size, token_ids), timeout=1.0)
+                return future
+            except queue.Full:
+                if not self.running:
+                    with self._futures_lock:
+                        self._futures.pop(batch_id, None)
+                    raise RuntimeError(self._broken or "Pool de embeddings cerrado")
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> List[List[float]]:
+        """Vectoriza texts repartiendo lotes entre los workers; conserva el orden."""
+        futures = [
+            self.submit(texts[i:i + batch_size], batch_size)
+            for i in range(0, len(texts), batch_size)
+        ]
+        embeddings = []
+        for future in futures:
+            embeddings.extend(vector.tolist() for vector in future.result())
+        return embeddings
+
+    # ------------------------------------------
+    # Recolección de resultados
+    # ------------------------------------------
+
+    def _collect_results(self) -> None:
+        while not self._closing.is_set():
+            try:
+                batch_id, vectors, error = self._result_queue.get(timeout=1.0)
+            except queue.Empty:
+                dead = [p.pid for p in self._processes if not p.is_alive()]
+                if dead and not self._closing.is_set():
+                    self._broken = f"Workers del pool de embeddings caídos: {dead}"
+                    print(f"❌ {self._broken}")
+                    self._fail_pending(self._broken)
+                    return
+                continue
+            except (EOFError, OSError):
+                return
+
+            with self._futures_lock:
+                future = self._futures.pop(batch_id, None)
+            if future is None:
+                continue
+
+            if error is None:
+                with self._futures_lock:
+                    self.stats["batches"] += 1
+                    self.stats["texts"] += len(vectors)
+                future.set_result(vectors)
+            else:
+                with self._futures_lock:
+                    self.stats["errors"] += 1
+                future.set_exception(RuntimeError(error))
+
+    def _fail_pending(self, reason: str) -> None:
+        with self._futures_lock:
+            pending, self._futures = self._futures, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(RuntimeError(reason))
+
+    def get_stats(self) -> Dict:
+        """Retorna métricas del pool."""
+        with self._futures_lock:
+            return {
+                "running": self.running,
+                "workers": self.workers,
+                "workers_alive": sum(1 for p in self._processes if p.is_alive()),
+                "threads_per_worker": self.threads_per_worker,
+                "provider": self.provider,
+                "in_flight_batches": len(self._futures),
+                "max_pending_batches": self.max_pending_batches,
+                "broken": self._broken,
+                **self.stats,
+            }
+
+
+# ============================================
+# INSTANCIA COMPARTIDA
+# ============================================
+
+EMBEDDING_POOL_WORKERS = int(os.getenv("EMBEDDING_POOL_WORKERS", "0"))
+# Por debajo de este número de textos pendientes no vale la pena repartir
+EMBEDDING_POOL_MIN_TEXTS = int(os.getenv("EMBEDDING_POOL_MIN_TEXTS", "128"))
+
+_pool: Optional[EmbeddingPool] = None
+_pool_failed = False
+_pool_lock = threading.Lock()
+
+
+def get_embedding_pool() -> Optional[EmbeddingPool]:
+    """
+    Retorna el pool del proceso, arrancándolo al primer uso.
+    None si está deshabilitado (EMBEDDING_POOL_WORKERS=0) o no pudo iniciar.
+    """
+    global _pool, _pool_failed
+
+    if EMBEDDING_POOL_WORKERS <= 0 or _pool_failed:
+        return None
+
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None and not _pool_failed:
+                from .service_registry import get_embedder_provider
+
+                threads = os.getenv("EMBEDDING_POOL_THREADS_PER_WORKER")
+                try:
+                    # Mismo backend efectivo que el proceso principal (clave de caché)
+                    _pool = EmbeddingPool(
+                        workers=EMBEDDING_POOL_WORKERS,
+                        provider=get_embedder_provider(),
+                        threads_per_worker=int(threads) if threads else None,
+                        max_pending_batches=int(os.getenv("EMBEDDING_POOL_QUEUE_SIZE", "0")) or None
+                    ).start()
+                    atexit.register(shutdown_embedding_pool)
+                except Exception as e:
+                    print(f"⚠️ Pool de embeddings no disponible, usando el proceso actual: {str(e)[:150]}")
+                    _pool_failed = True
+                    return None
+
+    # Una sola lectura: shutdown_embedding_pool puede dejar _pool en None en paralelo
+    pool = _pool
+    return pool if pool is not None and pool.running else None
+
+
+def get_embedding_pool_stats() -> Optional[Dict]:
+    """Estadísticas del pool (None si no fue iniciado)."""
+    pool = _pool
+    return pool.get_stats() if pool is not None else None
+
+
+def shutdown_embedding_pool() -> None:
+    """Detiene el pool del proceso si fue iniciado."""
+    global _pool
+
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
@@ -0,0 +1,248 @@
+"""
+Scheduler de micro-batching para embeddings de consultas.
+
+/search y /embed reciben una consulta por request. En lugar de que cada hilo
+haga su propio forward pass de tamaño 1 (compitiendo por los mismos cores),
+las consultas concurrentes se encolan, se agrupan durante unos milisegundos
+(o hasta llenar un lote) y se vectorizan en una sola llamada al modelo.
+
+Funcionalidades:
+- Un hilo dedicado que agrupa y vectoriza
+- API síncrona (embed) y asíncrona (aembed) sobre el mismo Future
+- Cola acotada (backpressure en lugar de crecer sin límite)
+- Métricas: profundidad de cola, tamaño de lote, latencia por lote
+"""
+
+import asyncio
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+
+
+class EmbeddingScheduler:
+    """
+    Agrupa solicitudes de embedding concurrentes en lotes.
+
+    Uso:
+        scheduler = EmbeddingScheduler(encode_batch)
+        vector = scheduler.embed("hola")            # endpoints sync
+        vector = await scheduler.aembed("hola")     # endpoints async
+    """
+
+    def __init__(
+        self,
+        encode_fn: Callable[[List[str]], List[List[float]]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        max_queue_size: int = 1024
+    ):
+        """
+        Inicializa el scheduler (no arranca el hilo hasta start()).
+
+        Args:
+            encode_fn: Función que vectoriza una lista de textos en un forward pass
+            max_batch_size: Máximo de textos por lote
+            max_wait_ms: Tiempo máximo que espera el primer texto del lote
+            max_queue_size: Máximo de solicitudes en cola antes de rechazar
+        """
+        self.encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            "requests": 0,
+            "batches": 0,
+            "errors": 0,
+            "rejected": 0,
+            "max_batch_size_seen": 0,
+            "last_batch_size": 0,
+            "last_batch_ms": 0.0,
+            "total_encode_ms": 0.0,
+            "batch_size_histogram": {},
+        }
+
+    # ------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------
+
+    def start(self) -> "EmbeddingScheduler":
+        """Arranca el hilo de batching (idempotente)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="embedding-scheduler", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Detiene el hilo; las solicitudes pendientes reciben error."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+        while True:
+            try:
+                _, future = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if not future.done():
+                future.set_exception(RuntimeError("Scheduler de embeddings detenido"))
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    # ------------------------------------------
+    # API pública
+    # ------------------------------------------
+
+    def submit(self, text: str) -> Future:
+        """Encola un texto y retorna un Future con su vector."""
+        if not self.running:
+            self.start()
+
+        future: Future = Future()
+        try:
+            self._queue.put_nowait((text, future))
+        except queue.Full:
+            with self._stats_lock:
+                self.stats["rejected"] += 1
+            raise RuntimeError("Cola de embeddings llena, reintentar más tarde")
+
+        with self._stats_lock:
+            self.stats["requests"] += 1
+        return future
+
+    def embed(self, text: str, timeout: Optional[float] = 30.0) -> List[float]:
+        """Vectoriza un texto bloqueando el hilo actual (endpoints sync)."""
+        return self.submit(text).result(timeout=timeout)
+
+    async def aembed(self, text: str) -> List[float]:
+        """Vectoriza un texto sin bloquear el event loop (endpoints async)."""
+        return await asyncio.wrap_future(self.submit(text))
+
+    # ------------------------------------------
+    # Hilo de batching
+    # ------------------------------------------
+
+    def _collect_batch(self) -> list:
+        """Espera el primer item y agrupa los que lleguen dentro de max_wait."""
+        try:
+            first = self._queue.get(timeout=0.5)
+        except queue.Empty:
+            return []
+
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            batch = self._collect_batch()
+            if not batch:
+                continue
+
+            # Descartar solicitudes cuyo llamador ya se rindió
+            batch = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            texts = [text for text, _ in batch]
+            started = time.perf_counter()
+            try:
+                vectors = self.encode_fn(texts)
+                for (_, future), vector in zip(batch, vectors):
+                    future.set_result(vector)
+            except Exception as e:
+                print(f"❌ Error en lote de embeddings ({len(batch)} textos): {str(e)[:100]}")
+                with self._stats_lock:
+                    self.stats["errors"] += 1
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self._record_batch(len(batch), elapsed_ms)
+
+    def _record_batch(self, size: int, elapsed_ms: float) -> None:
+        with self._stats_lock:
+            self.stats["batches"] += 1
+            self.stats["last_batch_size"] = size
+            self.stats["last_batch_ms"] = round(elapsed_ms, 2)
+            self.stats["total_encode_ms"] += elapsed_ms
+            self.stats["max_batch_size_seen"] = max(self.stats["max_batch_size_seen"], size)
+            histogram = self.stats["batch_size_histogram"]
+            histogram[size] = histogram.get(size, 0) + 1
+
+    def get_stats(self) -> Dict:
+        """Retorna métricas del scheduler."""
+        with self._stats_lock:
+            batches = self.stats["batches"]
+            processed = sum(size * count for size, count in self.stats["batch_size_histogram"].items())
+            return {
+                "running": self.running,
+                "queue_depth": self._queue.qsize(),
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+                "avg_batch_size": round(processed / batches, 2) if batches else 0.0,
+                "avg_batch_ms": round(self.stats["total_encode_ms"] / batches, 2) if batches else 0.0,
+                **{k: v for k, v in self.stats.items() if k != "batch_size_histogram"},
+                "total_encode_ms": round(self.stats["total_encode_ms"], 2),
+                "batch_size_histogram": dict(sorted(self.stats["batch_size_histogram"].items())),
+            }
+
+
+# ============================================
+# INSTANCIA COMPARTIDA
+# ============================================
+
+_scheduler: Optional[EmbeddingScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_embedding_scheduler() -> EmbeddingScheduler:
+    """Retorna (y arranca) el scheduler del proceso."""
+    global _scheduler
+
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                from .db_utils import encode_batch
+
+                _scheduler = EmbeddingScheduler(
+                    encode_fn=encode_batch,
+                    max_batch_size=int(os.getenv("EMBEDDING_SCHEDULER_MAX_BATCH", "32")),
+                    max_wait_ms=float(os.getenv("EMBEDDING_SCHEDULER_MAX_WAIT_MS", "5")),
+                    max_queue_size=int(os.getenv("EMBEDDING_SCHEDULER_MAX_QUEUE", "1024"))
+                ).start()
+                print("✅ Scheduler de embeddings iniciado")
+
+    return _scheduler
+
+
+def shutdown_embedding_scheduler() -> None:
+    """Detiene el scheduler del proceso si fue iniciado."""
+    global _scheduler
+
+    with _scheduler_lock:
+        if _scheduler is not None:
+            _scheduler.stop()
+            _scheduler = None
@@ -1,8 +1,10 @@
 # voia_vector_services/main.py
 from fastapi import FastAPI, Query, HTTPException, BackgroundTasks, Request, Response
+from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
 import os
 import asyncio
+import struct
 from datetime import datetime, timedelta
 import numpy as np
 
@@ -18,13 +20,22 @@ print("DB_NAME:", os.getenv("DB_NAME"))
 from voia_vector_services.process_documents import process_pending_documents # noqa
 from voia_vector_services.process_urls import process_pending_urls # noqa
 from voia_vector_services.process_custom_texts import process_pending_custom_texts # noqa
-from voia_vector_services.search_vectors import search_vectors # noqa
+from voia_vector_services.search_vectors import asearch_vectors, shutdown_search_executor # noqa
 from voia_vector_services.sync_qdrant_mysql import validate_bot_endpoint, sync_bot_endpoint, sync_all_bots_endpoint # noqa
 from voia_vector_services.rate_limiting import limiter, setup_rate_limiting, LIMITS # noqa
 from voia_vector_services.snapshot_manager import SnapshotManager # noqa
 from voia_vector_services.sync_manager import QdrantMySQLSynchronizer # noqa
 from voia_vector_services.recovery_manager import RecoveryManager # noqa
-from voia_vector_services.embedder import get_embedding
+from voia_vector_services.service_registry import warm_up, readiness, get_qdrant_client, close_async_qdrant_client # noqa
+from voia_vector_services.vector_store import COLLECTION_NAME # noqa
+from voia_vector_services.cleanup_qdrant import forget_collection_chunks # noqa
+from voia_vector_services.payload_indexes import payload_index_status # noqa
+from voia_vector_services.db_utils import get_embedding_cache_stats, get_embedding_batching_stats, encode_batch # noqa
+from voia_vector_services.embedding_scheduler import get_embedding_scheduler, shutdown_embedding_scheduler # noqa
+from voia_vector_services.embedding_pool import get_embedding_pool_stats, shutdown_embedding_pool # noqa
+from voia_vector_services.query_embedding_cache import get_query_embedding_cache_stats # noqa
+from voia_vector_services.near_duplicates import get_near_duplicate_stats # noqa
+from voia_vector_services.semantic_tags import get_semantic_tagger_stats # noqa
 
 from pydantic import BaseModel
 
@@ -135,6 +146,10 @@ async def automatic_sync_worker():
 async def startup_event():
     """Inicia tasks asincrónicas al startup de la app."""
     print("\n🚀 Iniciando Voia Vector Services...")
+
+    # Precargar modelo, Qdrant y MySQL sin bloquear el arranque del servidor
+    if os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true":
+        asyncio.create_task(asyncio.to_thread(warm_up))
     print("📊 Estado de Persistencia y Recuperación:")
     
     # Mostrar estado de recuperación
@@ -152,6 +167,14 @@ async def startup_event():
         asyncio.create_task(automatic_sync_worker())
         print("   ✅ Sincronización automática habilitada")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Libera recursos del proceso al apagar la app."""
+    shutdown_search_executor()
+    shutdown_embedding_scheduler()
+    shutdown_embedding_pool()
+    await close_async_qdrant_client()
+
 # Endpoints existentes
 @app.get("/process_all")
 @limiter.limit(LIMITS["process_all"])
@@ -200,12 +223,14 @@ def process_texts_endpoint(request: Request, bot_id: int = Query(..., descriptio
 # 🔹 Endpoint para búsqueda de vectores (NUEVO, para el chat dinámico)
 @app.post("/search")
 @limiter.limit(LIMITS["search"])
-def search_vectors_endpoint(request, req: SearchRequest):
+async def search_vectors_endpoint(request, req: SearchRequest):
     """
     Busca vectores en Qdrant asociados a un bot dado y un query opcional.
     """
     try:
-        results = search_vectors(bot_id=req.bot_id, query=req.query, limit=req.limit)
+        # ✅ Embedding desde el caché de consultas; los misses concurrentes se agrupan.
+        # Qdrant se consulta con el cliente async: no ocupa un hilo mientras espera
+        results = await asearch_vectors(bot_id=req.bot_id, query=req.query, limit=req.limit)
         return {"results": results}
     except Exception as e:
         print(f"❌ Error en el endpoint /search: {e}")
@@ -215,7 +240,7 @@ def search_vectors_endpoint(request, req: SearchRequest):
 # 🔹 Endpoint de búsqueda de vectores (ANTIGUO, restaurado para compatibilidad)
 @app.get("/search_vectors")
 @limiter.limit(LIMITS["search"])
-def search_vectors_get_endpoint(request,
+async def search_vectors_get_endpoint(request,
     bot_id: int = Query(..., description="ID del bot"),
     query: str = Query("", description="Texto de búsqueda opcional"),
     limit: int = Query(5, description="Cantidad máxima de resultados")
@@ -224,7 +249,7 @@ def search_vectors_get_endpoint(request,
     Busca vectores en Qdrant. Mantenido por compatibilidad con flujos existentes.
     """
     try:
-        results = search_vectors(bot_id=bot_id, query=query, limit=limit)
+        results = await asearch_vectors(bot_id=bot_id, query=query, limit=limit)
         return results
     except Exception as e:
         print(f"❌ Error en el endpoint /search_vectors: {e}")
@@ -310,10 +335,8 @@ def cleanup_qdrant():
     Use solo si hay errores persistentes de lectura en Qdrant.
     """
     try:
-        from qdrant_client import QdrantClient
-        
-        client = QdrantClient(host="localhost", port=6333)
-        collection_name = "voia_vectors"
+        client = get_qdrant_client()
+        collection_name = COLLECTION_NAME
         
         print("🧹 Limpiando colección Qdrant...")
         
@@ -361,6 +384,10 @@ def cleanup_qdrant():
                 print(f"   ⚠️ Error en lote: {str(batch_error)[:80]}")
                 break
         
+        # Sin sus puntos, los chunks registrados deben vectorizarse de nuevo
+        if deleted_total:
+            forget_collection_chunks(collection_name)
+        
         # Verificar resultado
         collection_info = client.get_collection(collection_name)
         final_count = collection_info.points_count
@@ -387,12 +414,11 @@ def diagnose_qdrant():
     - Total de puntos en la colección
     - Puntos sin bot_id
     - Vectores con problemas
+    - Estado de los índices de payload
     """
     try:
-        from qdrant_client import QdrantClient
-        
-        client = QdrantClient(host="localhost", port=6333)
-        collection_name = "voia_vectors"
+        client = get_qdrant_client()
+        collection_name = COLLECTION_NAME
         
         # Obtener info de colección
         collection_info = client.get_collection(collection_name)
@@ -432,6 +458,7 @@ def diagnose_qdrant():
                 "total_points": points_count,
                 "points_sampled": points_processed,
                 "points_without_bot_id": len(problematic_points),
+                "payload_indexes": payload_index_status(client, collection_name),
                 "recommendation": f"Ejecutar /cleanup-qdrant para limpiar" if problematic_points else "Colección OK"
             }
         
@@ -712,11 +739,121 @@ def health_persistence_endpoint(request):
             "error": str(e)
         }
 
+@app.get("/health/ready")
+def health_ready_endpoint():
+    """Readiness: 200 solo cuando modelo, Qdrant y MySQL están calientes."""
+    status = readiness()
+    return JSONResponse(content=status, status_code=200 if status["ready"] else 503)
+
+@app.get("/embedding/stats")
+def embedding_stats_endpoint():
+    """Estadísticas del pipeline de embeddings (cachés, micro-batching, pool, casi-duplicados y etiquetado semántico)."""
+    return {
+        "cache": get_embedding_cache_stats(),
+        "query_cache": get_query_embedding_cache_stats(),
+        "batching": get_embedding_batching_stats(),
+        "scheduler": get_embedding_scheduler().get_stats(),
+        "pool": get_embedding_pool_stats(),
+        "near_duplicates": get_near_duplicate_stats(),
+        "semantic_tags": get_semantic_tagger_stats()
+    }
+
 @app.post("/embed")
 async def embed_endpoint(request: Request):
     text = await request.body()
     text_str = text.decode("utf-8")
-    vector = get_embedding(text_str)
+    vector = await get_embedding_scheduler().aembed(text_str)
     arr = np.array(vector, dtype=np.float32)
     return Response(content=arr.tobytes(), media_type="application/octet-stream")
 
+
+
+# ============================================================
+# EMBEDDINGS EN LOTE (cliente C#)
+# ============================================================
+
+# Tipo de contenido para textos con prefijo de longitud: [uint32 LE len][utf-8]...
+LENGTH_PREFIXED_MEDIA_TYPE = "application/x-voia-texts"
+EMBED_BATCH_MAX_TEXTS = int(os.getenv("EMBED_BATCH_MAX_TEXTS", "1024"))
+
+
+def _parse_embed_batch_body(body: bytes, content_type: str) -> list:
+    """
+    Extrae la lista de textos del body de /embed/batch.
+
+    - text/plain (default): un texto por línea
+    - application/x-voia-texts: secuencia de [uint32 little-endian longitud][bytes utf-8]
+    """
+    if content_type.startswith(LENGTH_PREFIXED_MEDIA_TYPE):
+        texts = []
+        offset = 0
+        while offset < len(body):
+            if offset + 4 > len(body):
+                raise ValueError("Prefijo de longitud incompleto")
+            (length,) = struct.unpack_from("<I", body, offset)
+            offset += 4
+            if offset + length > len(body):
+                raise ValueError("Texto truncado en el body")
+            texts.append(body[offset:offset + length].decode("utf-8"))
+            offset += length
+        return texts
+
+    lines = body.decode("utf-8").split("\n")
+    if lines and lines[-1] == "":
+        lines.pop()
+    return [line.rstrip("\r") for line in lines]
+
+
+def _pack_embedding_matrix(vectors: list, dtype) -> bytes:
+    """
+    Serializa la matriz de embeddings: header <uint32 filas, uint32 columnas,
+    uint32 bytes por valor> (little-endian) seguido de los valores row-major.
+    """
+    matrix = np.ascontiguousarray(vectors, dtype=np.dtype(dtype).newbyteorder("<"))
+    rows, dims = matrix.shape
+    return struct.pack("<III", rows, dims, matrix.itemsize) + matrix.tobytes()
+
+
+@app.post("/embed/batch")
+async def embed_batch_endpoint(request: Request, dtype: str = Query(None, description="float32 (default) o float16")):
+    """
+    Vectoriza muchos textos en un solo round trip (forward passes de EMBEDDING_BATCH_SIZE textos).
+
+    Body: textos separados por salto de línea (text/plain) o con prefijo de
+    longitud (application/x-voia-texts).
+    Respuesta: matriz float32 (o float16 si dtype=float16 o
+    Accept: application/x-float16) precedida por un header de 12 bytes
+    <filas, columnas, bytes por valor>.
+    """
+    content_type = request.headers.get("content-type", "text/plain").lower()
+    accept = request.headers.get("accept", "").lower()
+    requested = (dtype or ("float16" if "application/x-float16" in accept else "float32")).lower()
+
+    if requested not in ("float32", "float16"):
+        raise HTTPException(status_code=406, detail=f"dtype no soportado: {requested}")
+
+    try:
+        texts = _parse_embed_batch_body(await request.body(), content_type)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Body inválido: {e}")
+
+    if len(texts) > EMBED_BATCH_MAX_TEXTS:
+        raise HTTPException(status_code=413, detail=f"Máximo {EMBED_BATCH_MAX_TEXTS} textos por solicitud")
+
+    try:
+        vectors = await asyncio.to_thread(encode_batch, texts) if texts else []
+    except Exception as e:
+        print(f"❌ Error en /embed/batch: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    dims = len(vectors[0]) if vectors else 384
+    np_dtype = np.float16 if requested == "float16" else np.float32
+    return Response(
+        content=_pack_embedding_matrix(vectors or np.empty((0, dims)), np_dtype),
+        media_type="application/x-float16" if requested == "float16" else "application/octet-stream",
+        headers={
+            "X-Embedding-Rows": str(len(texts)),
+            "X-Embedding-Dims": str(dims),
+            "X-Embedding-Dtype": requested,
+        }
+    )
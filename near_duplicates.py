@@ -0,0 +1,280 @@
+"""
+Índice de casi-duplicados por bot (SimHash con bandas).
+
+Los sitios scrapeados repiten headers, footers, menús y banners de cookies
+en cada página; cada copia terminaba como un vector más en voia_vectors.
+Antes de vectorizar, cada chunk se compara contra todo lo ya indexado para
+el mismo bot y se omite si es casi idéntico.
+
+Funcionalidades:
+- SimHash de 64 bits sobre shingles de 3 palabras
+- Búsqueda por bandas: con distancia máxima k se usan k+1 bandas, y dos
+  huellas a distancia <= k comparten al menos una banda exacta
+- Huellas en MySQL junto a cada chunk (vector_chunks.simhash): se borran con
+  sus chunks en cualquier limpieza y son las mismas en todas las réplicas
+- Métricas: chunks omitidos y tiempo de embedding ahorrado (estimado)
+"""
+
+import hashlib
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_BIT_POSITIONS = np.arange(64, dtype=np.uint64)
+
+
+def simhash(text: str) -> int:
+    """Huella SimHash de 64 bits del texto (shingles de 3 palabras, minúsculas)."""
+    words = _WORD.findall(text.lower())
+    if not words:
+        return 0
+    shingles = [" ".join(words[i:i + 3]) for i in range(max(1, len(words) - 2))]
+    hashes = np.fromiter(
+        (
+            int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little")
+            for s in shingles
+        ),
+        dtype=np.uint64,
+        count=len(shingles)
+    )
+    ones = ((hashes[:, None] >> _BIT_POSITIONS) & np.uint64(1)).sum(axis=0)
+    fingerprint = 0
+    for bit in np.nonzero(ones * 2 > len(shingles))[0]:
+        fingerprint |= 1 << int(bit)
+    return fingerprint
+
+
+def _to_signed(value: int) -> int:
+    """vector_chunks.simhash es BIGINT con signo."""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def _to_unsigned(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+class _BotIndex:
+    """Huellas de un bot en memoria, organizadas por bandas."""
+
+    def __init__(self, bands: List[Tuple[int, int]]):
+        self.bands = bands
+        self.tables: List[Dict[int, List[int]]] = [{} for _ in bands]
+        self.documents: Dict[Tuple[str, int], List[int]] = {}
+        self.size = 0
+
+    def add(self, fingerprint: int, document: Tuple[str, int]) -> None:
+        for table, (shift, mask) in zip(self.tables, self.bands):
+            table.setdefault((fingerprint >> shift) & mask, []).append(fingerprint)
+        self.documents.setdefault(document, []).append(fingerprint)
+        self.size += 1
+
+    def find(self, fingerprint: int, max_distance: int) -> bool:
+        for table, (shift, mask) in zip(self.tables, self.bands):
+            for candidate in table.get((fingerprint >> shift) & mask, ()):
+                if (candidate ^ fingerprint).bit_count() <= max_distance:
+                    return True
+        return False
+
+    def remove_document(self, document: Tuple[str, int]) -> int:
+        fingerprints = self.documents.pop(document, [])
+        for fingerprint in fingerprints:
+            for table, (shift, mask) in zip(self.tables, self.bands):
+                key = (fingerprint >> shift) & mask
+                bucket = table.get(key)
+                if bucket:
+                    bucket.remove(fingerprint)
+                    if not bucket:
+                        del table[key]
+        self.size -= len(fingerprints)
+        return len(fingerprints)
+
+
+class NearDuplicateIndex:
+    """
+    Índice de casi-duplicados de todos los bots.
+
+    Las huellas se guardan en MySQL junto a cada chunk (vector_chunks.simhash):
+    borrar los chunks de un documento, de un bot o de una colección borra sus
+    huellas, y todas las réplicas ven lo mismo. En memoria se mantiene un
+    índice por bandas por bot, que se recarga al inicio de cada lote.
+
+    Uso:
+        index = NearDuplicateIndex()
+        index.load_bot(conn, bot_id)
+        keep, fingerprints = index.filter_chunks(bot_id, "url", url_id, chunks)
+    """
+
+    def __init__(self, max_distance: int = 3):
+        """
+        Args:
+            max_distance: Distancia de Hamming máxima (de 64 bits) para considerar
+                          dos chunks casi idénticos (3 ≈ 95% de similitud)
+        """
+        self.max_distance = max_distance
+
+        band_count = max_distance + 1
+        width = 64 // band_count
+        self.bands = [
+            (i * width, (1 << (width if i < band_count - 1 else 64 - i * width)) - 1)
+            for i in range(band_count)
+        ]
+
+        self._lock = threading.Lock()
+        self._bots: Dict[int, _BotIndex] = {}
+
+        self.stats = {
+            "chunks_checked": 0,
+            "chunks_skipped": 0,
+            "embedded_chunks": 0,
+            "embedding_seconds": 0.0,
+            "bot_loads": 0,
+        }
+
+    def load_bot(self, conn, bot_id: int, reload: bool = True) -> None:
+        """
+        Carga las huellas del bot desde vector_chunks (reload=False: solo si
+        no está en memoria). Los chunks indexados antes de guardar huellas
+        reciben la suya aquí, a partir de chunk_text.
+        """
+        with self._lock:
+            if not reload and bot_id in self._bots:
+                return
+
+            cursor = conn.cursor()
+            try:
+                cursor.execute(
+                    "SELECT id, chunk_text FROM vector_chunks "
+                    "WHERE bot_id = %s AND simhash IS NULL AND chunk_text IS NOT NULL",
+                    (bot_id,)
+                )
+                backfill = [(_to_signed(simhash(text)), row_id) for row_id, text in cursor.fetchall()]
+                if backfill:
+                    cursor.executemany("UPDATE vector_chunks SET simhash = %s WHERE id = %s", backfill)
+                    conn.commit()
+
+                cursor.execute(
+                    "SELECT source, doc_id, simhash FROM vector_chunks "
+                    "WHERE bot_id = %s AND simhash IS NOT NULL",
+                    (bot_id,)
+                )
+                index = _BotIndex(self.bands)
+                for source, doc_id, fingerprint in cursor.fetchall():
+                    index.add(_to_unsigned(fingerprint), (source, doc_id))
+            finally:
+                cursor.close()
+
+            self._bots[bot_id] = index
+            self.stats["bot_loads"] += 1
+
+    def filter_chunks(
+        self,
+        bot_id: int,
+        source: str,
+        doc_id: int,
+        chunks: List[str]
+    ) -> Tuple[List[int], List[int]]:
+        """
+        Retorna los índices de los chunks que NO son casi-duplicados de algo ya
+        indexado para el bot (ni de un chunk anterior del mismo lote) y sus
+        huellas (en el formato de vector_chunks.simhash). El bot debe estar
+        cargado (load_bot); sus huellas quedan en memoria bajo (source, doc_id).
+        """
+        fingerprints = [simhash(chunk) for chunk in chunks]
+        keep, kept = [], []
+
+        with self._lock:
+            index = self._bots.setdefault(bot_id, _BotIndex(self.bands))
+            for i, fingerprint in enumerate(fingerprints):
+                if index.find(fingerprint, self.max_distance):
+                    continue
+                index.add(fingerprint, (source, doc_id))
+                keep.append(i)
+                kept.append(_to_signed(fingerprint))
+
+            self.stats["chunks_checked"] += len(chunks)
+            self.stats["chunks_skipped"] += len(chunks) - len(keep)
+
+        return keep, kept
+
+    def forget_document(self, bot_id: int, source: str, doc_id: int) -> int:
+        """
+        Saca de memoria las huellas de un documento (antes de re-indexarlo o si
+        falló). En MySQL se reemplazan junto con sus chunks.
+        """
+        with self._lock:
+            index = self._bots.get(bot_id)
+            return index.remove_document((source, doc_id)) if index is not None else 0
+
+    def forget_bots(self, bot_ids: Optional[List[int]] = None) -> None:
+        """Descarta el índice en memoria de los bots (todos si es None); se recarga al usarlo."""
+        with self._lock:
+            if bot_ids is None:
+                self._bots.clear()
+            for bot_id in bot_ids or []:
+                self._bots.pop(bot_id, None)
+
+    def record_embedding_time(self, chunks: int, seconds: float) -> None:
+        """Registra el costo de vectorizar (base para estimar el tiempo ahorrado)."""
+        with self._lock:
+            self.stats["embedded_chunks"] += chunks
+            self.stats["embedding_seconds"] += seconds
+
+    def get_stats(self) -> Dict:
+        """Retorna estadísticas del índice."""
+        with self._lock:
+            embedded = self.stats["embedded_chunks"]
+            per_chunk = self.stats["embedding_seconds"] / embedded if embedded else 0.0
+            return {
+                "storage": "mysql:vector_chunks.simhash",
+                "max_distance": self.max_distance,
+                "bots_loaded": len(self._bots),
+                "fingerprints_loaded": sum(index.size for index in self._bots.values()),
+                "vectors_saved": self.stats["chunks_skipped"],
+                "embedding_seconds_saved": round(self.stats["chunks_skipped"] * per_chunk, 2),
+                **self.stats,
+                "embedding_seconds": round(self.stats["embedding_seconds"], 2),
+            }
+
+
+# ============================================
+# INSTANCIA COMPARTIDA
+# ============================================
+
+_index: Optional[NearDuplicateIndex] = None
+_index_failed = False
+_index_lock = threading.Lock()
+
+
+def get_near_duplicate_index() -> Optional[NearDuplicateIndex]:
+    """
+    Retorna el índice del proceso (None si NEAR_DUP_ENABLED=false).
+    """
+    global _index, _index_failed
+
+    if _index_failed or os.getenv("NEAR_DUP_ENABLED", "true").lower() != "true":
+        return None
+
+    if _index is None:
+        with _index_lock:
+            if _index is None and not _index_failed:
+                try:
+                    _index = NearDuplicateIndex(
+                        max_distance=int(os.getenv("NEAR_DUP_MAX_DISTANCE", "3"))
+                    )
+                    print("✅ Índice de casi-duplicados listo")
+                except Exception as e:
+                    print(f"⚠️ Índice de casi-duplicados no disponible: {e}")
+                    _index_failed = True
+                    return None
+
+    return _index
+
+
+def get_near_duplicate_stats() -> Optional[Dict]:
+    """Estadísticas del índice de casi-duplicados (None si está deshabilitado)."""
+    index = get_near_duplicate_index()
+    return index.get_stats() if index is not None else None
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+🗂️ ÍNDICES DE PAYLOAD: Declaración y migración de los índices de Qdrant.
+
+Sin índice de payload, una búsqueda filtrada por bot_id revisa el payload de
+cada candidato durante el recorrido del HNSW. Con el índice, Qdrant resuelve
+el filtro antes (o planifica la búsqueda con su cardinalidad), lo que en
+colecciones grandes con muchos bots reduce la latencia de forma drástica.
+
+PAYLOAD_INDEXES declara el esquema esperado. ensure_payload_indexes() crea
+los que faltan y reemplaza los que tienen otro tipo; se ejecuta al iniciar
+(get_or_create_vector_store) y como migración manual sobre colecciones
+existentes, que indexan sus puntos actuales al crear el índice.
+
+Uso:
+    python -m voia_vector_services.payload_indexes [--dry-run]
+"""
+
+from typing import Dict, Union
+
+from qdrant_client.models import KeywordIndexParams, KeywordIndexType, PayloadSchemaType
+
+from .tag_inference import TAG_FIELDS
+
+# Campo -> tipo de índice (o parámetros, si el índice lleva opciones)
+PAYLOAD_INDEXES: Dict[str, Union[PayloadSchemaType, KeywordIndexParams]] = {
+    # Filtros de búsqueda y sincronización
+    "bot_id": PayloadSchemaType.INTEGER,
+    # Tenant (QDRANT_TENANCY=tenant): Qdrant agrupa en disco los puntos de cada bot
+    "tenant_id": KeywordIndexParams(type=KeywordIndexType.KEYWORD, is_tenant=True),
+    "doc_id": PayloadSchemaType.INTEGER,
+    "bot_template_id": PayloadSchemaType.INTEGER,
+    "source": PayloadSchemaType.KEYWORD,
+    "content_hash": PayloadSchemaType.KEYWORD,
+    # Re-etiquetado y migración de payloads (filtran por versión)
+    "taxonomy_version": PayloadSchemaType.INTEGER,
+    "payload_version": PayloadSchemaType.INTEGER,
+    # Etiquetas
+    **{field: PayloadSchemaType.KEYWORD for field in TAG_FIELDS},
+    "requiere_firma": PayloadSchemaType.BOOL,
+}
+
+
+def _current_schema(client, collection_name: str) -> Dict:
+    """Índices existentes: campo -> PayloadIndexInfo."""
+    return client.get_collection(collection_name).payload_schema or {}
+
+
+def _schema_type(info) -> str:
+    data_type = getattr(info, "data_type", None)
+    return getattr(data_type, "value", data_type)
+
+
+def _expected_type(schema) -> str:
+    data_type = getattr(schema, "type", schema)
+    return getattr(data_type, "value", data_type)
+
+
+def _is_tenant(params) -> bool:
+    return bool(getattr(params, "is_tenant", False))
+
+
+def payload_index_status(client, collection_name: str) -> Dict:
+    """
+    Estado de cada índice declarado frente al de la colección.
+
+    Returns:
+        dict con un estado por campo (ok | missing | mismatch) y los índices
+        existentes que no están declarados
+    """
+    schema = _current_schema(client, collection_name)
+    fields = {}
+    for field, expected in PAYLOAD_INDEXES.items():
+        info = schema.get(field)
+        current = _schema_type(info) if info is not None else None
+        if current is None:
+            status = "missing"
+        elif current != _expected_type(expected) or _is_tenant(info.params) != _is_tenant(expected):
+            status = "mismatch"
+        else:
+            status = "ok"
+        fields[field] = {
+            "expected": _expected_type(expected),
+            "current": current,
+            "indexed_points": getattr(info, "points", None),
+            "status": status,
+        }
+
+    return {
+        "collection": collection_name,
+        "ready": all(f["status"] == "ok" for f in fields.values()),
+        "fields": fields,
+        "undeclared": sorted(set(schema) - set(PAYLOAD_INDEXES)),
+    }
+
+
+def ensure_payload_indexes(
+    client,
+    collection_name: str,
+    wait: bool = False,
+    dry_run: bool = False
+) -> Dict:
+    """
+    Crea los índices faltantes y recrea los de tipo distinto al declarado.
+
+    Args:
+        client: Cliente Qdrant
+        collection_name: Colección a migrar
+        wait: Esperar a que Qdrant aplique cada cambio (default: en segundo plano)
+        dry_run: Solo reportar los cambios
+
+    Returns:
+        dict con los campos creados y recreados, y el estado resultante
+    """
+    report = {"created": [], "recreated": [], "dry_run": dry_run}
+
+    status = payload_index_status(client, collection_name)
+    for field, info in status["fields"].items():
+        if info["status"] == "ok":
+            continue
+
+        if info["status"] == "mismatch":
+            print(f"🔄 Índice '{field}': {info['current']} -> {info['expected']}")
+            if not dry_run:
+                client.delete_payload_index(collection_name=collection_name, field_name=field, wait=True)
+            report["recreated"].append(field)
+        else:
+            print(f"🆕 Índice '{field}' ({info['expected']})")
+            report["created"].append(field)
+
+        if not dry_run:
+            client.create_payload_index(
+                collection_name=collection_name,
+                field_name=field,
+                field_schema=PAYLOAD_INDEXES[field],
+                wait=wait
+            )
+
+    report["status"] = payload_index_status(client, collection_name) if not dry_run else status
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    from .service_registry import get_qdrant_client
+    from .vector_store import tenant_collections
+
+    parser = argparse.ArgumentParser(description="Crea o migra los índices de payload de Qdrant")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    client = get_qdrant_client()
+    print(json.dumps({
+        collection_name: ensure_payload_indexes(client, collection_name, wait=True, dry_run=args.dry_run)
+        for collection_name in tenant_collections()
+        if client.collection_exists(collection_name)
+    }, indent=2))
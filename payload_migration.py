@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+📦 MIGRACIÓN DE PAYLOADS: Esquema compacto (vector_store.PAYLOAD_VERSION).
+
+Los puntos indexados antes del esquema compacto llevan en el payload el
+texto del chunk (original_text), timestamps, estado y metadata que no se
+filtra. La migración, una sola vez:
+1. Recupera el texto completo de cada chunk re-chunkeando el documento
+   original: por chunk_hash (puntos con hash, chunker actual) o con el
+   splitter original (split_into_chunks de 512/50 previo al streaming)
+   por chunk_number, verificando original_text y text_length
+2. Lo guarda en vector_chunks.chunk_text
+3. Reemplaza el payload por el compacto (overwrite, sin tocar el vector)
+
+Los puntos cuyo texto no se puede recuperar completo (documento borrado,
+chunk más allá de los 10000 caracteres guardados en extracted_text) o no
+se puede guardar en vector_chunks (sin bot_id/source/doc_id) se dejan con
+su payload anterior y se reportan: la búsqueda los sigue mostrando con su
+original_text.
+
+Reporta la memoria residente de Qdrant (memory_resident_bytes de /metrics)
+antes y después. Qdrant libera la memoria de los payloads viejos a medida
+que el optimizador compacta los segmentos, así que la cifra final puede
+seguir bajando unos minutos después.
+
+Uso:
+    python -m voia_vector_services.payload_migration [--bot-id N] [--dry-run]
+"""
+
+import re
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+import requests
+from qdrant_client.models import (
+    FieldCondition, Filter, MatchValue, OverwritePayloadOperation, SetPayload
+)
+
+from .chunk_index import ensure_chunk_table, load_document_source
+from .db_utils import get_connection
+from .embedding_cache import chunk_hash
+from .service_registry import get_qdrant_client, qdrant_client_settings
+from .text_chunking import iter_chunk_windows
+from .vector_store import PAYLOAD_VERSION, compact_payload, tenant_collections, tenant_route
+
+# Documentos re-chunkeados que se conservan en memoria durante el recorrido
+_DOCUMENT_CACHE_SIZE = 64
+# Caracteres de original_text en los payloads anteriores
+_LEGACY_PREVIEW_CHARS = 500
+# extracted_text de documentos y URLs se guardaba recortado a este largo
+_SOURCE_TEXT_LIMIT = 10000
+
+
+def qdrant_resident_bytes() -> Optional[int]:
+    """memory_resident_bytes del endpoint /metrics de Qdrant (None si no responde)."""
+    settings = qdrant_client_settings()
+    base_url = settings.get("url") or f"http://{settings['host']}:{settings['port']}"
+    headers = {"api-key": settings["api_key"]} if settings.get("api_key") else {}
+    try:
+        response = requests.get(f"{base_url.rstrip('/')}/metrics", headers=headers, timeout=10)
+        response.raise_for_status()
+    except Exception as e:
+        print(f"⚠️ No se pudo leer /metrics de Qdrant: {e}")
+        return None
+
+    for line in response.text.splitlines():
+        if line.startswith("memory_resident_bytes"):
+            return int(float(line.split()[-1]))
+    return None
+
+
+def _legacy_filter(bot_id: Optional[int]) -> Filter:
+    must = [FieldCondition(key="bot_id", match=MatchValue(value=bot_id))] if bot_id is not None else []
+    return Filter(
+        must=must,
+        must_not=[FieldCondition(key="payload_version", match=MatchValue(value=PAYLOAD_VERSION))]
+    )
+
+
+def _legacy_split(text: str, chunk_size: int = 512) -> List[str]:
+    """
+    Chunks exactamente como los generaba la indexación original
+    (split_into_chunks sentence-aware de 512 caracteres, antes del chunker
+    en streaming): el nuevo no produce los mismos límites.
+    """
+    if len(text) <= chunk_size:
+        return [text.strip()]
+
+    chunks = []
+    current_chunk = ""
+    for sentence in re.split(r'(?<=[.!?])\s+', text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if len(current_chunk) + len(sentence) + 1 > chunk_size and current_chunk:
+            chunks.append(current_chunk.strip())
+            current_chunk = " ".join(current_chunk.split()[-5:]) + " " + sentence
+        else:
+            current_chunk += " " + sentence if current_chunk else sentence
+    if current_chunk.strip():
+        chunks.append(current_chunk.strip())
+    return chunks
+
+
+def _document_chunks(cursor, source: str, doc_id) -> Optional[Dict]:
+    """Documento original re-chunkeado con el chunker actual y con el original."""
+    row = load_document_source(cursor, source, doc_id)
+    if row is None:
+        return None
+    # custom_text se indexaba con strip(); extracted_text ya se guardaba así (URLs) o sin él (documentos)
+    text = row["text"].strip() if source == "custom_text" else row["text"]
+    legacy = _legacy_split(text)
+    current = [chunk for chunks, _ in iter_chunk_windows(text) for chunk in chunks] if text else []
+    return {
+        "by_hash": {chunk_hash(chunk): chunk for chunk in [*legacy, *current]},
+        "legacy": legacy,
+        # El último chunk de un texto recortado no es el que se indexó
+        "truncated": source != "custom_text" and len(row["text"]) >= _SOURCE_TEXT_LIMIT,
+    }
+
+
+def _recover_text(payload: Dict, document: Optional[Dict]) -> Optional[str]:
+    """Texto completo del chunk del punto, o None si no se puede garantizar."""
+    preview = payload.get("original_text") or ""
+    length = payload.get("text_length")
+
+    if document is not None:
+        text = document["by_hash"].get(payload.get("chunk_hash"))
+        if text is not None:
+            return text
+
+        legacy = document["legacy"]
+        number = payload.get("chunk_number")
+        if isinstance(number, int) and 1 <= number <= len(legacy):
+            candidate = legacy[number - 1]
+            complete = len(candidate) == length if length is not None else (
+                not document["truncated"] or number < len(legacy)
+            )
+            if complete and candidate[:_LEGACY_PREVIEW_CHARS] == preview:
+                return candidate
+
+    # Chunks cortos: original_text ya es el texto completo
+    if preview and length is not None and len(preview) == length:
+        return preview
+    return None
+
+
+def _save_chunk_texts(conn, rows: List[Tuple]) -> Set[str]:
+    """
+    Guarda el texto de cada punto; crea la fila si el punto no estaba
+    registrado. Retorna los puntos cuyo texto quedó en vector_chunks.
+    """
+    cursor = conn.cursor()
+    try:
+        ids = [row[5] for row in rows]
+        cursor.execute(
+            f"SELECT qdrant_id FROM vector_chunks WHERE qdrant_id IN ({', '.join(['%s'] * len(ids))})",
+            ids
+        )
+        registered = {qdrant_id for (qdrant_id,) in cursor.fetchall()}
+
+        updates = [(row[6], row[5]) for row in rows if row[5] in registered]
+        # Puntos sin identificadores del documento no se registran (los detecta sync)
+        inserts = [row for row in rows if row[5] not in registered and None not in row[:3]]
+        if updates:
+            cursor.executemany("UPDATE vector_chunks SET chunk_text = %s WHERE qdrant_id = %s", updates)
+        if inserts:
+            cursor.executemany("""
+                INSERT INTO vector_chunks (bot_id, source, doc_id, chunk_number, chunk_hash, qdrant_id, chunk_text)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+            """, inserts)
+        conn.commit()
+        return registered | {row[5] for row in inserts}
+    finally:
+        cursor.close()
+
+
+def migrate_payloads(
+    bot_id: Optional[int] = None,
+    batch_size: int = 256,
+    dry_run: bool = False
+) -> Dict:
+    """
+    Migra los puntos con payload anterior al esquema compacto.
+
+    Args:
+        bot_id: Limitar a un bot (default: todas las colecciones)
+        batch_size: Puntos por página de scroll
+        dry_run: Solo contar, sin escribir
+
+    Returns:
+        dict con los puntos migrados, los textos recuperados completos y
+        la memoria residente de Qdrant antes y después
+    """
+    client = get_qdrant_client()
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    ensure_chunk_table(conn)
+
+    documents: "OrderedDict[Tuple, Optional[Dict]]" = OrderedDict()
+    report = {
+        "payload_version": PAYLOAD_VERSION,
+        "points_migrated": 0,
+        "full_text": 0,
+        "unrecovered": 0,
+        "unrecovered_points": [],
+        "unsaved": 0,
+        "unsaved_points": [],
+        "dry_run": dry_run,
+        "qdrant_resident_bytes_before": qdrant_resident_bytes(),
+    }
+    print(f"📦 Migrando payloads al esquema v{PAYLOAD_VERSION}...")
+
+    collections = [tenant_route(bot_id).collection_name] if bot_id is not None else [
+        name for name in tenant_collections() if client.collection_exists(name)
+    ]
+
+    try:
+        for collection_name in collections:
+            offset = None
+            while True:
+                points, offset = client.scroll(
+                    collection_name=collection_name,
+                    scroll_filter=_legacy_filter(bot_id),
+                    limit=batch_size,
+                    offset=offset,
+                    with_payload=True,
+                    with_vectors=False
+                )
+                if not points:
+                    break
+
+                rows, operations = [], {}
+                for point in points:
+                    payload = point.payload or {}
+                    key = (payload.get("source"), payload.get("doc_id"))
+
+                    if key in documents:
+                        documents.move_to_end(key)
+                    else:
+                        documents[key] = _document_chunks(cursor, *key)
+                        if len(documents) > _DOCUMENT_CACHE_SIZE:
+                            documents.popitem(last=False)
+
+                    text = _recover_text(payload, documents[key])
+                    if text is None:
+                        # Sin el texto completo, el punto conserva su payload (y su original_text)
+                        report["unrecovered"] += 1
+                        if len(report["unrecovered_points"]) < 100:
+                            report["unrecovered_points"].append(str(point.id))
+                        continue
+                    report["full_text"] += 1
+
+                    rows.append((
+                        payload.get("bot_id"), payload.get("source"), payload.get("doc_id"),
+                        payload.get("chunk_number") or 0, payload.get("chunk_hash") or chunk_hash(text),
+                        str(point.id), text
+                    ))
+                    shard_key = tenant_route(payload["bot_id"]).shard_key if payload.get("bot_id") is not None else None
+                    operations[str(point.id)] = OverwritePayloadOperation(overwrite_payload=SetPayload(
+                        payload=compact_payload(payload),
+                        points=[point.id],
+                        shard_key=shard_key
+                    ))
+
+                # Puntos sin bot_id/source/doc_id no tienen fila en vector_chunks
+                saved = {row[5] for row in rows if None not in row[:3]}
+                if not dry_run and rows:
+                    # El texto queda en MySQL antes de quitarlo del payload
+                    saved = _save_chunk_texts(conn, rows)
+                    if saved:
+                        client.batch_update_points(
+                            collection_name=collection_name,
+                            update_operations=[operations[qdrant_id] for qdrant_id in operations if qdrant_id in saved]
+                        )
+
+                unsaved = [qdrant_id for qdrant_id in operations if qdrant_id not in saved]
+                report["unsaved"] += len(unsaved)
+                report["unsaved_points"].extend(unsaved[:100 - len(report["unsaved_points"])])
+                report["points_migrated"] += len(operations) - len(unsaved)
+                print(f"   {report['points_migrated']} puntos migrados...")
+
+                if offset is None:
+                    break
+    finally:
+        cursor.close()
+        conn.close()
+
+    report["qdrant_resident_bytes_after"] = qdrant_resident_bytes()
+    before, after = report["qdrant_resident_bytes_before"], report["qdrant_resident_bytes_after"]
+    if before and after:
+        print(f"✅ Migración completa: RSS de Qdrant {before / 2**20:.0f} MB -> {after / 2**20:.0f} MB")
+    else:
+        print(f"✅ Migración completa: {report['points_migrated']} puntos")
+    if report["unrecovered"]:
+        print(
+            f"❌ {report['unrecovered']} puntos sin texto completo recuperable: conservan su payload "
+            f"anterior (re-indexar sus documentos para migrarlos)"
+        )
+    if report["unsaved"]:
+        print(
+            f"❌ {report['unsaved']} puntos sin bot_id/source/doc_id: su texto no se pudo guardar "
+            f"en vector_chunks y conservan su payload anterior"
+        )
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import sys
+
+    parser = argparse.ArgumentParser(description="Migra los payloads de Qdrant al esquema compacto")
+    parser.add_argument("--bot-id", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    result = migrate_payloads(bot_id=args.bot_id, batch_size=args.batch_size, dry_run=args.dry_run)
+    print(json.dumps(result, indent=2))
+    sys.exit(1 if result["unrecovered"] or result["unsaved"] else 0)
@@ -1,18 +1,14 @@
 import os
-import uuid
 import hashlib
-from datetime import datetime
 from PyPDF2 import PdfReader
 from pdf2image import convert_from_path
 import pytesseract
 from .db_utils import get_connection, get_embedding
 from .vector_store import get_or_create_vector_store
-from .tag_inference import infer_tags_from_payload
-from .text_chunking import split_into_chunks  # ✅ NUEVO
+from .service_registry import get_qdrant_client
+from .chunk_index import index_content_chunks, load_near_duplicates
 
 
-client = get_or_create_vector_store()
-
 def extract_text_from_pdf(path):
     try:
         reader = PdfReader(path)
@@ -44,10 +40,11 @@ def extract_text_from_pdf_with_ocr(path):
         print(f"❌ Error OCR PDF {path}: {e}")
         return ""
 
-def index_document(qdrant_id, text, metadata):
+def index_document(qdrant_id, text, metadata, vector=None):
     try:
-        vector = get_embedding(text)
-        client.upsert(
+        if vector is None:
+            vector = get_embedding(text)
+        get_qdrant_client().upsert(
             collection_name="voia_vectors",
             points=[{
                 "id": qdrant_id,
@@ -103,6 +100,9 @@ def process_pending_documents(bot_id: int):
             print(f"✅ No hay documentos pendientes para el bot {bot_id}.")
             return
 
+        client = get_or_create_vector_store()
+        near_dups = load_near_duplicates(conn, bot_id)
+
         for doc in documents:
             # ✅ SOLUTION #3: TRY-CATCH INDIVIDUAL POR DOCUMENTO
             try:
@@ -139,47 +139,38 @@ def process_pending_documents(bot_id: int):
                     conn.commit()
                     continue
 
-                # ✅ SOLUTION #4: METADATA COMPLETO - Chunking inteligente
-                chunks = split_into_chunks(content, chunk_size=512, overlap=50, sentence_aware=True)
-                print(f"   📦 Dividido en {len(chunks)} chunks")
-
-                indexed_chunk_ids = []
-                for chunk_idx, chunk in enumerate(chunks, 1):
-                    chunk_qdrant_id = str(uuid.uuid4())
-                    
-                    # ✅ Payload con METADATA COMPLETO
-                    payload = {
-                        # Identificadores
-                        "doc_id": doc['id'],
-                        "bot_id": doc['bot_id'],
-                        "user_id": doc['user_id'],
-                        "bot_template_id": doc['bot_template_id'],
-                        
-                        # Fuente y tipo
-                        "source": "document",
-                        "source_type": "pdf",
-                        "file_name": doc['file_name'],
-                        
-                        # Contenido
-                        "original_text": chunk[:500],
-                        "text_length": len(chunk),
-                        "chunk_number": chunk_idx,
-                        "total_chunks": len(chunks),
-                        
-                        # Metadata temporal
-                        "processed_at": datetime.now().isoformat(),
-                        "content_hash": content_hash,
-                        "indexed_status": "indexed",
-                        "error_message": None,
-                    }
-                    
-                    # Agregar tags inferidos
-                    tags = infer_tags_from_payload(payload, chunk)
-                    payload.update(tags)
-
-                    # Indexar chunk
-                    index_document(chunk_qdrant_id, chunk, payload)
-                    indexed_chunk_ids.append(chunk_qdrant_id)
+                # ✅ SOLUTION #4: METADATA COMPLETO - Chunking por contenido, en streaming;
+                # solo se vectorizan los chunks que cambiaron desde la última indexación
+                base_payload = {
+                    # Identificadores
+                    "doc_id": doc['id'],
+                    "bot_id": doc['bot_id'],
+                    "user_id": doc['user_id'],
+                    "bot_template_id": doc['bot_template_id'],
+
+                    # Fuente y tipo
+                    "source": "document",
+                    "source_type": "pdf",
+                    "file_name": doc['file_name'],
+
+                    # Metadata temporal
+                    "content_hash": content_hash,
+                    "indexed_status": "indexed",
+                    "error_message": None,
+                }
+                indexed = index_content_chunks(client, conn, content, base_payload, near_dups)
+
+                total_chunks = indexed["total_chunks"]
+                skipped_chunks = indexed["skipped"]
+                if skipped_chunks:
+                    print(f"   ♻️ {skipped_chunks} chunks casi-duplicados omitidos")
+                if not total_chunks and skipped_chunks:
+                    print("⏩ Todo el contenido ya está indexado para el bot, marcando como procesado (indexed=2)")
+                    cursor.execute("UPDATE uploaded_documents SET indexed = 2 WHERE id = %s", (doc['id'],))
+                    conn.commit()
+                    continue
+                if not total_chunks:
+                    raise Exception("No se generaron chunks para el contenido")
 
                 # Actualizar documento como indexado
                 cursor.execute("""
@@ -187,15 +178,17 @@ def process_pending_documents(bot_id: int):
                     SET indexed = 1, qdrant_id = %s, content_hash = %s, 
                         extracted_text = %s, chunks_count = %s
                     WHERE id = %s
-                """, (indexed_chunk_ids[0], content_hash, content[:10000], len(chunks), doc['id']))
+                """, (indexed["point_ids"][0], content_hash, content[:10000], total_chunks, doc['id']))
                 conn.commit()
                 
-                print(f"   ✅ {len(chunks)} chunks indexados")
+                print(f"   ✅ {total_chunks} chunks indexados")
                 processed_count += 1
 
             except Exception as e:
                 # ✅ SOLUTION #3: ERROR HANDLING - Marcar documento como fallido (indexed = -1)
                 error_msg = str(e)[:500]
+                if near_dups is not None:
+                    near_dups.forget_document(bot_id, "document", doc['id'])
                 print(f"❌ Error en documento {doc['id']}: {error_msg}")
                 failed_count += 1
                 
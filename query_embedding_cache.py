@@ -0,0 +1,205 @@
+"""
+Caché en memoria de embeddings de consultas con coalescing de requests.
+
+Los widgets de chat repiten muchísimo las mismas consultas ("hola",
+"precios", "horario"). Este caché evita volver a vectorizarlas:
+- LRU acotado en memoria, clave = consulta normalizada
+- Single-flight: consultas idénticas concurrentes comparten un solo cómputo
+- Métricas: hit rate, coalescing y memoria usada
+
+La normalización (minúsculas + espacios) no cambia el vector: el tokenizer
+de all-MiniLM-L6-v2 es uncased y descarta los espacios.
+"""
+
+import os
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+
+def normalize_query(query: str) -> str:
+    """Clave del caché: minúsculas y espacios colapsados."""
+    return " ".join(query.lower().split())
+
+
+class QueryEmbeddingCache:
+    """
+    LRU de embeddings de consultas con single-flight.
+
+    Uso:
+        cache = QueryEmbeddingCache(max_entries=10000)
+        vector = cache.get_or_compute("Hola", get_embedding)
+    """
+
+    def __init__(self, max_entries: int = 10000, wait_timeout: float = 30.0):
+        """
+        Args:
+            max_entries: Máximo de consultas en memoria
+            wait_timeout: Segundos que espera un request coalescido al cómputo en curso
+        """
+        self.max_entries = max_entries
+        self.wait_timeout = wait_timeout
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._memory_bytes = 0
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "errors": 0,
+            "evictions": 0,
+        }
+
+    def get_or_compute(self, query: str, compute_fn: Callable[[str], List[float]]) -> List[float]:
+        """
+        Retorna el embedding de la consulta desde el caché o calculándolo una sola vez.
+
+        Args:
+            query: Consulta del usuario
+            compute_fn: Función que vectoriza un texto (recibe la consulta normalizada)
+        """
+        key = normalize_query(query)
+
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return vector.tolist()
+
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+                self.stats["misses"] += 1
+            else:
+                self.stats["coalesced"] += 1
+
+        # ✅ Otro request ya está calculando esta consulta: esperar su resultado
+        if not leader:
+            return future.result(timeout=self.wait_timeout)
+
+        try:
+            embedding = compute_fn(key)
+        except Exception as e:
+            with self._lock:
+                self.stats["errors"] += 1
+                self._in_flight.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._store(key, np.asarray(embedding, dtype=np.float32))
+            self._in_flight.pop(key, None)
+        future.set_result(embedding)
+        return embedding
+
+    def lookup(self, query: str) -> Optional[List[float]]:
+        """Embedding en caché (None si no está; el miss no se cuenta aquí)."""
+        key = normalize_query(query)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return vector.tolist()
+
+    def _store(self, key: str, vector: np.ndarray) -> None:
+        if key in self._entries:
+            return
+        self._entries[key] = vector
+        self._memory_bytes += self._entry_size(key, vector)
+
+        while len(self._entries) > self.max_entries:
+            old_key, old_vector = self._entries.popitem(last=False)
+            self._memory_bytes -= self._entry_size(old_key, old_vector)
+            self.stats["evictions"] += 1
+
+    @staticmethod
+    def _entry_size(key: str, vector: np.ndarray) -> int:
+        return sys.getsizeof(key) + vector.nbytes
+
+    def clear(self) -> None:
+        """Vacía el caché (no afecta cómputos en curso)."""
+        with self._lock:
+            self._entries.clear()
+            self._memory_bytes = 0
+
+    def get_stats(self) -> Dict:
+        """Retorna métricas del caché."""
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"] + self.stats["coalesced"]
+            saved = self.stats["hits"] + self.stats["coalesced"]
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "in_flight": len(self._in_flight),
+                "memory_bytes": self._memory_bytes,
+                "memory_mb": round(self._memory_bytes / (1024 * 1024), 2),
+                "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+                "saved_rate": round(saved / lookups, 4) if lookups else 0.0,
+                **self.stats,
+            }
+
+
+# ============================================
+# INSTANCIA COMPARTIDA
+# ============================================
+
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "10000"))
+
+_query_cache: Optional[QueryEmbeddingCache] = None
+_query_cache_lock = threading.Lock()
+
+
+def get_query_embedding_cache() -> Optional[QueryEmbeddingCache]:
+    """Retorna el caché del proceso (None si QUERY_EMBEDDING_CACHE_SIZE=0)."""
+    global _query_cache
+
+    if QUERY_EMBEDDING_CACHE_SIZE <= 0:
+        return None
+
+    if _query_cache is None:
+        with _query_cache_lock:
+            if _query_cache is None:
+                _query_cache = QueryEmbeddingCache(max_entries=QUERY_EMBEDDING_CACHE_SIZE)
+
+    return _query_cache
+
+
+def get_query_embedding(query: str, compute_fn: Optional[Callable[[str], List[float]]] = None) -> List[float]:
+    """
+    Embedding de una consulta pasando por el LRU y el single-flight.
+
+    Args:
+        query: Consulta del usuario
+        compute_fn: Vectorizador en caso de miss (default: scheduler de micro-batching)
+    """
+    if compute_fn is None:
+        from .embedding_scheduler import get_embedding_scheduler
+
+        compute_fn = get_embedding_scheduler().embed
+
+    cache = get_query_embedding_cache()
+    if cache is None:
+        return compute_fn(query)
+    return cache.get_or_compute(query, compute_fn)
+
+
+def lookup_query_embedding(query: str) -> Optional[List[float]]:
+    """Embedding de la consulta solo si ya está en el LRU (no bloquea)."""
+    cache = get_query_embedding_cache()
+    return cache.lookup(query) if cache is not None else None
+
+
+def get_query_embedding_cache_stats() -> Optional[Dict]:
+    """Estadísticas del caché de consultas (None si está deshabilitado)."""
+    cache = get_query_embedding_cache()
+    return cache.get_stats() if cache is not None else None
@@ -48,9 +48,9 @@ class RecoveryManager:
             rpo_hours: Recovery Point Objective en horas (default: 1)
             rto_minutes: Recovery Time Objective en minutos (default: 30)
         """
-        self.client = get_or_create_vector_store()
+        self._client = None
         self.snapshot_manager = SnapshotManager(snapshots_dir=snapshots_dir)
-        self.sync_log = SyncLog()
+        self._sync_log = None
 
         self.rpo_hours = rpo_hours
         self.rto_minutes = rto_minutes
@@ -62,6 +62,20 @@ class RecoveryManager:
 
         self._init_audit_file()
 
+    @property
+    def client(self):
+        """Cliente Qdrant, resuelto al primer uso (no al instanciar)."""
+        if self._client is None:
+            self._client = get_or_create_vector_store()
+        return self._client
+
+    @property
+    def sync_log(self) -> SyncLog:
+        """Log de sincronización (abre conexión MySQL al primer uso)."""
+        if self._sync_log is None:
+            self._sync_log = SyncLog()
+        return self._sync_log
+
     def _init_audit_file(self) -> None:
         """Inicializa archivo de auditoría."""
         if not self.audit_file.exists():
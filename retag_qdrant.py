@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+🏷️ RETAG: Re-etiqueta los puntos con una versión de taxonomía anterior.
+
+Solo actualiza payloads (no re-vectoriza): recorre los puntos cuyo
+taxonomy_version no es la vigente, recalcula las etiquetas del documento
+con su texto completo (los chunks de vector_chunks en orden; extracted_text
+está recortado a 10000 caracteres) y las locales con el texto del chunk
+(vector_chunks, o original_text en payloads del esquema anterior), y las
+escribe con batch_update_points.
+
+Uso:
+    python -m voia_vector_services.retag_qdrant [--bot-id N] [--dry-run]
+"""
+
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from qdrant_client.models import (
+    DeletePayload, DeletePayloadOperation, FieldCondition, Filter, MatchValue, SetPayload, SetPayloadOperation
+)
+
+from .chunk_index import chunk_tag_fields, fetch_chunk_texts, load_document_text, stale_tag_fields
+from .db_utils import get_connection
+from .semantic_tags import get_semantic_tagger
+from .service_registry import get_qdrant_client
+from .tag_inference import DocumentTags, Taxonomy, get_taxonomy
+from .vector_store import tenant_collections, tenant_route
+
+# Documentos cuyas etiquetas se conservan en memoria durante el recorrido
+_DOCUMENT_CACHE_SIZE = 256
+
+
+def _outdated_filter(version: int, bot_id: Optional[int]) -> Filter:
+    must = [FieldCondition(key="bot_id", match=MatchValue(value=bot_id))] if bot_id is not None else []
+    return Filter(
+        must=must,
+        must_not=[FieldCondition(key="taxonomy_version", match=MatchValue(value=version))]
+    )
+
+
+def retag_outdated_points(
+    bot_id: Optional[int] = None,
+    batch_size: int = 256,
+    dry_run: bool = False
+) -> Dict:
+    """
+    Re-etiqueta los puntos con taxonomy_version distinta a la vigente.
+
+    Args:
+        bot_id: Limitar a un bot (default: toda la colección)
+        batch_size: Puntos por página de scroll
+        dry_run: Solo contar, sin escribir
+
+    Returns:
+        dict con la versión vigente y los puntos/documentos actualizados
+    """
+    taxonomy: Taxonomy = get_taxonomy()
+    client = get_qdrant_client()
+    semantic_tagger = get_semantic_tagger()
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+
+    documents: "OrderedDict[Tuple, DocumentTags]" = OrderedDict()
+    report = {
+        "taxonomy_version": taxonomy.version,
+        "points_updated": 0,
+        "documents": 0,
+        "documents_from_chunks": 0,
+        "without_source_text": 0,
+        "dry_run": dry_run,
+    }
+    print(f"🏷️ Re-etiquetando puntos con taxonomía distinta a la versión {taxonomy.version}...")
+
+    try:
+        for collection_name in _collections(client, bot_id):
+            _retag_collection(
+                client, conn, cursor, collection_name, taxonomy, semantic_tagger,
+                documents, report, bot_id, batch_size, dry_run
+            )
+    finally:
+        cursor.close()
+        conn.close()
+
+    print(f"✅ Re-etiquetado completo: {report['points_updated']} puntos de {report['documents']} documentos")
+    return report
+
+
+def _collections(client, bot_id: Optional[int]) -> List[str]:
+    """Colecciones a recorrer según QDRANT_TENANCY (solo la del bot si se indica)."""
+    if bot_id is not None:
+        return [tenant_route(bot_id).collection_name]
+    return [name for name in tenant_collections() if client.collection_exists(name)]
+
+
+def _retag_collection(
+    client,
+    conn,
+    cursor,
+    collection_name: str,
+    taxonomy: Taxonomy,
+    semantic_tagger,
+    documents: "OrderedDict[Tuple, DocumentTags]",
+    report: Dict,
+    bot_id: Optional[int],
+    batch_size: int,
+    dry_run: bool
+) -> None:
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            scroll_filter=_outdated_filter(taxonomy.version, bot_id),
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=semantic_tagger is not None
+        )
+        if not points:
+            break
+
+        semantic: List[Optional[Dict]] = [None] * len(points)
+        if semantic_tagger is not None:
+            semantic = semantic_tagger.tag_vectors([p.vector for p in points])
+
+        # Texto de los chunks de la página en una sola consulta
+        chunk_texts = fetch_chunk_texts(
+            conn, [str(p.id) for p in points if "original_text" not in (p.payload or {})]
+        )
+
+        operations = []
+        for point, semantic_tags in zip(points, semantic):
+            payload = point.payload or {}
+            key = (payload.get("bot_id"), payload.get("source"), payload.get("doc_id"))
+            chunk = payload.get("original_text") or (chunk_texts.get(str(point.id)) or {}).get("original_text") or ""
+            # Modo shard: cada operación va a la shard key del bot
+            shard_key = tenant_route(key[0]).shard_key if key[0] is not None else None
+
+            doc_tags = documents.get(key)
+            if doc_tags is None:
+                source_row = load_document_text(cursor, key[0], key[1], key[2])
+                if source_row is None:
+                    # Sin texto en MySQL: las etiquetas del documento salen del chunk
+                    report["without_source_text"] += 1
+                    source_row = {"text": chunk, "file_name": None}
+                elif source_row["from_chunks"]:
+                    report["documents_from_chunks"] += 1
+                doc_payload = {**payload, "file_name": source_row["file_name"] or payload.get("file_name") or ""}
+                doc_tags = DocumentTags(doc_payload, source_row["text"], taxonomy)
+                documents[key] = doc_tags
+                report["documents"] += 1
+                if len(documents) > _DOCUMENT_CACHE_SIZE:
+                    documents.popitem(last=False)
+            else:
+                documents.move_to_end(key)
+
+            # Sin etiquetador semántico, las semantic_tags de otra taxonomía se borran
+            fields = chunk_tag_fields(doc_tags, chunk, semantic_tags)
+            operations.append(DeletePayloadOperation(delete_payload=DeletePayload(
+                keys=stale_tag_fields(doc_tags, fields), points=[point.id], shard_key=shard_key
+            )))
+            operations.append(SetPayloadOperation(set_payload=SetPayload(
+                payload={
+                    **doc_tags.tags,
+                    "taxonomy_version": taxonomy.version,
+                    **fields,
+                },
+                points=[point.id],
+                shard_key=shard_key
+            )))
+
+        if not dry_run:
+            client.batch_update_points(collection_name=collection_name, update_operations=operations)
+        report["points_updated"] += len(points)
+        print(f"   {report['points_updated']} puntos re-etiquetados...")
+
+        if offset is None:
+            break
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Re-etiqueta puntos con una taxonomía anterior")
+    parser.add_argument("--bot-id", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    print(json.dumps(
+        retag_outdated_points(bot_id=args.bot_id, batch_size=args.batch_size, dry_run=args.dry_run),
+        indent=2
+    ))
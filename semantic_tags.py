@@ -0,0 +1,222 @@
+"""
+Etiquetado semántico por centroides de embeddings.
+
+Las palabras clave no detectan paráfrasis ("me descuentan del sueldo" no
+contiene "nómina"). Cada etiqueta de la taxonomía tiene un centroide: el
+promedio normalizado de los embeddings de sus frases semilla (la etiqueta y
+sus palabras clave). Los chunks se etiquetan con el vector que ya se
+calculó para indexarlos: un producto matricial contra los centroides, sin
+pasar de nuevo por el modelo.
+
+Modos (SEMANTIC_TAGS):
+- off: solo palabras clave (default)
+- complement: las etiquetas semánticas van en payload["semantic_tags"]
+- only: reemplazan a las etiquetas locales del chunk (payload["chunk_tags"])
+
+La matriz de centroides se guarda en disco y solo se reconstruye cuando
+cambia la taxonomía (archivo versionado, ver tag_inference) o el modelo.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .tag_inference import Taxonomy, get_taxonomy
+
+SEMANTIC_TAGS = os.getenv("SEMANTIC_TAGS", "off").lower()
+
+
+def taxonomy_seeds(taxonomy: Taxonomy) -> List[Tuple[str, str, List[str]]]:
+    """Filas de la matriz: (campo, etiqueta, frases semilla)."""
+    rows = []
+    for field, spec in taxonomy.fields.items():
+        for label, keywords in spec["labels"].items():
+            rows.append((field, label, [label, *keywords]))
+    return rows
+
+
+def taxonomy_hash(rows: List[Tuple[str, str, List[str]]], model_id: str) -> str:
+    """Huella de la taxonomía y el modelo (clave del caché en disco)."""
+    raw = json.dumps({"model": model_id, "rows": rows}, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+class SemanticTagger:
+    """
+    Etiquetador por similitud coseno contra centroides de la taxonomía.
+
+    Uso:
+        tagger = SemanticTagger("./cache/tag_centroids.npz", model_id, embed_fn)
+        tags = tagger.tag_vectors(vectors)   # un dict de etiquetas por vector
+    """
+
+    def __init__(
+        self,
+        path: str,
+        model_id: str,
+        embed_fn,
+        threshold: float = 0.35,
+        taxonomy: Optional[Taxonomy] = None
+    ):
+        """
+        Args:
+            path: Archivo .npz con la matriz de centroides
+            model_id: Identificador del modelo (los centroides dependen de él)
+            embed_fn: Vectoriza una lista de frases (solo se usa al reconstruir)
+            threshold: Similitud coseno mínima para asignar una etiqueta
+            taxonomy: Taxonomía de origen (default: la vigente)
+        """
+        self.path = Path(path)
+        self.threshold = threshold
+        self.taxonomy = taxonomy or get_taxonomy()
+        self.rows = taxonomy_seeds(self.taxonomy)
+        self.columns = {
+            field: np.array([i for i, row in enumerate(self.rows) if row[0] == field])
+            for field in self.taxonomy.fields
+        }
+        self.fingerprint = taxonomy_hash(self.rows, model_id)
+        self.centroids = self._load() if self.path.exists() else None
+        if self.centroids is None:
+            self.centroids = self._build(embed_fn)
+
+        self._lock = threading.Lock()
+        self.stats = {
+            "vectors_tagged": 0,
+            "seconds": 0.0,
+        }
+
+    def _load(self) -> Optional[np.ndarray]:
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                if str(data["fingerprint"]) != self.fingerprint:
+                    print("🔄 La taxonomía cambió, reconstruyendo centroides...")
+                    return None
+                return data["centroids"]
+        except Exception as e:
+            print(f"⚠️ No se pudo leer {self.path}, reconstruyendo centroides: {e}")
+            return None
+
+    def _build(self, embed_fn) -> np.ndarray:
+        started = time.perf_counter()
+        phrases = [phrase for _, _, seeds in self.rows for phrase in seeds]
+        vectors = _normalize_rows(np.asarray(embed_fn(phrases), dtype=np.float32))
+
+        centroids, position = [], 0
+        for _, _, seeds in self.rows:
+            centroids.append(vectors[position:position + len(seeds)].mean(axis=0))
+            position += len(seeds)
+        centroids = _normalize_rows(np.stack(centroids)).astype(np.float32)
+
+        # Escritura atómica: otro proceso nunca lee un archivo a medias
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp.npz")
+        np.savez(tmp_path, centroids=centroids, fingerprint=np.array(self.fingerprint))
+        os.replace(tmp_path, self.path)
+
+        print(f"✅ Centroides semánticos: {len(self.rows)} etiquetas en {time.perf_counter() - started:.1f}s")
+        return centroids
+
+    def tag_vectors(self, vectors) -> List[Dict]:
+        """
+        Etiquetas de cada vector (n x dim): en campos de una etiqueta gana la
+        más similar sobre el umbral; en sectores van todas las que lo superan.
+        """
+        started = time.perf_counter()
+        matrix = _normalize_rows(np.asarray(vectors, dtype=np.float32))
+        scores = matrix @ self.centroids.T
+        passing = scores >= self.threshold
+
+        results: List[Dict] = [{} for _ in range(len(matrix))]
+        for field, spec in self.taxonomy.fields.items():
+            columns = self.columns[field]
+            field_scores = scores[:, columns]
+            field_passing = passing[:, columns]
+
+            if spec["mode"] == "all":
+                for i in np.nonzero(field_passing.any(axis=1))[0]:
+                    results[i][field] = [self.rows[columns[j]][1] for j in np.nonzero(field_passing[i])[0]]
+                continue
+
+            best = field_scores.argmax(axis=1)
+            for i in np.nonzero(field_passing[np.arange(len(matrix)), best])[0]:
+                label = self.rows[columns[best[i]]][1]
+                results[i][field] = True if spec["mode"] == "flag" else label
+
+        with self._lock:
+            self.stats["vectors_tagged"] += len(matrix)
+            self.stats["seconds"] += time.perf_counter() - started
+        return results
+
+    def get_stats(self) -> Dict:
+        """Retorna estadísticas del etiquetador."""
+        with self._lock:
+            tagged = self.stats["vectors_tagged"]
+            return {
+                "mode": SEMANTIC_TAGS,
+                "path": str(self.path),
+                "taxonomy_version": self.taxonomy.version,
+                "labels": len(self.rows),
+                "threshold": self.threshold,
+                "fingerprint": self.fingerprint[:12],
+                "vectors_tagged": tagged,
+                "seconds": round(self.stats["seconds"], 4),
+                "microseconds_per_vector": round(self.stats["seconds"] / tagged * 1e6, 2) if tagged else 0.0,
+            }
+
+
+# ============================================
+# INSTANCIA COMPARTIDA
+# ============================================
+
+_tagger: Optional[SemanticTagger] = None
+_tagger_failed = False
+_tagger_lock = threading.Lock()
+
+
+def get_semantic_tagger() -> Optional[SemanticTagger]:
+    """
+    Retorna el etiquetador del proceso (None si SEMANTIC_TAGS=off o no pudo iniciar).
+    """
+    global _tagger, _tagger_failed
+
+    if SEMANTIC_TAGS not in ("complement", "only") or _tagger_failed:
+        return None
+
+    # La taxonomía se recarga en caliente: centroides nuevos si cambió
+    taxonomy = get_taxonomy()
+    if _tagger is None or _tagger.taxonomy is not taxonomy:
+        with _tagger_lock:
+            if (_tagger is None or _tagger.taxonomy is not taxonomy) and not _tagger_failed:
+                from .db_utils import batch_get_embeddings
+                from .service_registry import get_embedding_model_id
+
+                try:
+                    _tagger = SemanticTagger(
+                        path=os.getenv("SEMANTIC_TAGS_PATH", "./cache/tag_centroids.npz"),
+                        model_id=get_embedding_model_id(),
+                        embed_fn=lambda phrases: batch_get_embeddings(phrases, use_fallback=False),
+                        threshold=float(os.getenv("SEMANTIC_TAG_THRESHOLD", "0.35")),
+                        taxonomy=taxonomy
+                    )
+                except Exception as e:
+                    print(f"⚠️ Etiquetado semántico no disponible: {e}")
+                    _tagger_failed = True
+                    return None
+
+    return _tagger
+
+
+def get_semantic_tagger_stats() -> Optional[Dict]:
+    """Estadísticas del etiquetador semántico (None si está deshabilitado)."""
+    return _tagger.get_stats() if _tagger is not None else None
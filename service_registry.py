@@ -0,0 +1,227 @@
+"""
+Registro de recursos pesados del servicio.
+
+El modelo de embeddings y el cliente de Qdrant se crean una sola vez por
+proceso y solo cuando alguien los necesita. Importar cualquier módulo del
+paquete (CLI como cleanup_qdrant.py, tests) ya no carga el modelo ni abre
+conexiones.
+
+Funcionalidades:
+- get_embedding_model(): modelo compartido (carga perezosa, thread-safe)
+- get_embedding_tokenizer() / get_max_seq_length(): tokenizer y ventana del modelo
+- get_qdrant_client(): cliente Qdrant compartido, configurado por entorno
+  (QDRANT_URL o QDRANT_HOST/QDRANT_PORT, QDRANT_API_KEY, QDRANT_PREFER_GRPC,
+  QDRANT_GRPC_PORT, QDRANT_TIMEOUT, QDRANT_POOL_SIZE)
+- get_async_qdrant_client(): AsyncQdrantClient con la misma configuración
+  (endpoints async de búsqueda)
+- warm_up(): fase explícita de precarga (startup de la API)
+- readiness(): estado de cada recurso para /health/ready
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+_lock = threading.RLock()
+
+_model = None
+_provider: Optional[str] = None
+_qdrant_client = None
+_async_qdrant_client = None
+
+_state: Dict[str, Dict] = {
+    "model": {"ready": False, "error": None, "loaded_at": None, "load_seconds": None},
+    "qdrant": {"ready": False, "error": None, "loaded_at": None, "load_seconds": None},
+    "mysql": {"ready": False, "error": None, "loaded_at": None, "load_seconds": None},
+}
+
+
+def _mark(component: str, started: float, error: Optional[Exception] = None) -> None:
+    _state[component].update({
+        "ready": error is None,
+        "error": str(error)[:200] if error else None,
+        "loaded_at": datetime.now().isoformat(),
+        "load_seconds": round(time.perf_counter() - started, 3),
+    })
+
+
+# ============================================
+# MODELO DE EMBEDDINGS
+# ============================================
+
+def get_embedding_model():
+    """Retorna el modelo de embeddings del proceso, cargándolo al primer uso."""
+    global _model, _provider
+
+    if _model is None:
+        with _lock:
+            if _model is None:
+                from .embedding_backends import load_embedding_model
+
+                started = time.perf_counter()
+                try:
+                    model, provider = load_embedding_model()
+                except Exception as e:
+                    _mark("model", started, e)
+                    raise
+                _model, _provider = model, provider
+                _mark("model", started)
+
+    return _model
+
+
+def get_embedder_provider() -> str:
+    """Backend efectivo del modelo (torch | onnx | onnx-int8)."""
+    get_embedding_model()
+    return _provider
+
+
+def get_embedding_model_id() -> str:
+    """Identificador del modelo efectivo (usado en la clave del caché)."""
+    from .embedding_backends import embedding_model_id
+
+    return embedding_model_id(get_embedder_provider())
+
+
+def get_embedding_tokenizer():
+    """Tokenizer del modelo de embeddings (mismo vocabulario que usa encode)."""
+    return get_embedding_model().tokenizer
+
+
+def get_max_seq_length() -> int:
+    """Ventana del modelo en word-pieces, incluyendo [CLS] y [SEP]."""
+    return int(getattr(get_embedding_model(), "max_seq_length", None) or 256)
+
+
+# ============================================
+# QDRANT
+# ============================================
+
+def qdrant_client_settings() -> Dict:
+    """Parámetros del cliente Qdrant leídos del entorno."""
+    settings = {
+        "api_key": os.getenv("QDRANT_API_KEY") or None,
+        "prefer_grpc": os.getenv("QDRANT_PREFER_GRPC", "false").lower() == "true",
+        "grpc_port": int(os.getenv("QDRANT_GRPC_PORT", "6334")),
+        "timeout": int(os.getenv("QDRANT_TIMEOUT", "30")),
+        # Sin request de verificación de versión al crear el cliente
+        "check_compatibility": False,
+    }
+
+    url = os.getenv("QDRANT_URL")
+    if url:
+        settings["url"] = url
+    else:
+        settings["host"] = os.getenv("QDRANT_HOST", "localhost")
+        settings["port"] = int(os.getenv("QDRANT_PORT", "6333"))
+
+    # Conexiones HTTP (o canales gRPC) por cliente
+    pool_size = os.getenv("QDRANT_POOL_SIZE")
+    if pool_size:
+        settings["pool_size"] = int(pool_size)
+
+    return settings
+
+
+def create_qdrant_client(**overrides):
+    """Crea un cliente Qdrant nuevo con la configuración del entorno."""
+    from qdrant_client import QdrantClient
+
+    return QdrantClient(**{**qdrant_client_settings(), **overrides})
+
+
+def get_qdrant_client():
+    """Retorna el cliente Qdrant del proceso (no hace requests al crearlo)."""
+    global _qdrant_client
+
+    if _qdrant_client is None:
+        with _lock:
+            if _qdrant_client is None:
+                _qdrant_client = create_qdrant_client()
+
+    return _qdrant_client
+
+
+def get_async_qdrant_client():
+    """Retorna el cliente Qdrant async del proceso (no hace requests al crearlo)."""
+    global _async_qdrant_client
+
+    if _async_qdrant_client is None:
+        with _lock:
+            if _async_qdrant_client is None:
+                from qdrant_client import AsyncQdrantClient
+
+                _async_qdrant_client = AsyncQdrantClient(**qdrant_client_settings())
+
+    return _async_qdrant_client
+
+
+async def close_async_qdrant_client() -> None:
+    """Cierra las conexiones del cliente async (shutdown de la API)."""
+    global _async_qdrant_client
+
+    client, _async_qdrant_client = _async_qdrant_client, None
+    if client is not None:
+        await client.close()
+
+
+# ============================================
+# WARM-UP Y READINESS
+# ============================================
+
+def warm_up(model: bool = True, qdrant: bool = True, mysql: bool = True) -> Dict:
+    """
+    Precarga los recursos para que el primer request no pague el arranque.
+
+    Cada componente se marca listo o con error de forma independiente;
+    un fallo en uno no impide calentar los demás.
+    """
+    print("🔥 Warm-up de recursos...")
+
+    if model:
+        started = time.perf_counter()
+        try:
+            get_embedding_model().encode(["warm-up"], show_progress_bar=False)
+            print(f"   ✅ Modelo listo ({get_embedder_provider()})")
+        except Exception as e:
+            _mark("model", started, e)
+            print(f"   ❌ Modelo no disponible: {e}")
+
+    if qdrant:
+        started = time.perf_counter()
+        try:
+            from .vector_store import get_or_create_vector_store
+
+            get_or_create_vector_store()
+            _mark("qdrant", started)
+            print("   ✅ Qdrant listo")
+        except Exception as e:
+            _mark("qdrant", started, e)
+            print(f"   ❌ Qdrant no disponible: {e}")
+
+    if mysql:
+        started = time.perf_counter()
+        try:
+            from .db_utils import get_connection
+
+            conn = get_connection()
+            conn.close()
+            _mark("mysql", started)
+            print("   ✅ MySQL listo")
+        except Exception as e:
+            _mark("mysql", started, e)
+            print(f"   ❌ MySQL no disponible: {e}")
+
+    return readiness()
+
+
+def readiness() -> Dict:
+    """Estado de los recursos; ready=True solo si todos están calientes."""
+    with _lock:
+        components = {name: dict(state) for name, state in _state.items()}
+    return {
+        "ready": all(state["ready"] for state in components.values()),
+        "components": components,
+    }
@@ -53,7 +53,7 @@ class SnapshotManager:
             compress: Comprimir snapshots con GZIP (default: True)
             retention_days: Días de retención para snapshots antiguos (default: 30)
         """
-        self.client = get_or_create_vector_store()
+        self._client = None
         self.collection_name = collection_name
         self.compress = compress
         self.retention_days = retention_days
@@ -72,6 +72,13 @@ class SnapshotManager:
         self.metadata_file = self.snapshots_dir / "metadata.json"
         self._init_metadata()
 
+    @property
+    def client(self):
+        """Cliente Qdrant, resuelto al primer uso (no al instanciar)."""
+        if self._client is None:
+            self._client = get_or_create_vector_store()
+        return self._client
+
     def _init_metadata(self) -> None:
         """Inicializa o carga archivo de metadatos."""
         if not self.metadata_file.exists():
@@ -14,8 +14,9 @@ import hashlib
 import json
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
+from .chunk_index import SOURCE_TABLES, delete_document_chunks, delete_point_chunks
 from .db_utils import get_connection
-from .vector_store import get_or_create_vector_store
+from .vector_store import get_tenant_store
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -108,7 +109,7 @@ class QdrantMySQLSynchronizer:
             bot_id: ID del bot a sincronizar
         """
         self.bot_id = bot_id
-        self.client = get_or_create_vector_store()
+        self.client, self.route = get_tenant_store(bot_id)
         self.conn = get_connection()
         self.cursor = self.conn.cursor(dictionary=True)
         self.sync_log = SyncLog()
@@ -141,11 +142,9 @@ class QdrantMySQLSynchronizer:
         """Obtiene todos los vectores del bot desde Qdrant."""
         try:
             points, _ = self.client.scroll(
-                collection_name="voia_vectors",
+                **self.route.kwargs,
                 limit=10000,
-                scroll_filter={
-                    "must": [{"key": "bot_id", "match": {"value": self.bot_id}}]
-                }
+                scroll_filter=self.route.filter()
             )
             return [
                 {
@@ -348,9 +347,12 @@ class QdrantMySQLSynchronizer:
         for orphan in discrepancies["orphan_vectors"]:
             try:
                 self.client.delete(
-                    collection_name="voia_vectors",
+                    **self.route.kwargs,
                     points_selector=[orphan["qdrant_id"]]
                 )
+                # Sin su chunk ni su huella (no debe frenar contenido nuevo)
+                delete_point_chunks(self.conn, [orphan["qdrant_id"]])
+                self.conn.commit()
                 print(f"   🗑️ Eliminado vector huérfano {orphan['qdrant_id']}")
                 result["fixed_items"] += 1
                 self.stats["items_fixed"] += 1
@@ -380,6 +382,9 @@ class QdrantMySQLSynchronizer:
                         (lost["doc_id"], self.bot_id)
                     )
 
+                # Sin vectores: la re-indexación no debe reutilizar sus chunks
+                if entity_type in SOURCE_TABLES:
+                    delete_document_chunks(self.conn, SOURCE_TABLES[entity_type], lost["doc_id"])
                 self.conn.commit()
                 print(f"   📝 Marcado {entity_type}#{lost['doc_id']} como no indexado")
                 result["fixed_items"] += 1
@@ -5,13 +5,12 @@ Detecta y repara:
 - Documentos en MySQL pero NO en Qdrant (perdidos)
 """
 
+from .chunk_index import SOURCE_TABLES, delete_document_chunks, delete_point_chunks
 from .db_utils import get_connection
-from .vector_store import get_or_create_vector_store
+from .vector_store import get_tenant_store
 from datetime import datetime
 from typing import Dict, List
 
-client = get_or_create_vector_store()
-
 
 # ============================================================
 # VALIDADOR PRINCIPAL - SOLUTION #6
@@ -22,7 +21,7 @@ class QdrantMySQLValidator:
 
     def __init__(self, bot_id: int):
         self.bot_id = bot_id
-        self.client = get_or_create_vector_store()
+        self.client, self.route = get_tenant_store(bot_id)
         self.conn = get_connection()
         self.cursor = self.conn.cursor(dictionary=True)
         self.stats = {
@@ -46,11 +45,9 @@ class QdrantMySQLValidator:
         """Obtiene todos los vectores de Qdrant para el bot_id"""
         try:
             points, _ = self.client.scroll(
-                collection_name="voia_vectors",
+                **self.route.kwargs,
                 limit=10000,
-                scroll_filter={
-                    "must": [{"key": "bot_id", "match": {"value": self.bot_id}}]
-                }
+                scroll_filter=self.route.filter()
             )
             return [
                 {
@@ -229,9 +226,12 @@ class QdrantMySQLValidator:
             for action in actions["delete_from_qdrant"]:
                 try:
                     self.client.delete(
-                        collection_name="voia_vectors",
+                        **self.route.kwargs,
                         points_selector=[action["qdrant_id"]]
                     )
+                    # Sin su chunk ni su huella (no debe frenar contenido nuevo)
+                    delete_point_chunks(self.conn, [action["qdrant_id"]])
+                    self.conn.commit()
                     self.stats["fixed_issues"] += 1
                     print(f"  Eliminado vector: {action['qdrant_id']}")
                 except Exception as e:
@@ -254,6 +254,8 @@ class QdrantMySQLValidator:
                             f"UPDATE {table} SET indexed = 0 WHERE id = %s",
                             (doc_id,)
                         )
+                        # Sin vectores: la re-indexación no debe reutilizar sus chunks
+                        delete_document_chunks(self.conn, SOURCE_TABLES[table], doc_id)
                         self.conn.commit()
                         self.stats["fixed_issues"] += 1
                         print(f"  Remarcado: {doc_type}#{doc_id}")
@@ -400,6 +402,7 @@ def sync_qdrant_with_mysql(bot_id: int, dry_run=True):
             "action": "analyzed" | "repaired"
         }
     """
+    client, route = get_tenant_store(bot_id)
     conn = get_connection()
     cursor = conn.cursor(dictionary=True)
     
@@ -424,10 +427,8 @@ def sync_qdrant_with_mysql(bot_id: int, dry_run=True):
         print("📍 PASO 1: Buscando vectores sin documento en MySQL...")
         
         qdrant_points = client.scroll(
-            collection_name="voia_vectors",
-            scroll_filter={
-                "must": [{"key": "bot_id", "match": {"value": bot_id}}]
-            },
+            **route.kwargs,
+            scroll_filter=route.filter(),
             limit=100  # Paginar si hay muchos
         )
         
@@ -462,9 +463,11 @@ def sync_qdrant_with_mysql(bot_id: int, dry_run=True):
                 if not dry_run:
                     try:
                         client.delete(
-                            collection_name="voia_vectors",
+                            **route.kwargs,
                             points_selector=[point.id]
                         )
+                        delete_point_chunks(conn, [point.id])
+                        conn.commit()
                         print(f"    ✅ Vector eliminado de Qdrant")
                     except Exception as e:
                         print(f"    ❌ Error eliminando: {e}")
@@ -501,6 +504,7 @@ def sync_qdrant_with_mysql(bot_id: int, dry_run=True):
                         "UPDATE uploaded_documents SET indexed = 0 WHERE id = %s",
                         (doc_id,)
                     )
+                    delete_document_chunks(conn, "document", doc_id)
                     conn.commit()
                     print(f"    ✅ Doc marcado para reindexar")
                 continue
@@ -508,7 +512,7 @@ def sync_qdrant_with_mysql(bot_id: int, dry_run=True):
             # Buscar en Qdrant
             try:
                 points = client.retrieve(
-                    collection_name="voia_vectors",
+                    **route.kwargs,
                     ids=[qdrant_id]
                 )
                 
@@ -528,6 +532,7 @@ def sync_qdrant_with_mysql(bot_id: int, dry_run=True):
                             "UPDATE uploaded_documents SET indexed = 0, qdrant_id = NULL WHERE id = %s",
                             (doc_id,)
                         )
+                        delete_document_chunks(conn, "document", doc_id)
                         conn.commit()
                         print(f"    ✅ Doc marcado para reindexar")
             
@@ -1,8 +1,309 @@
+"""
+Inferencia de etiquetas por palabras clave.
+
+La taxonomía vive en un archivo JSON versionado (TAXONOMY_PATH, por defecto
+taxonomy.json junto a este módulo) y se compila una sola vez en un único
+regex: una pasada sobre el texto encuentra todas las palabras clave
+presentes (incluidas las que se solapan, p. ej. "contrato" dentro de
+"contrato de arrendamiento") y las etiquetas se derivan de ese conjunto.
+
+El archivo se recarga en caliente: si cambia su mtime se compila la nueva
+versión y se reemplaza la referencia de una vez (los documentos en curso
+terminan con la que tomaron). Cada payload registra taxonomy_version, lo que
+permite re-etiquetar solo los puntos con una versión anterior (retag_qdrant).
+
+Los pipelines etiquetan a nivel de documento (DocumentTags): una sola pasada
+sobre el texto completo da las etiquetas del documento (iguales en todos sus
+chunks) y las posiciones de cada coincidencia, de las que salen las
+etiquetas locales de cada chunk sin volver a escanearlo.
+"""
+
+import hashlib
+import json
+import os
 import re
-from typing import Dict, List
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+TAXONOMY_PATH = os.getenv("TAXONOMY_PATH", str(Path(__file__).with_name("taxonomy.json")))
+# Cada cuántos segundos se revisa el mtime del archivo (no en cada chunk)
+TAXONOMY_CHECK_INTERVAL = float(os.getenv("TAXONOMY_CHECK_INTERVAL", "5"))
+
+# Campos del payload que escribe la inferencia de etiquetas
+TAG_FIELDS = ("tipo", "tema", "sectores", "requiere_firma", "especialidad")
+
+# Modos de un campo: first = primera etiqueta (en orden del archivo) con
+# coincidencias, all = lista de todas, flag = True si alguna coincide
+_FIELD_MODES = ("first", "all", "flag")
+
+
+class KeywordMatcher:
+    """
+    Todas las palabras clave de la taxonomía en un solo regex.
+
+    En cada límite de palabra, el lookahead captura la palabra clave más larga
+    que empieza ahí (las alternativas van de mayor a menor longitud); las más
+    cortas que empiezan en la misma posición son prefijos de esa y se agregan
+    desde una tabla precalculada.
+    """
+
+    def __init__(self, keywords: List[str]):
+        # El texto se compara en minúsculas: una palabra clave con mayúsculas
+        # ("DIAN") nunca coincide y se excluye para conservar el resultado
+        self.keywords = sorted(
+            {kw for kw in keywords if kw == kw.lower()},
+            key=lambda kw: (-len(kw), kw)
+        )
+        alternatives = "|".join(re.escape(kw) for kw in self.keywords)
+        self.pattern = re.compile(rf"\b(?=({alternatives})\b)" if alternatives else r"(?!)")
+
+        self.prefixes: Dict[str, Tuple[str, ...]] = {
+            kw: tuple(
+                other for other in self.keywords
+                if other != kw and kw.startswith(other) and re.match(rf"{re.escape(other)}\b", kw)
+            )
+            for kw in self.keywords
+        }
+
+    def find_all(self, text: str) -> Set[str]:
+        """Palabras clave presentes en text (ya en minúsculas) como palabras completas."""
+        found: Set[str] = set()
+        for match in self.pattern.finditer(text):
+            keyword = match.group(1)
+            if keyword not in found:
+                found.add(keyword)
+                found.update(self.prefixes[keyword])
+        return found
+
+    def find_spans(self, text: str) -> List[Tuple[int, int, str]]:
+        """Todas las coincidencias como (inicio, fin, palabra clave), ordenadas por inicio."""
+        spans = []
+        for match in self.pattern.finditer(text):
+            start = match.start()
+            keyword = match.group(1)
+            spans.append((start, start + len(keyword), keyword))
+            spans.extend((start, start + len(prefix), prefix) for prefix in self.prefixes[keyword])
+        return spans
+
+
+class Taxonomy:
+    """
+    Taxonomía compilada (inmutable): campos, etiquetas y matcher.
+
+    Uso:
+        taxonomy = get_taxonomy()
+        tags = taxonomy.tags(found_in_text, found_in_file_name)
+    """
+
+    def __init__(self, data: Dict, fingerprint: str = ""):
+        """
+        Args:
+            data: {"version": int, "fields": {campo: {"mode", "labels", "file_name"?}}}
+            fingerprint: sha256 del contenido del archivo
+        """
+        self.version = int(data["version"])
+        self.fingerprint = fingerprint
+        self.fields: Dict[str, Dict] = {}
+
+        for field, spec in data["fields"].items():
+            mode = spec.get("mode", "first")
+            if mode not in _FIELD_MODES:
+                raise ValueError(f"Modo inválido para {field}: {mode}")
+            labels = spec["labels"]
+            if not isinstance(labels, dict) or not all(isinstance(kws, list) for kws in labels.values()):
+                raise ValueError(f"Etiquetas inválidas para {field}")
+            self.fields[field] = {
+                "mode": mode,
+                "file_name": bool(spec.get("file_name", False)),
+                "labels": labels,
+            }
+
+        self.matcher = KeywordMatcher([
+            kw for spec in self.fields.values() for kws in spec["labels"].values() for kw in kws
+        ])
+
+    def tags(self, in_text: FrozenSet[str], in_file_name: FrozenSet[str] = frozenset()) -> Dict:
+        """Etiquetas a partir de las palabras clave encontradas."""
+        tags = {}
+        for field, spec in self.fields.items():
+            found = in_file_name | in_text if spec["file_name"] else in_text
+            matching = (label for label, kws in spec["labels"].items() if any(kw in found for kw in kws))
+
+            if spec["mode"] == "all":
+                labels = list(matching)
+                if labels:
+                    tags[field] = labels
+            else:
+                label = next(matching, None)
+                if label is not None:
+                    tags[field] = True if spec["mode"] == "flag" else label
+        return tags
+
+
+def load_taxonomy(path: str) -> Taxonomy:
+    """Lee y compila un archivo de taxonomía."""
+    raw = Path(path).read_bytes()
+    return Taxonomy(json.loads(raw.decode("utf-8")), hashlib.sha256(raw).hexdigest())
+
+
+# ============================================
+# TAXONOMÍA ACTUAL (recarga en caliente)
+# ============================================
+
+_taxonomy: Optional[Taxonomy] = None
+_taxonomy_mtime: Optional[float] = None
+_taxonomy_checked_at = 0.0
+# Matchers compilados por (versión, contenido): volver a una versión no recompila
+_compiled: Dict[Tuple[int, str], Taxonomy] = {}
+_taxonomy_lock = threading.Lock()
+
+
+def get_taxonomy() -> Taxonomy:
+    """
+    Taxonomía vigente. Revisa el mtime del archivo cada TAXONOMY_CHECK_INTERVAL
+    segundos; si cambió, compila y reemplaza la referencia de una vez. Un
+    archivo inválido se ignora y se conserva la versión anterior.
+    """
+    global _taxonomy, _taxonomy_mtime, _taxonomy_checked_at
+
+    now = time.monotonic()
+    if _taxonomy is not None and now - _taxonomy_checked_at < TAXONOMY_CHECK_INTERVAL:
+        return _taxonomy
+
+    with _taxonomy_lock:
+        if _taxonomy is not None and now - _taxonomy_checked_at < TAXONOMY_CHECK_INTERVAL:
+            return _taxonomy
+        _taxonomy_checked_at = now
+
+        try:
+            mtime = os.stat(TAXONOMY_PATH).st_mtime
+        except OSError as e:
+            if _taxonomy is None:
+                raise
+            print(f"⚠️ Taxonomía no disponible ({e}), se conserva la versión {_taxonomy.version}")
+            return _taxonomy
+
+        if mtime == _taxonomy_mtime:
+            return _taxonomy
+
+        try:
+            raw = Path(TAXONOMY_PATH).read_bytes()
+            fingerprint = hashlib.sha256(raw).hexdigest()
+            data = json.loads(raw.decode("utf-8"))
+            key = (int(data["version"]), fingerprint)
+            taxonomy = _compiled.get(key) or Taxonomy(data, fingerprint)
+        except Exception as e:
+            if _taxonomy is None:
+                raise
+            print(f"⚠️ Taxonomía inválida en {TAXONOMY_PATH}: {e}; se conserva la versión {_taxonomy.version}")
+            _taxonomy_mtime = mtime
+            return _taxonomy
+
+        _compiled[key] = taxonomy
+        if _taxonomy is not None and taxonomy.fingerprint != _taxonomy.fingerprint:
+            if taxonomy.version == _taxonomy.version:
+                print(f"⚠️ La taxonomía cambió sin subir version ({taxonomy.version}): retag_qdrant no la detectará")
+            print(f"🔄 Taxonomía recargada: versión {_taxonomy.version} → {taxonomy.version}")
+        _taxonomy, _taxonomy_mtime = taxonomy, mtime
+        return _taxonomy
+
 
 def infer_tags_from_payload(payload: Dict, extracted_text: str = "") -> Dict:
+    taxonomy = get_taxonomy()
+    file_name = payload.get("file_name", "").lower()
+    text = extracted_text.lower()
+
+    in_text = frozenset(taxonomy.matcher.find_all(text))
+    in_file_name = frozenset(taxonomy.matcher.find_all(file_name)) if file_name else frozenset()
+
+    return {**taxonomy.tags(in_text, in_file_name), "taxonomy_version": taxonomy.version}
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+class DocumentTags:
+    """
+    Etiquetas de un documento completo con atribución por chunk.
+
+    Los chunks se arman con fragmentos literales del texto separados por
+    espacios, así que un chunk normalizado (minúsculas, espacios colapsados)
+    es una subcadena del documento normalizado: se ubica con find y sus
+    etiquetas locales son las de las coincidencias que caen dentro.
+
+    Uso:
+        doc_tags = DocumentTags(payload, content)
+        payload.update(doc_tags.tags, taxonomy_version=doc_tags.version)
+        payload["chunk_tags"] = doc_tags.chunk_tags(chunk)
+    """
+
+    def __init__(self, payload: Dict, text: str, taxonomy: Optional[Taxonomy] = None):
+        """
+        Args:
+            payload: Payload base del documento (se usa file_name si existe)
+            text: Texto completo extraído del documento
+            taxonomy: Taxonomía a usar (default: la vigente, fija para todo el documento)
+        """
+        self.taxonomy = taxonomy or get_taxonomy()
+        self.version = self.taxonomy.version
+        self.text = _normalize(text)
+        self.spans = self.taxonomy.matcher.find_spans(self.text)
+        self._starts = [start for start, _, _ in self.spans]
+        self._cursor = 0
+
+        file_name = (payload.get("file_name") or "").lower()
+        in_file_name = frozenset(self.taxonomy.matcher.find_all(file_name)) if file_name else frozenset()
+        self.tags = self.taxonomy.tags(frozenset(kw for _, _, kw in self.spans), in_file_name)
+
+    def locate(self, chunk: str) -> Optional[Tuple[int, int]]:
+        """
+        Posición (inicio, fin) del chunk en el texto normalizado.
+
+        Los chunks se consultan en orden de documento: la búsqueda sigue desde
+        el último chunk ubicado (con overlap, el siguiente empieza antes de
+        que termine el anterior). La coincidencia respeta límites de palabra
+        ("cert" no cae dentro de "certificado"); si no aparece desde el último
+        chunk, retorna None y el chunk se escanea directamente.
+        """
+        normalized = _normalize(chunk)
+        if not normalized:
+            return None
+        pattern = re.escape(normalized)
+        if normalized[0].isalnum() or normalized[0] == "_":
+            pattern = r"(?<!\w)" + pattern
+        if normalized[-1].isalnum() or normalized[-1] == "_":
+            pattern += r"(?!\w)"
+        match = re.compile(pattern).search(self.text, self._cursor)
+        if match is None:
+            return None
+        start = match.start()
+        self._cursor = start
+        return start, start + len(normalized)
+
+    def chunk_tags(self, chunk: str) -> Dict:
+        """Etiquetas locales del chunk (las de las coincidencias dentro de su span)."""
+        span = self.locate(chunk)
+        if span is None:
+            # Chunk cortado dentro de una palabra o fuera de orden: escanearlo directamente
+            return self.taxonomy.tags(frozenset(self.taxonomy.matcher.find_all(_normalize(chunk))))
+
+        chunk_start, chunk_end = span
+        inside = self.spans[bisect_left(self._starts, chunk_start):bisect_left(self._starts, chunk_end)]
+        return self.taxonomy.tags(frozenset(kw for _, end, kw in inside if end <= chunk_end))
+
+
+# ============================================
+# BENCHMARK
+# ============================================
+
+def _infer_tags_per_keyword(payload: Dict, extracted_text: str = "") -> Dict:
+    """Implementación anterior (un regex por palabra clave), referencia del benchmark."""
     tags = {}
+    taxonomy = get_taxonomy()
 
     file_name = payload.get("file_name", "").lower()
     text = extracted_text.lower()
@@ -10,85 +311,73 @@ def infer_tags_from_payload(payload: Dict, extracted_text: str = "") -> Dict:
     def match_keywords(text: str, keywords: List[str]) -> bool:
         return any(re.search(rf"\b{re.escape(kw)}\b", text) for kw in keywords)
 
-    # -----------------------------
-    # Tipos de documento
-    # -----------------------------
-    tipos_documento = {
-        "autorización": ["autorizacion", "autorización", "autorisacion", "autorizacón", "autorizaciòn"],
-        "contrato": ["contrato", "contarto", "contratp", "contratto"],
-        "certificado": ["certificado", "certificdo", "cert", "constancia"],
-        "factura": ["factura", "recibo", "cuenta de cobro"],
-        "información empresarial": ["informacion", "quienes somos", "perfil empresarial", "presentación", "empresa"]
-    }
+    for field, spec in taxonomy.fields.items():
+        for label, keywords in spec["labels"].items():
+            if (spec["file_name"] and match_keywords(file_name, keywords)) or match_keywords(text, keywords):
+                if spec["mode"] == "all":
+                    tags.setdefault(field, []).append(label)
+                    continue
+                tags[field] = True if spec["mode"] == "flag" else label
+                break
 
-    for tipo, keywords in tipos_documento.items():
-        if match_keywords(file_name, keywords) or match_keywords(text, keywords):
-            tags["tipo"] = tipo
-            break
-
-    # -----------------------------
-    # Temas
-    # -----------------------------
-    temas = {
-        "nómina": ["nómina", "nomina", "descuento por nómina", "liquidación de nómina"],
-        "salud": ["salud", "eps", "historia clínica", "centro médico", "procedimiento médico"],
-        "financiero": ["préstamo", "cuota", "descuento", "interés", "deuda", "pago", "cartera"],
-        "legal": ["demandas", "proceso judicial", "abogado", "juez", "código penal", "sentencia"],
-        "educación": ["colegio", "universidad", "certificado de estudio", "boletín", "notas"],
-        "laboral": ["trabajo", "empleo", "contratación", "vacaciones", "licencia"],
-        "inmobiliario": ["arriendo", "inmueble", "propiedad", "contrato de arrendamiento"],
-        "tecnología": ["software", "sistema", "plataforma", "aplicación", "soporte técnico"],
-        "vehículos": ["vehículo", "soat", "licencia de conducción", "revisión técnico-mecánica", "matrícula vehicular"],
-        "tributario": ["renta", "DIAN", "impuesto", "retención", "declaración"],
-    }
+    return {**tags, "taxonomy_version": taxonomy.version}
 
-    for tema, palabras in temas.items():
-        if match_keywords(text, palabras):
-            tags["tema"] = tema
-            break
-
-    # -----------------------------
-    # Sectores económicos
-    # -----------------------------
-    sectores = {
-        "tasación": ["tasación", "avaluo", "avalúo", "valor comercial", "peritaje", "inspección vehicular"],
-        "automotriz": ["vehículos", "taller", "automotor", "siniestro", "accidente de tránsito"],
-        "salud": ["eps", "clínica", "médico", "psicología", "odontología"],
-        "educativo": ["universidad", "colegio", "institución educativa", "certificado académico"],
-        "financiero": ["entidad financiera", "banco", "pago", "deuda", "cuenta"],
-        "legal": ["tribunal", "juez", "proceso", "firma de abogados", "sentencia"],
-        "tecnología": ["startup", "aplicación", "plataforma digital", "software"],
-        "logística": ["transporte", "entrega", "mensajería", "camión"],
-    }
 
-    for sector, keywords in sectores.items():
-        if match_keywords(text, keywords):
-            if "sectores" not in tags:
-                tags["sectores"] = []
-            tags["sectores"].append(sector)
-
-    # -----------------------------
-    # Firma electrónica o física
-    # -----------------------------
-    firma_keywords = [
-        "firma", "firmado", "firma electrónica", "firmado electrónicamente", "firma digital"
-    ]
-    if match_keywords(text, firma_keywords):
-        tags["requiere_firma"] = True
-
-    # -----------------------------
-    # Especialidades médicas (si aplica)
-    # -----------------------------
-    especialidades = {
-        "psicología": ["psicología", "psicoterapia", "consulta psicológica"],
-        "odontología": ["odontología", "dentista", "odontograma"],
-        "medicina general": ["consulta médica", "médico general", "valoración médica"],
-        "oftalmología": ["oftalmología", "visión", "examen visual", "optometría"],
+SAMPLE_CHUNKS = [
+    "Contrato de arrendamiento del inmueble ubicado en la calle 45. El pago de la cuota "
+    "mensual se realizará en el banco indicado y requiere firma electrónica de ambas partes.",
+    "Certificado de estudio expedido por la universidad. La institución educativa hace constar "
+    "que el estudiante aprobó las notas del boletín final.",
+    "La EPS autoriza el procedimiento médico y la consulta psicológica. Historia clínica "
+    "disponible en el centro médico; valoración médica programada.",
+    "Declaración de renta y retención en la fuente ante la DIAN. El impuesto se liquida "
+    "con la cuenta de cobro adjunta.",
+    "Inspección vehicular y peritaje del vehículo tras el accidente de tránsito. El taller "
+    "entrega el avalúo con el valor comercial y la revisión técnico-mecánica.",
+    "Quienes somos: empresa de software con una plataforma digital y soporte técnico para "
+    "startups de transporte y mensajería.",
+    "Horario de atención de lunes a viernes de 8 a 5. Contáctenos por el formulario.",
+] * 20
+
+
+def benchmark_tag_inference(chunks: Optional[List[str]] = None, repeats: int = 5) -> Dict:
+    """
+    Compara el matcher compilado contra la búsqueda por palabra clave.
+
+    Reporta chunks/seg de cada implementación (mejor de repeats) y verifica
+    que ambas produzcan exactamente las mismas etiquetas.
+    """
+    chunks = chunks or SAMPLE_CHUNKS
+    payload = {"file_name": "contrato_firmado.pdf"}
+
+    def throughput(fn) -> float:
+        best = float("inf")
+        for _ in range(repeats):
+            started = time.perf_counter()
+            for chunk in chunks:
+                fn(payload, chunk)
+            best = min(best, time.perf_counter() - started)
+        return len(chunks) / best if best > 0 else 0.0
+
+    mismatches = sum(
+        1 for chunk in chunks
+        if infer_tags_from_payload(payload, chunk) != _infer_tags_per_keyword(payload, chunk)
+    )
+    before = throughput(_infer_tags_per_keyword)
+    after = throughput(infer_tags_from_payload)
+
+    return {
+        "chunks": len(chunks),
+        "taxonomy_version": get_taxonomy().version,
+        "keywords": len(get_taxonomy().matcher.keywords),
+        "mismatches": mismatches,
+        "per_keyword_chunks_per_sec": round(before, 1),
+        "compiled_chunks_per_sec": round(after, 1),
+        "speedup": round(after / before, 2) if before else None,
     }
 
-    for esp, keywords in especialidades.items():
-        if match_keywords(text, keywords):
-            tags["especialidad"] = esp
-            break
 
-    return tags
+if __name__ == "__main__":
+    import json
+
+    print(json.dumps(benchmark_tag_inference(), indent=2))
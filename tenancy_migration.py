@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+🏢 TENANCY: Estado y migración de puntos entre modos de QDRANT_TENANCY.
+
+- status: puntos por colección y por bot, con los bots candidatos a
+  colección propia (modo collection)
+- migrate: copia los puntos de cada bot de su ruta en el modo origen a la
+  ruta en el modo destino (colección / shard key), verifica el conteo y borra
+  el origen. Pasar a modo tenant además completa tenant_id en los puntos.
+
+Los puntos conservan su id y su vector: no se re-vectoriza nada. Hacia o
+desde el modo collection, QDRANT_DEDICATED_BOTS debe tener los bots dedicados
+al migrar. Después se cambia QDRANT_TENANCY y se reinicia el servicio.
+
+Uso:
+    python -m voia_vector_services.tenancy_migration status
+    python -m voia_vector_services.tenancy_migration migrate --from filter --to shard [--bots 1,2] [--dry-run]
+"""
+
+import os
+from typing import Dict, List, Optional
+
+from qdrant_client.models import FieldCondition, Filter, FilterSelector, MatchValue, PointStruct
+
+from .service_registry import get_qdrant_client
+from .vector_store import (
+    PointWriter, TENANCY_MODES, QDRANT_TENANCY, ensure_tenant_route, tenant_collections, tenant_route
+)
+
+# Puntos a partir de los cuales un bot se sugiere para colección propia
+QDRANT_DEDICATED_MIN_POINTS = int(os.getenv("QDRANT_DEDICATED_MIN_POINTS", "1000000"))
+
+
+def _bot_filter(bot_id: int) -> Filter:
+    # Siempre por bot_id: los puntos anteriores al modo tenant no tienen tenant_id
+    return Filter(must=[FieldCondition(key="bot_id", match=MatchValue(value=bot_id))])
+
+
+def bot_point_counts(client, mode: Optional[str] = None) -> Dict[int, int]:
+    """Puntos por bot en todas las colecciones del modo (facet sobre bot_id)."""
+    counts: Dict[int, int] = {}
+    for collection_name in tenant_collections(mode):
+        if not client.collection_exists(collection_name):
+            continue
+        hits = client.facet(collection_name=collection_name, key="bot_id", limit=1_000_000, exact=True).hits
+        for hit in hits:
+            counts[hit.value] = counts.get(hit.value, 0) + hit.count
+    return counts
+
+
+def tenancy_status(client=None) -> Dict:
+    """Modo vigente, tamaño de cada colección y bots más grandes."""
+    client = client or get_qdrant_client()
+    collections = {
+        name: client.count(collection_name=name, exact=False).count
+        for name in tenant_collections()
+        if client.collection_exists(name)
+    }
+    counts = bot_point_counts(client)
+    largest = sorted(counts.items(), key=lambda item: -item[1])[:10]
+
+    return {
+        "mode": QDRANT_TENANCY,
+        "collections": collections,
+        "bots": len(counts),
+        "largest_bots": [{"bot_id": bot_id, "points": points} for bot_id, points in largest],
+        "dedicated_candidates": [bot_id for bot_id, points in largest if points >= QDRANT_DEDICATED_MIN_POINTS],
+    }
+
+
+def _copy_bot(client, source, target, batch_size: int) -> int:
+    """Copia los puntos (id, vector, payload) del bot de una ruta a otra."""
+    writer = PointWriter(client, collection_name=target.collection_name, shard_key=target.shard_key)
+    copied = 0
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            **source.kwargs,
+            scroll_filter=_bot_filter(source.bot_id),
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True
+        )
+        for point in points:
+            writer.add(PointStruct(id=point.id, vector=point.vector, payload={**point.payload, **target.payload}))
+        copied += len(points)
+        if offset is None or not points:
+            break
+    writer.flush()
+    return copied
+
+
+def migrate_tenancy(
+    from_mode: str,
+    to_mode: str,
+    bot_ids: Optional[List[int]] = None,
+    batch_size: int = 256,
+    dry_run: bool = False
+) -> Dict:
+    """
+    Mueve los puntos de cada bot de su ruta en from_mode a la de to_mode.
+
+    Args:
+        from_mode: Modo actual (filter | tenant | shard | collection)
+        to_mode: Modo destino
+        bot_ids: Bots a migrar (default: todos los del modo origen)
+        batch_size: Puntos por página de scroll
+        dry_run: Solo reportar qué se movería
+
+    Returns:
+        dict con los bots migrados, puntos copiados y los que se omitieron
+    """
+    for mode in (from_mode, to_mode):
+        if mode not in TENANCY_MODES:
+            raise ValueError(f"Modo inválido: {mode} (opciones: {', '.join(TENANCY_MODES)})")
+
+    client = get_qdrant_client()
+    counts = bot_point_counts(client, from_mode)
+    bot_ids = bot_ids if bot_ids is not None else sorted(counts)
+
+    report = {"from": from_mode, "to": to_mode, "dry_run": dry_run, "bots": [], "points_copied": 0}
+    print(f"🏢 Migrando {len(bot_ids)} bots: {from_mode} -> {to_mode}")
+
+    for bot_id in bot_ids:
+        source = tenant_route(bot_id, from_mode)
+        target = tenant_route(bot_id, to_mode)
+        entry = {
+            "bot_id": bot_id,
+            "points": counts.get(bot_id, 0),
+            "source": f"{source.collection_name}:{source.shard_key or '-'}",
+            "target": f"{target.collection_name}:{target.shard_key or '-'}",
+        }
+        report["bots"].append(entry)
+        moves = (source.collection_name, source.shard_key) != (target.collection_name, target.shard_key)
+        if dry_run or not entry["points"]:
+            continue
+
+        if not moves:
+            # Misma ubicación: solo completar tenant_id (sin tocar vectores)
+            client.set_payload(**source.kwargs, payload=target.payload, points=_bot_filter(bot_id))
+            continue
+
+        ensure_tenant_route(client, target)
+        copied = _copy_bot(client, source, target, batch_size)
+        stored = client.count(**target.kwargs, count_filter=_bot_filter(bot_id), exact=True).count
+        if stored < copied:
+            # No borrar el origen si la copia no quedó completa
+            entry["error"] = f"copiados {copied}, en destino {stored}"
+            print(f"❌ Bot {bot_id}: {entry['error']}")
+            continue
+
+        client.delete(**source.kwargs, points_selector=FilterSelector(filter=_bot_filter(bot_id)))
+        entry["copied"] = copied
+        report["points_copied"] += copied
+        print(f"   ✅ Bot {bot_id}: {copied} puntos -> {entry['target']}")
+
+    if not dry_run:
+        print(f"✅ Migración completa. Configurar QDRANT_TENANCY={to_mode} y reiniciar el servicio.")
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Estado y migración de la estrategia multi-tenant de Qdrant")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("status")
+    migrate = subparsers.add_parser("migrate")
+    migrate.add_argument("--from", dest="from_mode", default=QDRANT_TENANCY, choices=TENANCY_MODES)
+    migrate.add_argument("--to", dest="to_mode", required=True, choices=TENANCY_MODES)
+    migrate.add_argument("--bots", default=None, help="IDs separados por coma (default: todos)")
+    migrate.add_argument("--batch-size", type=int, default=256)
+    migrate.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    if args.command == "status":
+        result = tenancy_status()
+    else:
+        result = migrate_tenancy(
+            args.from_mode,
+            args.to_mode,
+            bot_ids=[int(b) for b in args.bots.split(",")] if args.bots else None,
+            batch_size=args.batch_size,
+            dry_run=args.dry_run
+        )
+    print(json.dumps(result, indent=2))
@@ -1,10 +1,176 @@
 """
 Chunking inteligente para documentos.
 Divide textos largos en fragmentos óptimos para embedding y búsqueda.
+
+Modos (CHUNKING_MODE):
+- tokens: chunks medidos en word-pieces del tokenizer del modelo, que caben
+  exactamente en su ventana (256 en all-MiniLM-L6-v2) y llevan sus token ids
+  para vectorizar sin volver a tokenizar (default)
+- chars: chunks de ~512 caracteres (modo original)
+
+Con CONTENT_DEFINED_CHUNKS (default) los pipelines cortan en límites
+definidos por el contenido (iter_content_defined_chunks), lo que permite
+re-indexar solo los chunks que cambiaron (ver chunk_index). CDC decide dónde
+terminan los chunks; CHUNKING_MODE sigue decidiendo en qué se miden: en modo
+tokens el tamaño máximo es la ventana del modelo y la superposición es de
+TOKEN_CHUNK_OVERLAP word-pieces, igual que sin CDC.
+
+Los chunkers trabajan en streaming (iter_chunks, iter_chunks_for_embedding):
+aceptan texto, un stream o un iterador de páginas y generan chunks a medida
+que avanzan, en tiempo lineal y con memoria acotada.
 """
 
+import hashlib
+import itertools
+import multiprocessing as mp
+import os
 import re
-from typing import List, Tuple
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+CHUNKING_MODE = os.getenv("CHUNKING_MODE", "tokens").lower()
+# Superposición entre chunks en modo tokens (word-pieces)
+TOKEN_CHUNK_OVERLAP = int(os.getenv("TOKEN_CHUNK_OVERLAP", "32"))
+# Cota holgada de caracteres por token: evita tokenizar texto que el modelo
+# igual descartaría al truncar
+MAX_CHARS_PER_TOKEN = 32
+
+_SENTENCE_END = re.compile(r'[.!?]$')
+_SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+
+# Texto como string, stream de texto (objeto con .read) o iterador de páginas
+TextSource = Union[str, Iterable[str]]
+# Bloque leído por vez de un stream de texto
+STREAM_READ_SIZE = 64 * 1024
+# Una "oración" sin puntuación no puede crecer más que esto (OCR sin puntos)
+MAX_SENTENCE_CHARS = 8192
+# En modo tokens, el texto se tokeniza por segmentos de este tamaño (memoria acotada)
+TOKEN_SEGMENT_CHARS = 256 * 1024
+# Límites definidos por contenido: un chunk termina donde lo decide el hash de
+# su última oración, así una edición solo desplaza los chunks vecinos
+CONTENT_DEFINED_CHUNKS = os.getenv("CONTENT_DEFINED_CHUNKS", "true").lower() == "true"
+# 1 de cada N oraciones es límite de chunk (tamaño medio ~N oraciones)
+CDC_BOUNDARY_DIVISOR = int(os.getenv("CDC_BOUNDARY_DIVISOR", "4"))
+# Oraciones tokenizadas por llamada al tokenizer en CDC por tokens
+CDC_TOKENIZE_BATCH = 64
+# Chunks por ventana en los pipelines (generar → vectorizar → indexar)
+CHUNK_WINDOW_SIZE = int(os.getenv("CHUNK_WINDOW_SIZE", "256"))
+# Procesos para TextChunker.process_batch (0 = en el proceso actual)
+CHUNKING_WORKERS = int(os.getenv("CHUNKING_WORKERS", "0"))
+# Documentos máximos en vuelo por worker (acota la memoria del lote)
+CHUNKING_MAX_IN_FLIGHT_PER_WORKER = int(os.getenv("CHUNKING_MAX_IN_FLIGHT_PER_WORKER", "4"))
+
+
+def _iter_pieces(source: TextSource) -> Iterator[str]:
+    """Normaliza la fuente a un iterador de fragmentos de texto."""
+    if isinstance(source, str):
+        yield source
+    elif hasattr(source, "read"):
+        for block in iter(lambda: source.read(STREAM_READ_SIZE), ""):
+            yield block
+    else:
+        # Páginas: separarlas para no pegar la última palabra con la primera
+        for page in source:
+            if page:
+                yield page
+                yield "\n"
+
+
+def iter_sentences(source: TextSource, max_sentence_chars: int = MAX_SENTENCE_CHARS) -> Iterator[str]:
+    """
+    Genera oraciones desde un string, un stream o un iterador de páginas.
+    
+    Solo conserva en memoria la oración incompleta del final de cada fragmento;
+    si no aparece puntuación, corta en un espacio al llegar a max_sentence_chars.
+    """
+    remainder = ""
+    for piece in _iter_pieces(source):
+        buffer = remainder + piece if remainder else piece
+        position = 0
+        for match in _SENTENCE_BOUNDARY.finditer(buffer):
+            sentence = buffer[position:match.start()].strip()
+            if sentence:
+                yield sentence
+            position = match.end()
+        
+        # Oración sin terminar: acotar su tamaño en lugar de acumular indefinidamente
+        while len(buffer) - position > max_sentence_chars:
+            cut = buffer.rfind(" ", position, position + max_sentence_chars)
+            cut = cut if cut > position else position + max_sentence_chars
+            sentence = buffer[position:cut].strip()
+            if sentence:
+                yield sentence
+            position = cut
+        
+        remainder = buffer[position:]
+    
+    remainder = remainder.strip()
+    if remainder:
+        yield remainder
+
+
+def _split_long_sentence(sentence: str, chunk_size: int) -> Iterator[str]:
+    """Parte en límites de palabra una oración que no cabe en un chunk."""
+    start = 0
+    while len(sentence) - start > chunk_size:
+        cut = sentence.rfind(" ", start, start + chunk_size + 1)
+        cut = cut if cut > start else start + chunk_size
+        yield sentence[start:cut].strip()
+        start = cut
+        while start < len(sentence) and sentence[start] == " ":
+            start += 1
+    if start < len(sentence):
+        yield sentence[start:]
+
+
+def _overlap_tail(chunk: str, overlap: int) -> str:
+    """Últimos ~overlap caracteres del chunk, empezando en límite de palabra."""
+    if overlap <= 0:
+        return ""
+    if len(chunk) <= overlap:
+        return chunk
+    tail = chunk[-overlap:]
+    space = tail.find(" ")
+    return tail[space + 1:] if space >= 0 else ""
+
+
+def iter_chunks(
+    source: TextSource,
+    chunk_size: int = 512,
+    overlap: int = 50
+) -> Iterator[str]:
+    """
+    Chunker por oraciones en streaming: tiempo lineal y memoria acotada.
+    
+    Cada chunk nuevo arranca con los últimos ~overlap caracteres del anterior
+    (cortados en límite de palabra). Las oraciones más largas que chunk_size
+    se parten en límites de palabra.
+    
+    Args:
+        source: Texto, stream de texto (objeto con .read) o iterador de páginas
+        chunk_size: Tamaño máximo en caracteres
+        overlap: Superposición entre chunks consecutivos (en caracteres)
+    
+    Yields:
+        Chunks en orden
+    """
+    parts: List[str] = []
+    length = 0
+    
+    for sentence in iter_sentences(source):
+        for piece in _split_long_sentence(sentence, chunk_size):
+            if parts and length + 1 + len(piece) > chunk_size:
+                chunk = " ".join(parts)
+                yield chunk
+                tail = _overlap_tail(chunk, min(overlap, chunk_size - len(piece) - 1))
+                parts, length = ([tail], len(tail)) if tail else ([], 0)
+            
+            length = length + 1 + len(piece) if parts else len(piece)
+            parts.append(piece)
+    
+    if parts:
+        yield " ".join(parts)
 
 
 def split_into_chunks(
@@ -31,25 +197,8 @@ def split_into_chunks(
     chunks = []
     
     if sentence_aware:
-        # ✅ Opción 1: Dividir por oraciones
-        sentences = re.split(r'(?<=[.!?])\s+', text)
-        current_chunk = ""
-        
-        for sentence in sentences:
-            sentence = sentence.strip()
-            if not sentence:
-                continue
-            
-            # Si agregar esta oración excede el límite
-            if len(current_chunk) + len(sentence) + 1 > chunk_size and current_chunk:
-                chunks.append(current_chunk.strip())
-                # Iniciar nuevo chunk con overlap
-                current_chunk = " ".join(current_chunk.split()[-5:]) + " " + sentence
-            else:
-                current_chunk += " " + sentence if current_chunk else sentence
-        
-        if current_chunk.strip():
-            chunks.append(current_chunk.strip())
+        # ✅ Opción 1: Dividir por oraciones (chunker en streaming)
+        chunks = list(iter_chunks(text, chunk_size=chunk_size, overlap=overlap))
     
     else:
         # ✅ Opción 2: Dividir por caracteres (rápido)
@@ -61,6 +210,384 @@ def split_into_chunks(
     return chunks
 
 
+def _is_content_boundary(sentence: str, divisor: int) -> bool:
+    """True si la oración cierra un chunk (depende solo de su contenido)."""
+    normalized = " ".join(sentence.split()).encode("utf-8")
+    digest = hashlib.blake2b(normalized, digest_size=4).digest()
+    return int.from_bytes(digest, "little") % divisor == 0
+
+
+def iter_content_defined_chunks(
+    source: TextSource,
+    min_chars: int = 256,
+    max_chars: int = 512,
+    overlap: int = 50,
+    boundary_divisor: int = CDC_BOUNDARY_DIVISOR
+) -> Iterator[str]:
+    """
+    Chunker por oraciones con límites definidos por contenido (CDC).
+    
+    Un chunk se cierra tras una oración cuyo hash es múltiplo de
+    boundary_divisor (si ya tiene min_chars), o antes de superar max_chars.
+    Como los cortes dependen del texto y no de la posición, insertar o
+    borrar una oración solo cambia los chunks cercanos; los siguientes se
+    resincronizan en el próximo límite y conservan su hash.
+    
+    Args:
+        source: Texto, stream de texto o iterador de páginas
+        min_chars: Tamaño mínimo antes de aceptar un límite de contenido
+        max_chars: Tamaño máximo de un chunk
+        overlap: Superposición con el chunk anterior (en caracteres)
+        boundary_divisor: 1 de cada N oraciones es candidata a límite
+    """
+    parts: List[str] = []
+    length = 0
+    pending = False  # hay contenido nuevo (no solo overlap) sin emitir
+    
+    for sentence in iter_sentences(source):
+        for piece in _split_long_sentence(sentence, max_chars):
+            if pending and length + 1 + len(piece) > max_chars:
+                chunk = " ".join(parts)
+                yield chunk
+                tail = _overlap_tail(chunk, min(overlap, max_chars - len(piece) - 1))
+                parts, length, pending = ([tail] if tail else []), len(tail), False
+            
+            length = length + 1 + len(piece) if parts else len(piece)
+            parts.append(piece)
+            pending = True
+            
+            if length >= min_chars and _is_content_boundary(piece, boundary_divisor):
+                chunk = " ".join(parts)
+                yield chunk
+                tail = _overlap_tail(chunk, overlap)
+                parts, length, pending = ([tail] if tail else []), len(tail), False
+    
+    if pending:
+        yield " ".join(parts)
+
+
+def _token_budget(max_tokens: Optional[int]) -> int:
+    """Word-pieces disponibles por chunk (ventana del modelo menos [CLS] y [SEP])."""
+    if max_tokens:
+        return max_tokens
+    from .service_registry import get_max_seq_length
+
+    return get_max_seq_length() - 2
+
+
+def _tokenizer():
+    from .service_registry import get_embedding_tokenizer
+
+    return get_embedding_tokenizer()
+
+
+def _tokenize_with_offsets(texts: List[str], tokenizer=None) -> dict:
+    if tokenizer is None:
+        tokenizer = _tokenizer()
+    return tokenizer(
+        texts,
+        add_special_tokens=False,
+        return_offsets_mapping=True,
+        return_attention_mask=False,
+        return_token_type_ids=False,
+        verbose=False
+    )
+
+
+def _is_word_start(text: str, offsets: list, i: int) -> bool:
+    """True si cortar antes del token i no parte una palabra en dos."""
+    if i <= 0 or i >= len(offsets):
+        return True
+    prev_end, start = offsets[i - 1][1], offsets[i][0]
+    if start > prev_end:
+        return True
+    return not (text[start].isalnum() and text[prev_end - 1].isalnum())
+
+
+def _best_cut(text: str, offsets: list, start: int, end: int, sentence_aware: bool) -> int:
+    """Mejor punto de corte en (start, end]: fin de oración, si no, límite de palabra."""
+    if sentence_aware:
+        floor = start + (end - start) // 2
+        for j in range(end, floor, -1):
+            token = text[offsets[j - 1][0]:offsets[j - 1][1]]
+            if _SENTENCE_END.search(token) or "\n" in text[offsets[j - 1][1]:offsets[j][0]]:
+                return j
+    for j in range(end, start, -1):
+        if _is_word_start(text, offsets, j):
+            return j
+    return end
+
+
+def split_into_token_chunks(
+    text: str,
+    max_tokens: Optional[int] = None,
+    overlap_tokens: int = TOKEN_CHUNK_OVERLAP,
+    sentence_aware: bool = True,
+    tokenizer=None
+) -> List[dict]:
+    """
+    Divide texto en chunks que caben exactamente en la ventana del modelo.
+    
+    Tokeniza una sola vez con offset mapping; cada chunk es un slice del texto
+    original que empieza y termina en límite de palabra (de oración si es posible).
+    
+    Args:
+        text: Texto a dividir
+        max_tokens: Word-pieces por chunk (default: ventana del modelo - 2)
+        overlap_tokens: Superposición entre chunks consecutivos (en tokens)
+        sentence_aware: Si True, prefiere cortar al final de una oración
+        tokenizer: Tokenizer a usar (default: el del modelo de embeddings)
+    
+    Returns:
+        Lista de {"text", "token_ids", "start", "end"} (start/end en caracteres)
+    """
+    max_tokens = _token_budget(max_tokens)
+    overlap_tokens = min(overlap_tokens, max_tokens // 2)
+    encoding = _tokenize_with_offsets([text], tokenizer)
+    ids = encoding["input_ids"][0]
+    offsets = encoding["offset_mapping"][0]
+    
+    chunks = []
+    start = 0
+    while start < len(ids):
+        end = min(start + max_tokens, len(ids))
+        if end < len(ids):
+            end = _best_cut(text, offsets, start, end, sentence_aware)
+        
+        chunks.append({
+            "text": text[offsets[start][0]:offsets[end - 1][1]],
+            "token_ids": list(ids[start:end]),
+            "start": offsets[start][0],
+            "end": offsets[end - 1][1],
+        })
+        if end >= len(ids):
+            break
+        
+        # Retroceder overlap_tokens sin partir palabras y avanzando siempre
+        next_start = max(end - overlap_tokens, start + 1)
+        while next_start > start + 1 and not _is_word_start(text, offsets, next_start):
+            next_start -= 1
+        while next_start < end and not _is_word_start(text, offsets, next_start):
+            next_start += 1
+        start = next_start
+    
+    return chunks
+
+
+def truncate_to_token_budget(
+    texts: List[str],
+    max_tokens: Optional[int] = None,
+    tokenizer=None
+) -> Tuple[List[str], List[List[int]]]:
+    """
+    Recorta cada texto a lo que el modelo realmente ve y retorna sus token ids.
+    
+    Reemplaza el recorte fijo de 8000 caracteres: el modelo solo atiende a
+    max_seq_length word-pieces, así que el resto se trunca de todas formas.
+    
+    Returns:
+        (textos recortados, token ids sin [CLS]/[SEP])
+    """
+    max_tokens = _token_budget(max_tokens)
+    char_cap = max_tokens * MAX_CHARS_PER_TOKEN
+    capped = [text[:char_cap] for text in texts]
+    encoding = _tokenize_with_offsets(capped, tokenizer)
+    
+    fitted_texts, fitted_ids = [], []
+    for text, ids, offsets in zip(capped, encoding["input_ids"], encoding["offset_mapping"]):
+        if len(ids) > max_tokens:
+            end = _best_cut(text, offsets, 0, max_tokens, sentence_aware=False)
+            print(f"⚠️ Texto excede la ventana del modelo ({len(ids)}+ tokens), recortando a {end}")
+            text, ids = text[:offsets[end - 1][1]], ids[:end]
+        fitted_texts.append(text)
+        fitted_ids.append(list(ids))
+    
+    return fitted_texts, fitted_ids
+
+
+def iter_chunks_for_embedding(
+    source: TextSource,
+    mode: Optional[str] = None
+) -> Iterator[Tuple[str, Optional[List[int]]]]:
+    """
+    Chunking usado por los pipelines de indexación, en streaming.
+    
+    En modo tokens el texto se tokeniza por segmentos (cortados en fin de
+    oración) para no materializar los token ids de un documento completo.
+    
+    Yields:
+        (chunk, token ids); token ids es None en modo chars
+    """
+    if CONTENT_DEFINED_CHUNKS:
+        yield from _iter_content_defined_for_embedding(source, mode or CHUNKING_MODE)
+        return
+    
+    if (mode or CHUNKING_MODE) == "tokens":
+        segments = iter_chunks(source, chunk_size=TOKEN_SEGMENT_CHARS, overlap=0)
+        first = next(segments, None)
+        if first is None:
+            return
+        try:
+            first_chunks = split_into_token_chunks(first)
+        except Exception as e:
+            print(f"⚠️ Chunking por tokens no disponible ({str(e)[:100]}), usando caracteres")
+            # Sin materializar el resto del documento: first vuelve al inicio del stream
+            for chunk in iter_chunks(itertools.chain((first,), segments), chunk_size=512, overlap=50):
+                yield chunk, None
+            return
+        
+        for chunk in first_chunks:
+            yield chunk["text"], chunk["token_ids"]
+        for segment in segments:
+            for chunk in split_into_token_chunks(segment):
+                yield chunk["text"], chunk["token_ids"]
+        return
+    
+    for chunk in iter_chunks(source, chunk_size=512, overlap=50):
+        yield chunk, None
+
+
+def _iter_tokenized_sentences(source: TextSource, tokenizer) -> Iterator[Tuple[str, List[int]]]:
+    """Oraciones con sus token ids, tokenizadas en lotes de CDC_TOKENIZE_BATCH."""
+    batch: List[str] = []
+    for sentence in iter_sentences(source):
+        batch.append(sentence)
+        if len(batch) >= CDC_TOKENIZE_BATCH:
+            yield from zip(batch, _tokenize_with_offsets(batch, tokenizer)["input_ids"])
+            batch = []
+    if batch:
+        yield from zip(batch, _tokenize_with_offsets(batch, tokenizer)["input_ids"])
+
+
+def iter_content_defined_token_chunks(
+    source: TextSource,
+    max_tokens: Optional[int] = None,
+    overlap_tokens: int = TOKEN_CHUNK_OVERLAP,
+    boundary_divisor: int = CDC_BOUNDARY_DIVISOR,
+    tokenizer=None
+) -> Iterator[Tuple[str, List[int]]]:
+    """
+    CDC medido en word-pieces: mismos límites por contenido que
+    iter_content_defined_chunks, pero cada chunk cabe en max_tokens y arranca
+    con los últimos ~overlap_tokens tokens del anterior (en límite de palabra).
+    
+    Yields:
+        (chunk, token ids del chunk)
+    """
+    max_tokens = _token_budget(max_tokens)
+    overlap_tokens = min(overlap_tokens, max_tokens // 2)
+    min_tokens = max_tokens // 4
+    tokenizer = tokenizer or _tokenizer()
+    
+    parts: List[str] = []
+    count = 0
+    pending = False  # hay contenido nuevo (no solo overlap) sin emitir
+    
+    def emit(overlap: int) -> Iterator[Tuple[str, List[int]]]:
+        """Emite el chunk acumulado y deja en parts su cola de overlap tokens."""
+        nonlocal parts, count, pending
+        chunk = " ".join(parts)
+        encoding = _tokenize_with_offsets([chunk], tokenizer)
+        ids, offsets = encoding["input_ids"][0], encoding["offset_mapping"][0]
+        if len(ids) <= max_tokens:
+            yield chunk, list(ids)
+        else:
+            # La suma por oración puede diferir del chunk unido en algún token
+            for piece in split_into_token_chunks(chunk, max_tokens=max_tokens, overlap_tokens=0, tokenizer=tokenizer):
+                yield piece["text"], piece["token_ids"]
+        
+        start = len(ids) - overlap if 0 < overlap < len(ids) else len(ids)
+        while start < len(ids) and not _is_word_start(chunk, offsets, start):
+            start += 1
+        tail = chunk[offsets[start][0]:] if start < len(ids) else ""
+        parts, count, pending = ([tail] if tail else []), len(ids) - start, False
+    
+    for sentence, sentence_ids in _iter_tokenized_sentences(source, tokenizer):
+        if len(sentence_ids) > max_tokens:
+            pieces = [
+                (piece["text"], len(piece["token_ids"]))
+                for piece in split_into_token_chunks(sentence, max_tokens=max_tokens, overlap_tokens=0, tokenizer=tokenizer)
+            ]
+        else:
+            pieces = [(sentence, len(sentence_ids))]
+        
+        for piece, piece_tokens in pieces:
+            if pending and count + piece_tokens > max_tokens:
+                yield from emit(min(overlap_tokens, max_tokens - piece_tokens))
+            
+            parts.append(piece)
+            count += piece_tokens
+            pending = True
+            
+            if count >= min_tokens and _is_content_boundary(piece, boundary_divisor):
+                yield from emit(overlap_tokens)
+    
+    if pending:
+        yield from emit(0)
+
+
+def _iter_content_defined_for_embedding(
+    source: TextSource,
+    mode: str
+) -> Iterator[Tuple[str, Optional[List[int]]]]:
+    """
+    CDC para los pipelines, medido según el modo: en tokens, a la medida de
+    la ventana del modelo con TOKEN_CHUNK_OVERLAP; en chars, ~512/50 caracteres.
+    """
+    if mode == "tokens":
+        try:
+            budget = _token_budget(None)
+            tokenizer = _tokenizer()
+        except Exception as e:
+            print(f"⚠️ Chunking por tokens no disponible ({str(e)[:100]}), usando caracteres")
+            mode = "chars"
+    
+    if mode != "tokens":
+        for chunk in iter_content_defined_chunks(source, min_chars=256, max_chars=512, overlap=50):
+            yield chunk, None
+        return
+    
+    yield from iter_content_defined_token_chunks(source, max_tokens=budget, tokenizer=tokenizer)
+
+
+def iter_chunk_windows(
+    source: TextSource,
+    window: int = CHUNK_WINDOW_SIZE,
+    mode: Optional[str] = None
+) -> Iterator[Tuple[List[str], Optional[List[List[int]]]]]:
+    """
+    Agrupa iter_chunks_for_embedding en ventanas para vectorizar por lotes.
+    
+    Yields:
+        (chunks, token ids por chunk o None)
+    """
+    texts, token_ids = [], []
+    for text, ids in iter_chunks_for_embedding(source, mode):
+        texts.append(text)
+        token_ids.append(ids)
+        if len(texts) >= window:
+            yield texts, (token_ids if token_ids[0] is not None else None)
+            texts, token_ids = [], []
+    if texts:
+        yield texts, (token_ids if token_ids[0] is not None else None)
+
+
+def split_for_embedding(
+    text: str,
+    mode: Optional[str] = None
+) -> Tuple[List[str], Optional[List[List[int]]]]:
+    """
+    Versión en lista de iter_chunks_for_embedding.
+    
+    Returns:
+        (chunks, token ids por chunk); token ids es None en modo chars
+    """
+    chunks = list(iter_chunks_for_embedding(text, mode))
+    if chunks and chunks[0][1] is not None:
+        return [text for text, _ in chunks], [ids for _, ids in chunks]
+    return [text for text, _ in chunks], None
+
+
 def chunk_with_metadata(
     text: str,
     chunk_size: int = 512,
@@ -140,61 +667,114 @@ class TextChunker:
             "short_chunks_removed": 0
         }
     
-    def process_document(self, text: str, doc_id: int = None) -> List[dict]:
+    def iter_document(self, text: TextSource, doc_id: int = None, verbose: bool = True) -> Iterator[dict]:
         """
-        Procesa un documento completo.
+        Procesa un documento en streaming (texto, stream o iterador de páginas).
+        
+        Aplica los mismos filtros que optimize_chunks_for_search (duplicados y
+        chunks < 50 chars) a medida que se generan los chunks.
         """
-        print(f"\n📄 Procesando documento {doc_id or 'unknown'}...")
-        print(f"   Tamaño: {len(text):,} caracteres")
-        
-        # Dividir en chunks
-        chunks = split_into_chunks(
-            text,
-            chunk_size=self.chunk_size,
-            overlap=self.overlap,
-            sentence_aware=True
-        )
+        if verbose:
+            print(f"\n📄 Procesando documento {doc_id or 'unknown'}...")
+            if isinstance(text, str):
+                print(f"   Tamaño: {len(text):,} caracteres")
         
-        print(f"   Chunks creados: {len(chunks)}")
+        seen = set()
+        created = kept = 0
         
-        # Optimizar
-        optimized = optimize_chunks_for_search(chunks)
+        for i, chunk in enumerate(iter_chunks(text, chunk_size=self.chunk_size, overlap=self.overlap)):
+            created += 1
+            self.stats["total_chunks_created"] += 1
+            normalized = " ".join(chunk.split()).lower()
+            
+            if normalized in seen:
+                self.stats["duplicates_removed"] += 1
+                continue
+            if len(chunk) < 50:
+                self.stats["short_chunks_removed"] += 1
+                continue
+            
+            seen.add(normalized)
+            kept += 1
+            yield {"text": chunk, "length": len(chunk), "order": i}
         
-        # Actualizar stats
         self.stats["documents_processed"] += 1
-        self.stats["total_chunks_created"] += len(chunks)
-        self.stats["duplicates_removed"] += len(chunks) - len(optimized)
-        
-        return optimized
+        if verbose:
+            print(f"   📊 Chunks creados: {created} → Optimizado: {kept} chunks")
     
-    def process_batch(self, documents: List[Tuple[str, int]]) -> List[dict]:
+    def process_document(self, text: TextSource, doc_id: int = None) -> List[dict]:
         """
-        Procesa múltiples documentos.
+        Procesa un documento completo.
+        """
+        return list(self.iter_document(text, doc_id))
+    
+    def process_batch(
+        self,
+        documents: Iterable[Tuple[str, int]],
+        workers: Optional[int] = None,
+        max_in_flight: Optional[int] = None
+    ) -> List[dict]:
+        """
+        Procesa múltiples documentos, en paralelo si hay workers.
         
         Args:
-            documents: Lista de (text, doc_id) tuples
+            documents: Lista (o iterador) de (text, doc_id) tuples
+            workers: Procesos para chunking (default: CHUNKING_WORKERS; 0 = proceso actual)
+            max_in_flight: Documentos enviados y sin recoger (default: 4 por worker);
+                           acota la memoria cuando documents es un iterador
         
         Returns:
-            Lista de chunks procesados
+            Lista de chunks procesados, en el orden de los documentos
         """
+        workers = CHUNKING_WORKERS if workers is None else workers
         all_chunks = []
         
-        for text, doc_id in documents:
-            chunks = self.process_document(text, doc_id)
-            all_chunks.extend(chunks)
+        if workers <= 0:
+            for text, doc_id in documents:
+                all_chunks.extend(self.iter_document(text, doc_id, verbose=False))
+        else:
+            max_in_flight = max(1, max_in_flight or workers * CHUNKING_MAX_IN_FLIGHT_PER_WORKER)
+            pending = deque()
+            
+            # spawn: el proceso padre puede tener hilos de torch/onnxruntime activos
+            with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn")) as executor:
+                for text, doc_id in documents:
+                    if len(pending) >= max_in_flight:
+                        all_chunks.extend(self._merge_worker_result(pending.popleft().result()))
+                    pending.append(executor.submit(
+                        _process_document_in_worker, self.chunk_size, self.overlap, text, doc_id
+                    ))
+                while pending:
+                    all_chunks.extend(self._merge_worker_result(pending.popleft().result()))
         
-        print(f"\n✅ Lote completado:")
-        print(f"   Documentos: {self.stats['documents_processed']}")
-        print(f"   Chunks totales: {self.stats['total_chunks_created']}")
-        print(f"   Duplicados eliminados: {self.stats['duplicates_removed']}")
+        print(
+            f"✅ Lote completado: {self.stats['documents_processed']} documentos, "
+            f"{self.stats['total_chunks_created']} chunks "
+            f"({self.stats['duplicates_removed']} duplicados y "
+            f"{self.stats['short_chunks_removed']} cortos eliminados)"
+        )
         
         return all_chunks
     
+    def _merge_worker_result(self, result: Tuple[List[dict], dict]) -> List[dict]:
+        """Suma las estadísticas de un worker y retorna sus chunks."""
+        chunks, stats = result
+        for key, value in stats.items():
+            self.stats[key] += value
+        return chunks
+    
     def get_stats(self) -> dict:
         """Retorna estadísticas."""
         return self.stats.copy()
 
 
+def _process_document_in_worker(chunk_size: int, overlap: int, text: str, doc_id: int) -> Tuple[List[dict], dict]:
+    """Chunking de un documento en un proceso worker: retorna (chunks, estadísticas)."""
+    chunker = TextChunker(chunk_size=chunk_size, overlap=overlap)
+    chunks = list(chunker.iter_document(text, doc_id, verbose=False))
+    return chunks, chunker.stats
+
+
 # ============================================
 # FUNCIONES DE UTILIDAD
 # ============================================
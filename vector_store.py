@@ -1,722 +1,236 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
-
-app = FastAPI(
-    title="Voia Vector Services",
-    description="API para procesar documentos, URLs y textos planos, generando embeddings y almacenándolos en Qdrant.",
-    version="1.1.0"
-)
+import os
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Tuple
 
-# ✅ Configuración de CORS (puedes restringir en producción)
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Ejemplo: ["http://localhost:3000"] si es frontend local
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+from qdrant_client.models import (
+    Distance, FieldCondition, Filter, MatchValue, PointIdsList, PointStruct, ShardingMethod, VectorParams
 )
+from .payload_indexes import ensure_payload_indexes
+from .service_registry import get_qdrant_client
+from .tag_inference import TAG_FIELDS, infer_tags_from_payload
 
+COLLECTION_NAME = "voia_vectors"
 
-# ✅ Endpoint raíz: status de la API
-@app.get("/")
-def read_root():
-    return {
-        "status": "ok",
-        "message": "🚀 API de Voia Vector Services funcionando correctamente.",
-        "endpoints": [
-            "/process-documents",
-            "/process-urls",
-            "/process-custom-texts",
-            "/process-all"
-        ]
-    }
-
-
-# ✅ Procesar documentos PDF
-@app.post("/process-documents/")
-def process_documents_endpoint():
-    try:
-        print("🚀 Iniciando procesamiento de documentos PDF...")
-        process_pending_documents()
-        return {"status": "ok", "message": "✅ Documentos procesados exitosamente."}
-    except Exception as e:
-        print(f"❌ Error en /process-documents: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
-
-
-# ✅ Procesar URLs (sitios web)
-@app.post("/process-urls/")
-def process_urls_endpoint():
-    try:
-        print("🚀 Iniciando procesamiento de URLs...")
-        process_pending_urls()
-        return {"status": "ok", "message": "✅ URLs procesadas exitosamente."}
-    except Exception as e:
-        print(f"❌ Error en /process-urls: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
-
-
-# ✅ Procesar textos planos
-@app.post("/process-custom-texts/")
-def process_custom_texts_endpoint():
-    try:
-        print("🚀 Iniciando procesamiento de textos planos...")
-        process_pending_custom_texts()
-        return {"status": "ok", "message": "✅ Textos planos procesados exitosamente."}
-    except Exception as e:
-        print(f"❌ Error en /process-custom-texts: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+# Puntos por request de upsert en la indexación
+QDRANT_UPSERT_BATCH_SIZE = int(os.getenv("QDRANT_UPSERT_BATCH_SIZE", "64"))
+# Requests de upsert sin confirmar por proceso
+QDRANT_MAX_IN_FLIGHT = int(os.getenv("QDRANT_MAX_IN_FLIGHT", "4"))
+
+# Estrategia multi-tenant (ver TENANCY): filter | tenant | shard | collection
+QDRANT_TENANCY = os.getenv("QDRANT_TENANCY", "filter").lower()
+# Grupos de bots (shard keys) en modo shard
+QDRANT_TENANT_SHARD_GROUPS = int(os.getenv("QDRANT_TENANT_SHARD_GROUPS", "8"))
+# Bots con colección propia en modo collection
+QDRANT_DEDICATED_BOTS = {
+    int(bot_id) for bot_id in os.getenv("QDRANT_DEDICATED_BOTS", "").split(",") if bot_id.strip()
+}
+SHARDED_COLLECTION_NAME = f"{COLLECTION_NAME}_sharded"
+# Espacio de nombres de los IDs deterministas (no cambiar: invalida los IDs existentes)
+POINT_ID_NAMESPACE = uuid.UUID("6f1c2f4e-8d0b-5a57-9a8e-3c2b7e5d9f10")
+# Campo keyword del tenant (is_tenant solo aplica a índices keyword/uuid)
+TENANT_FIELD = "tenant_id"
+TENANCY_MODES = ("filter", "tenant", "shard", "collection")
+
+
+# ============================================
+# ESQUEMA DE PAYLOAD
+# ============================================
+#
+# Qdrant mantiene los payloads en RAM: cada punto lleva solo lo que se filtra
+# o se usa para ordenar. El texto del chunk vive en MySQL (vector_chunks) y se
+# trae en bloque para el top-k (chunk_index.hydrate_payloads).
+
+PAYLOAD_VERSION = 2
+PAYLOAD_FIELDS = (
+    "bot_id", "tenant_id", "doc_id", "bot_template_id", "source", "content_hash",
+    "chunk_number", "taxonomy_version", *TAG_FIELDS, "chunk_tags", "semantic_tags",
+)
 
 
-# ✅ Procesar todo: documentos, URLs y textos planos
-@app.post("/process-all/")
-def process_all_endpoint():
-    try:
-        print("🚀 Iniciando procesamiento de documentos, URLs y textos planos...")
-        process_pending_documents()
-        process_pending_urls()
-        process_pending_custom_texts()
-        return {"status": "ok", "message": "✅ Documentos, URLs y textos planos procesados exitosamente."}
-    except Exception as e:
-        print(f"❌ Error en /process-all: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
-import mysql.connector
-from dotenv import load_dotenv
-import os
+def compact_payload(payload: Dict) -> Dict:
+    """Payload del punto en el esquema vigente (campos de filtro + versión)."""
+    compact = {field: payload[field] for field in PAYLOAD_FIELDS if payload.get(field) is not None}
+    compact["payload_version"] = PAYLOAD_VERSION
+    return compact
 
-load_dotenv()
 
-def get_connection():
-    return mysql.connector.connect(
-        host=os.getenv("DB_HOST"),
-        port=os.getenv("DB_PORT"),
-        user=os.getenv("DB_USER"),
-        password=os.getenv("DB_PASSWORD"),
-        database=os.getenv("DB_NAME"),
+def _create_collection(client, collection_name: str, sharded: bool = False) -> None:
+    client.create_collection(
+        collection_name=collection_name,
+        vectors_config=VectorParams(size=384, distance=Distance.COSINE),
+        sharding_method=ShardingMethod.CUSTOM if sharded else None
     )
-from sentence_transformers import SentenceTransformer
+    print(f"🆕 Colección '{collection_name}' creada.")
 
-# Carga del modelo de embeddings
-model = SentenceTransformer("all-MiniLM-L6-v2")
 
-def get_embedding(text):
-    # Convierte el texto en vector y lo devuelve como lista
-    return model.encode(text).tolist()
-# voia_vector_services/main.py
-from fastapi import FastAPI, Query, HTTPException  # 👈 Agregar HTTPException
-from dotenv import load_dotenv
-import os
+_ready_collections: set = set()
+_ready_shard_keys: set = set()
+_collection_lock = threading.Lock()
 
-# Cargar variables de entorno
-load_dotenv()
-# from process_documents import process_pending_documents # noqa  # Deshabilitado: rompe el flujo por ciclos/imports
-# from process_urls import process_pending_urls # noqa
-# from process_custom_texts import process_pending_custom_texts # noqa
-# from search_vectors import search_vectors # noqa
 
-from fastapi import FastAPI, Query
-from pydantic import BaseModel
-
-class SearchRequest(BaseModel):
-    query: str
-    bot_id: int
-    limit: int = 3
-
-# Instancia FastAPI
-app = FastAPI()
-
-# Endpoints existentes
-@app.get("/process_all")
-def process_all():
-    print("🚀 Procesando PDFs...")
-    process_pending_documents()
-    print("🌐 Procesando URLs...")
-    process_pending_urls()
-    print("📝 Procesando textos planos...")
-    process_pending_custom_texts()
-    return {"status": "success", "message": "All processing tasks have been initiated."}
-
-@app.get("/process_documents")
-def process_documents_endpoint(bot_id: int = Query(..., description="ID del bot para procesar documentos")):
-    try:
-        print(f"🚀 Procesando PDFs para el bot_id: {bot_id}...")
-        process_pending_documents(bot_id)
-        return {"status": "success", "message": f"Document processing initiated for bot {bot_id}."}
-    except Exception as e:
-        print(f"❌ Error en process_documents_endpoint: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
-
-@app.get("/process_urls")
-def process_urls_endpoint(bot_id: int = Query(..., description="ID del bot para procesar URLs")):
-    try:
-        print(f"🌐 Procesando URLs para el bot_id: {bot_id}...")
-        process_pending_urls(bot_id)
-        return {"status": "success", "message": f"URL processing initiated for bot {bot_id}."}
-    except Exception as e:
-        print(f"❌ Error en process_urls_endpoint: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
-
-@app.get("/process_texts")
-def process_texts_endpoint(bot_id: int = Query(..., description="ID del bot para procesar textos")):
-    try:
-        print(f"📝 Procesando textos para el bot_id: {bot_id}...")
-        process_pending_custom_texts(bot_id)
-        return {"status": "success", "message": f"Custom text processing initiated for bot {bot_id}."}
-    except Exception as e:
-        print(f"❌ Error en process_texts_endpoint: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
-
-# 🔹 Endpoint para búsqueda de vectores (NUEVO, para el chat dinámico)
-@app.post("/search")
-def search_vectors_endpoint(request: SearchRequest):
-    """
-    Busca vectores en Qdrant asociados a un bot dado y un query opcional.
-    """
-    try:
-        results = search_vectors(bot_id=request.bot_id, query=request.query, limit=request.limit)
-        return {"results": results}
-    except Exception as e:
-        print(f"❌ Error en el endpoint /search: {e}")
-        # Esto devolverá un error 500 al cliente C# con un mensaje específico
-        raise HTTPException(status_code=500, detail=f"Error interno en el servicio de búsqueda de Python: {str(e)}")
-
-# 🔹 Endpoint de búsqueda de vectores (ANTIGUO, restaurado para compatibilidad)
-@app.get("/search_vectors")
-def search_vectors_get_endpoint(
-    bot_id: int = Query(..., description="ID del bot"),
-    query: str = Query("", description="Texto de búsqueda opcional"),
-    limit: int = Query(5, description="Cantidad máxima de resultados")
-):
+def ensure_collection(client, collection_name: str, sharded: bool = False) -> None:
     """
-    Busca vectores en Qdrant. Mantenido por compatibilidad con flujos existentes.
+    Garantiza la colección y sus índices de payload. La verificación se hace
+    una vez por proceso y colección; las llamadas siguientes no hacen requests.
     """
-    try:
-        results = search_vectors(bot_id=bot_id, query=query, limit=limit)
-        return results
-    except Exception as e:
-        print(f"❌ Error en el endpoint /search_vectors: {e}")
-        raise HTTPException(status_code=500, detail=f"Error interno en el servicio de búsqueda de Python: {str(e)}")
-import uuid
-import hashlib
-# from db import get_connection  # Deshabilitado: rompe el flujo por ciclos/imports
-# from vector_store import get_or_create_vector_store
-# from embedder import get_embedding
-# from tag_utils import infer_tags_from_payload
-
-# client = get_or_create_vector_store()  # Deshabilitado: función no disponible por import
-
-def process_pending_custom_texts(bot_id: int):
-    print(f"🚀 Iniciando procesamiento de textos planos para el bot {bot_id}...")
-
-    conn = get_connection()
-    cursor = conn.cursor(dictionary=True)
+    if collection_name in _ready_collections:
+        return
 
-    try:
-        cursor.execute("""
-            SELECT id, content, bot_id, bot_template_id, user_id
-            FROM training_custom_texts
-            WHERE indexed = 0 AND bot_id = %s
-        """, (bot_id,))
-        texts = cursor.fetchall()
-
-        if not texts:
-            print(f"ℹ️ No hay textos planos pendientes por procesar para el bot {bot_id}.")
+    with _collection_lock:
+        if collection_name in _ready_collections:
             return
+        if not client.collection_exists(collection_name):
+            _create_collection(client, collection_name, sharded)
+        else:
+            print(f"✅ Colección '{collection_name}' ya existe.")
 
-        for item in texts:
-            try:
-                content = item['content'].strip()
-
-                if not content:
-                    print(f"⚠️ Texto vacío. ID {item['id']}")
-                    cursor.execute("UPDATE training_custom_texts SET indexed = -1 WHERE id = %s", (item['id'],))
-                    conn.commit()
-                    continue
-
-                content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
-
-                cursor.execute("""
-                    SELECT COUNT(*) as count FROM training_custom_texts
-                    WHERE content_hash = %s AND indexed = 1 AND bot_id = %s
-                """, (content_hash, bot_id))
-                if cursor.fetchone()['count'] > 0:
-                    print(f"⏩ Texto con contenido idéntico ya fue indexado para este bot. Se omite. ID {item['id']}")
-                    cursor.execute("UPDATE training_custom_texts SET indexed = 2 WHERE id = %s", (item['id'],))
-                    conn.commit()
-                    continue
-
-                qdrant_id = str(uuid.uuid4())
-
-                payload = {
-                    "type": "custom_text",
-                    "user_id": item.get('user_id'),
-                    "bot_id": item.get('bot_id'),
-                    "bot_template_id": item.get('bot_template_id'),
-                    "source": "training_custom_texts",
-                }
-
-                tags = infer_tags_from_payload(payload, content)
-                payload.update(tags)
-
-                print(f"🏷️ Etiquetas inferidas: {tags}")
-
-                client.upsert(
-                    collection_name="voia_vectors",
-                    points=[{
-                        "id": qdrant_id,
-                        "vector": get_embedding(content),
-                        "payload": payload
-                    }]
-                )
-
-                cursor.execute("""
-                    UPDATE training_custom_texts
-                    SET indexed = 1, qdrant_id = %s, content_hash = %s
-                    WHERE id = %s
-                """, (qdrant_id, content_hash, item['id']))
-
-                conn.commit()
-                print(f"✅ Texto plano ID {item['id']} procesado y vectorizado.")
-
-            except Exception as e:
-                print(f"❌ Error procesando texto ID {item['id']}: {e}")
-                cursor.execute("UPDATE training_custom_texts SET indexed = -1 WHERE id = %s", (item['id'],))
-                conn.commit()
-                raise Exception(f"Fallo al procesar el texto (ID: {item['id']}): {e}")
-
-    finally:
-        if 'conn' in locals() and conn.is_connected():
-            cursor.close()
-            conn.close()
-        print(f"\n🔚 Procesamiento de textos planos para el bot {bot_id} finalizado.")
-import os
-import uuid
-import hashlib
-from PyPDF2 import PdfReader
-from pdf2image import convert_from_path
-import pytesseract
-# from db import get_connection  # Deshabilitado: rompe el flujo por ciclos/imports
-# from vector_store import get_or_create_vector_store
-# from embedder import get_embedding
-# from tag_utils import infer_tags_from_payload
-
-# client = get_or_create_vector_store()
-
-def extract_text_from_pdf(path):
-    try:
-        reader = PdfReader(path)
-
-        # Verificar si el PDF está cifrado
-        if reader.is_encrypted:
-            try:
-                reader.decrypt("")  # Intenta desbloquear con contraseña vacía
-            except Exception:
-                raise Exception("Archivo PDF protegido con contraseña, no se puede procesar.")
-
-            if reader.is_encrypted:
-                raise Exception("Archivo PDF sigue cifrado, no se puede leer.")
+        # Índices de payload para los filtros (bot_id, doc_id, etiquetas...)
+        try:
+            ensure_payload_indexes(client, collection_name)
+        except Exception as e:
+            print(f"⚠️ No se pudieron asegurar los índices de payload: {e}")
+        _ready_collections.add(collection_name)
 
-        text = "\n".join(page.extract_text() or '' for page in reader.pages)
-        return text.strip()
-    except Exception as e:
-        print(f"❌ Error leyendo PDF {path}: {e}")
-        raise
 
-def extract_text_from_pdf_with_ocr(path):
-    try:
-        pages = convert_from_path(path)
-        text = ""
-        for page in pages:
-            text += pytesseract.image_to_string(page)
-        return text.strip()
-    except Exception as e:
-        print(f"❌ Error OCR PDF {path}: {e}")
-        return ""
+def get_or_create_vector_store():
+    """Cliente Qdrant con la colección compartida garantizada."""
+    client = get_qdrant_client()
+    ensure_collection(client, COLLECTION_NAME)
+    return client
 
-def index_document(qdrant_id, text, metadata):
-    try:
-        vector = get_embedding(text)
-        client.upsert(
-            collection_name="voia_vectors",
-            points=[{
-                "id": qdrant_id,
-                "vector": vector,
-                "payload": metadata
-            }]
-        )
-        print(f"✅ Documento indexado en Qdrant con ID: {qdrant_id}")
-    except Exception as e:
-        print(f"❌ Error al indexar en Qdrant: {e}")
-        raise
 
-def handle_invalid_pdf(path, doc_id, user_id, cursor, conn):
-    print(f"🗑️ Eliminando archivo inválido: {path}")
-    try:
-        if os.path.exists(path):
-            os.remove(path)
-            print("✅ Archivo eliminado.")
-        else:
-            print("⚠️ Archivo ya no existe.")
-    except Exception as e:
-        print(f"❌ Error al eliminar archivo: {e}")
+def reset_vector_store_cache() -> None:
+    """Olvida la verificación de las colecciones (tras borrarlas o recrearlas)."""
+    with _collection_lock:
+        _ready_collections.clear()
+        _ready_shard_keys.clear()
 
-    cursor.execute("UPDATE uploaded_documents SET indexed = -1 WHERE id = %s", (doc_id,))
-    conn.commit()
-    print(f"📢 Notificar a usuario {user_id} que su archivo es inválido.")
 
-def process_pending_documents(bot_id: int):
-    conn = get_connection()
-    cursor = conn.cursor(dictionary=True)
+# ============================================
+# TENANCY
+# ============================================
+#
+# Cada bot es un tenant. Modos (QDRANT_TENANCY):
+# - filter: colección compartida, filtro por bot_id (índice integer)
+# - tenant: colección compartida, filtro por tenant_id con índice is_tenant:
+#   Qdrant agrupa en disco los puntos de cada tenant
+# - shard: colección con sharding custom; cada bot va a la shard key de su
+#   grupo (bot_id % QDRANT_TENANT_SHARD_GROUPS) y la búsqueda solo toca ese shard
+# - collection: los bots de QDRANT_DEDICATED_BOTS tienen colección propia;
+#   el resto queda en la compartida con filtro por bot_id
+#
+# El cambio de modo requiere migrar los puntos (tenancy_migration).
 
-    try:
-        cursor.execute("""
-            SELECT id, file_path, bot_id, bot_template_id, user_id, file_name 
-            FROM uploaded_documents 
-            WHERE indexed = 0 AND bot_id = %s
-        """, (bot_id,))
-        documents = cursor.fetchall()
-
-        if not documents:
-            print(f"✅ No hay documentos pendientes para el bot {bot_id}.")
-            return
+class TenantRoute(NamedTuple):
+    """Dónde viven los puntos de un bot y cómo filtrarlos."""
 
-        for doc in documents:
-            # Corregir escape en rutas
-            # Usar la ruta base configurada o inferirla
-            net_root = os.getenv('DOTNET_ROOT_PATH', 'C:/Users/Ivan Herrera/Documents/VIA/Api')
-            relative_path = doc['file_path'].replace('\\', '/')
-            abs_path = os.path.normpath(os.path.join(net_root, relative_path))
+    bot_id: int
+    mode: str
+    collection_name: str
+    shard_key: Optional[str] = None
+
+    @property
+    def kwargs(self) -> Dict:
+        """collection_name (y shard_key_selector) para las llamadas del cliente."""
+        kwargs = {"collection_name": self.collection_name}
+        if self.shard_key is not None:
+            kwargs["shard_key_selector"] = self.shard_key
+        return kwargs
+
+    @property
+    def payload(self) -> Dict:
+        """Campos de tenant que lleva cada punto nuevo."""
+        return {TENANT_FIELD: str(self.bot_id)}
+
+    def condition(self) -> FieldCondition:
+        if self.mode == "tenant":
+            return FieldCondition(key=TENANT_FIELD, match=MatchValue(value=str(self.bot_id)))
+        return FieldCondition(key="bot_id", match=MatchValue(value=self.bot_id))
+
+    def filter(self, *conditions) -> Filter:
+        """Filtro del bot (siempre presente, también en colecciones dedicadas)."""
+        return Filter(must=[self.condition(), *conditions])
+
+
+def tenant_route(bot_id: int, mode: Optional[str] = None) -> TenantRoute:
+    """Ruta de un bot en el modo dado (default: QDRANT_TENANCY)."""
+    mode = mode or QDRANT_TENANCY
+    if mode not in TENANCY_MODES:
+        raise ValueError(f"QDRANT_TENANCY inválido: {mode} (opciones: {', '.join(TENANCY_MODES)})")
+
+    if mode == "shard":
+        return TenantRoute(
+            bot_id, mode, SHARDED_COLLECTION_NAME,
+            shard_key=f"group_{bot_id % max(1, QDRANT_TENANT_SHARD_GROUPS)}"
+        )
+    if mode == "collection" and bot_id in QDRANT_DEDICATED_BOTS:
+        return TenantRoute(bot_id, mode, f"{COLLECTION_NAME}_bot_{bot_id}")
+    return TenantRoute(bot_id, mode, COLLECTION_NAME)
 
-            print(f"📄 Procesando: {abs_path} para el bot {bot_id}")
-            print(f"🔍 Detalles de la ruta:")
-            print(f"  - NET_ROOT: {net_root}")
-            print(f"  - Ruta relativa: {relative_path}")
-            print(f"  - Ruta absoluta: {abs_path}")
-            print(f"  - ¿Archivo existe?: {os.path.exists(abs_path)}")
 
-            try:
-                content = extract_text_from_pdf(abs_path)
-
-                if not content.strip():
-                    print("⚠️ Texto vacío, intentando OCR...")
-                    content = extract_text_from_pdf_with_ocr(abs_path)
-
-                if content.strip():
-                    print(f"✅ Texto extraído: {content[:300]} ...")
-                    content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
-
-                    cursor.execute("""
-                        SELECT COUNT(*) as count FROM uploaded_documents
-                        WHERE content_hash = %s AND indexed = 1 AND bot_id = %s
-                    """, (content_hash, bot_id))
-                    if cursor.fetchone()['count'] > 0:
-                        print("⏩ Documento con contenido idéntico ya fue indexado para este bot. Se omite.")
-                        cursor.execute("UPDATE uploaded_documents SET indexed = 2 WHERE id = %s", (doc['id'],))
-                        conn.commit()
-                        continue
-
-                    qdrant_id = str(uuid.uuid4())
-
-                    payload = {
-                        "file_name": doc['file_name'],
-                        "user_id": doc['user_id'],
-                        "bot_id": doc['bot_id'],
-                        "bot_template_id": doc['bot_template_id'],
-                    }
-
-                    tags = infer_tags_from_payload(payload, content)
-                    payload.update(tags)
-
-                    index_document(qdrant_id, content, payload)
-
-                    cursor.execute("""
-                        UPDATE uploaded_documents 
-                        SET indexed = 1, qdrant_id = %s, content_hash = %s, extracted_text = %s
-                        WHERE id = %s
-                    """, (qdrant_id, content_hash, content[:10000], doc['id']))
-
-                    conn.commit()
-                else:
-                    print("❌ No se pudo extraer texto del archivo (vacío o ilegible).")
-                    handle_invalid_pdf(abs_path, doc['id'], doc['user_id'], cursor, conn)
-
-            except Exception as e:
-                print(f"❌ Error al procesar el archivo: {e}")
-                handle_invalid_pdf(abs_path, doc['id'], doc['user_id'], cursor, conn)
-                raise Exception(f"Fallo al procesar el documento {doc['file_name']} (ID: {doc['id']}): {e}")
-
-    finally:
-        cursor.close()
-        conn.close()
-import uuid
-import hashlib
-# from db import get_connection  # Deshabilitado: rompe el flujo por ciclos/imports
-# from vector_store import get_or_create_vector_store
-# from embedder import get_embedding
-# from services.document_processor import process_url
-# from tag_utils import infer_tags_from_payload
+def tenant_collections(mode: Optional[str] = None) -> List[str]:
+    """Colecciones que contienen puntos en el modo dado."""
+    mode = mode or QDRANT_TENANCY
+    if mode == "shard":
+        return [SHARDED_COLLECTION_NAME]
+    if mode == "collection":
+        return [COLLECTION_NAME, *(f"{COLLECTION_NAME}_bot_{b}" for b in sorted(QDRANT_DEDICATED_BOTS))]
+    return [COLLECTION_NAME]
 
-def process_pending_urls(bot_id: int):
-    print(f"🚀 Iniciando procesamiento de URLs pendientes para el bot {bot_id}...")
 
-    conn = get_connection()
-    cursor = conn.cursor(dictionary=True)
+def ensure_tenant_route(client, route: TenantRoute) -> None:
+    """Garantiza la colección (y la shard key) de la ruta."""
+    ensure_collection(client, route.collection_name, sharded=route.shard_key is not None)
+    if route.shard_key is None:
+        return
 
-    try:
-        cursor.execute("""
-            SELECT id, url, bot_id, bot_template_id, user_id 
-            FROM training_urls 
-            WHERE indexed = 0 AND status = 'pending' AND bot_id = %s
-        """, (bot_id,))
-        urls = cursor.fetchall()
-
-        if not urls:
-            print(f"ℹ️ No hay URLs pendientes por procesar para el bot {bot_id}.")
+    key = (route.collection_name, route.shard_key)
+    if key in _ready_shard_keys:
+        return
+    with _collection_lock:
+        if key in _ready_shard_keys:
             return
+        try:
+            client.create_shard_key(collection_name=route.collection_name, shard_key=route.shard_key)
+            print(f"🆕 Shard key '{route.shard_key}' creada en '{route.collection_name}'.")
+        except Exception as e:
+            if "already exists" not in str(e).lower():
+                raise
+        _ready_shard_keys.add(key)
+
+
+def tenant_route_ready(route: TenantRoute) -> bool:
+    """True si la colección (y la shard key) de la ruta ya se verificaron."""
+    if route.collection_name not in _ready_collections:
+        return False
+    return route.shard_key is None or (route.collection_name, route.shard_key) in _ready_shard_keys
 
-        client = get_or_create_vector_store()
-
-        for url_item in urls:
-            url_id = url_item['id']
-            url = url_item.get('url', '').strip()
-
-            print(f"\n🌐 Procesando URL ID {url_id}: {url} para el bot {bot_id}")
 
-            if not url:
-                print("⚠️ URL vacía o nula. Marcando como fallido.")
-                cursor.execute("UPDATE training_urls SET indexed = -1, status = 'failed' WHERE id = %s", (url_id,))
-                conn.commit()
-                continue
+def get_tenant_store(bot_id: int) -> Tuple[object, TenantRoute]:
+    """Cliente Qdrant y ruta del bot, con su colección garantizada."""
+    client = get_qdrant_client()
+    route = tenant_route(bot_id)
+    ensure_tenant_route(client, route)
+    return client, route
 
-            try:
-                result = process_url(url)
-                content = result.get("content", "").strip()
-
-                if not content:
-                    print("⚠️ No se extrajo contenido de la URL.")
-                    cursor.execute("UPDATE training_urls SET indexed = -1, status = 'failed' WHERE id = %s", (url_id,))
-                    conn.commit()
-                    continue
-
-                print(f"✅ Contenido extraído ({result['type']}): {content[:300]} ...")
-
-                content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
-
-                cursor.execute("""
-                    SELECT COUNT(*) as count FROM training_urls
-                    WHERE content_hash = %s AND indexed = 1 AND bot_id = %s
-                """, (content_hash, bot_id))
-                if cursor.fetchone()['count'] > 0:
-                    print("⏩ URL con contenido idéntico ya fue indexada para este bot. Se omite.")
-                cursor.execute("UPDATE training_urls SET indexed = 2, status = 'processed' WHERE id = %s", (url_id,))
-                conn.commit()
-                continue
-
-                qdrant_id = str(uuid.uuid4())
-
-                payload = {
-                    "url": url,
-                    "type": result["type"],
-                    "user_id": url_item.get('user_id'),
-                    "bot_id": url_item.get('bot_id'),
-                    "bot_template_id": url_item.get('bot_template_id'),
-                }
-
-                tags = infer_tags_from_payload(payload, content)
-                payload.update(tags)
-
-                print(f"🏷️ Etiquetas inferidas: {tags}")
-
-                client.upsert(
-                    collection_name="voia_vectors",
-                    points=[{
-                        "id": qdrant_id,
-                        "vector": get_embedding(content),
-                        "payload": payload
-                    }]
-                )
 
-                cursor.execute("""
-                    UPDATE training_urls 
-                    SET indexed = 1, status = 'processed', qdrant_id = %s, content_hash = %s, extracted_text = %s 
-                    WHERE id = %s
-                """, (qdrant_id, content_hash, content[:10000], url_id))
-
-                conn.commit()
-                print("✅ URL procesada y almacenada en Qdrant.")
-
-            except Exception as e:
-                print(f"❌ Error procesando la URL {url}: {e}")
-                
-                # Determinar si es un error HTTP 404
-                error_msg = str(e)
-                if "404" in error_msg:
-                    print(f"⚠️ La URL no existe o no es accesible: {url}")
-                    cursor.execute("""
-                        UPDATE training_urls 
-                        SET indexed = -1, 
-                            status = 'failed',
-                            extracted_text = 'URL no encontrada o no accesible (404)'
-                        WHERE id = %s
-                    """, (url_id,))
-                    conn.commit()
-                    # Para errores 404, no propagamos la excepción
-                    continue
-                
-                # Para otros errores, marcamos como fallido y propagamos la excepción
-                cursor.execute("UPDATE training_urls SET indexed = -1, status = 'failed' WHERE id = %s", (url_id,))
-                conn.commit()
-                raise Exception(f"Fallo al procesar la URL {url} (ID: {url_id}): {e}")
-
-    finally:
-        if 'conn' in locals() and conn.is_connected():
-            cursor.close()
-            conn.close()
-        print(f"\n🔚 Procesamiento de URLs para el bot {bot_id} finalizado.")
-# voia_vector_services/search_vectors.py
-from .embedder import get_embedding
-# from .vector_store import get_or_create_vector_store  # Deshabilitado: rompe el flujo por ciclos/imports
-
-def search_vectors(bot_id: int, query: str = "", limit: int = 5):
-    """
-    Busca los vectores más relevantes para un bot dado y un query opcional.
-    Si query está vacío, trae los top documentos del bot.
+def point_id(bot_id: int, source: str, doc_id: int, chunk_hash: str, occurrence: int = 0) -> str:
     """
-    client = get_or_create_vector_store()
-    vector = get_embedding(query) if query else None
-
-    if vector:
-        results = client.search(
-            collection_name="voia_vectors",
-            query_vector=vector,
-            limit=limit,
-            query_filter={
-                "must": [{"key": "bot_id", "match": {"value": bot_id}}]
-            }
-        )
-        return [r.payload for r in results]
-    else:
-        points, _ = client.scroll(collection_name="voia_vectors", limit=limit)
-        return [p.payload for p in points if p.payload.get("bot_id") == bot_id]
-import re
-from typing import Dict, List
-
-def infer_tags_from_payload(payload: Dict, extracted_text: str = "") -> Dict:
-    tags = {}
-
-    file_name = payload.get("file_name", "").lower()
-    text = extracted_text.lower()
-
-    def match_keywords(text: str, keywords: List[str]) -> bool:
-        return any(re.search(rf"\b{re.escape(kw)}\b", text) for kw in keywords)
-
-    # -----------------------------
-    # Tipos de documento
-    # -----------------------------
-    tipos_documento = {
-        "autorización": ["autorizacion", "autorización", "autorisacion", "autorizacón", "autorizaciòn"],
-        "contrato": ["contrato", "contarto", "contratp", "contratto"],
-        "certificado": ["certificado", "certificdo", "cert", "constancia"],
-        "factura": ["factura", "recibo", "cuenta de cobro"],
-        "información empresarial": ["informacion", "quienes somos", "perfil empresarial", "presentación", "empresa"]
-    }
-
-    for tipo, keywords in tipos_documento.items():
-        if match_keywords(file_name, keywords) or match_keywords(text, keywords):
-            tags["tipo"] = tipo
-            break
-
-    # -----------------------------
-    # Temas
-    # -----------------------------
-    temas = {
-        "nómina": ["nómina", "nomina", "descuento por nómina", "liquidación de nómina"],
-        "salud": ["salud", "eps", "historia clínica", "centro médico", "procedimiento médico"],
-        "financiero": ["préstamo", "cuota", "descuento", "interés", "deuda", "pago", "cartera"],
-        "legal": ["demandas", "proceso judicial", "abogado", "juez", "código penal", "sentencia"],
-        "educación": ["colegio", "universidad", "certificado de estudio", "boletín", "notas"],
-        "laboral": ["trabajo", "empleo", "contratación", "vacaciones", "licencia"],
-        "inmobiliario": ["arriendo", "inmueble", "propiedad", "contrato de arrendamiento"],
-        "tecnología": ["software", "sistema", "plataforma", "aplicación", "soporte técnico"],
-        "vehículos": ["vehículo", "soat", "licencia de conducción", "revisión técnico-mecánica", "matrícula vehicular"],
-        "tributario": ["renta", "DIAN", "impuesto", "retención", "declaración"],
-    }
-
-    for tema, palabras in temas.items():
-        if match_keywords(text, palabras):
-            tags["tema"] = tema
-            break
-
-    # -----------------------------
-    # Sectores económicos
-    # -----------------------------
-    sectores = {
-        "tasación": ["tasación", "avaluo", "avalúo", "valor comercial", "peritaje", "inspección vehicular"],
-        "automotriz": ["vehículos", "taller", "automotor", "siniestro", "accidente de tránsito"],
-        "salud": ["eps", "clínica", "médico", "psicología", "odontología"],
-        "educativo": ["universidad", "colegio", "institución educativa", "certificado académico"],
-        "financiero": ["entidad financiera", "banco", "pago", "deuda", "cuenta"],
-        "legal": ["tribunal", "juez", "proceso", "firma de abogados", "sentencia"],
-        "tecnología": ["startup", "aplicación", "plataforma digital", "software"],
-        "logística": ["transporte", "entrega", "mensajería", "camión"],
-    }
-
-    for sector, keywords in sectores.items():
-        if match_keywords(text, keywords):
-            if "sectores" not in tags:
-                tags["sectores"] = []
-            tags["sectores"].append(sector)
-
-    # -----------------------------
-    # Firma electrónica o física
-    # -----------------------------
-    firma_keywords = [
-        "firma", "firmado", "firma electrónica", "firmado electrónicamente", "firma digital"
-    ]
-    if match_keywords(text, firma_keywords):
-        tags["requiere_firma"] = True
-
-    # -----------------------------
-    # Especialidades médicas (si aplica)
-    # -----------------------------
-    especialidades = {
-        "psicología": ["psicología", "psicoterapia", "consulta psicológica"],
-        "odontología": ["odontología", "dentista", "odontograma"],
-        "medicina general": ["consulta médica", "médico general", "valoración médica"],
-        "oftalmología": ["oftalmología", "visión", "examen visual", "optometría"],
-    }
-
-    for esp, keywords in especialidades.items():
-        if match_keywords(text, keywords):
-            tags["especialidad"] = esp
-            break
-
-    return tags
-from qdrant_client import QdrantClient
-from qdrant_client.models import VectorParams, Distance, PointStruct, PointIdsList
-# from tag_utils import infer_tags_from_payload  # Deshabilitado: rompe el flujo por ciclos/imports
-
-COLLECTION_NAME = "voia_vectors"
-
-client = QdrantClient(host="localhost", port=6333)
-
+    ID determinista (UUIDv5) de un chunk: el mismo chunk del mismo documento
+    siempre cae en el mismo punto, así que reintentar un upsert no duplica.
 
-def get_or_create_vector_store():
-    if not client.collection_exists(COLLECTION_NAME):
-        client.create_collection(
-            collection_name=COLLECTION_NAME,
-            vectors_config=VectorParams(size=384, distance=Distance.COSINE)
-        )
-        print(f"🆕 Colección '{COLLECTION_NAME}' creada.")
-    else:
-        print(f"✅ Colección '{COLLECTION_NAME}' ya existe.")
-
-    return client
+    occurrence distingue chunks idénticos dentro del documento (0 para el
+    primero). No depende de la posición: insertar un chunk no cambia los IDs
+    de los siguientes.
+    """
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, f"{bot_id}:{source}:{doc_id}:{chunk_hash}:{occurrence}"))
 
 
 def is_in_qdrant(qdrant_id: str) -> bool:
     try:
-        points = client.retrieve(
+        points = get_qdrant_client().retrieve(
             collection_name=COLLECTION_NAME,
             ids=[qdrant_id]
         )
@@ -726,15 +240,12 @@ def is_in_qdrant(qdrant_id: str) -> bool:
 
 
 def add_point_to_qdrant(qdrant_id: str, vector: list, payload: dict = {}, extracted_text: str = ""):
-    if is_in_qdrant(qdrant_id):
-        print(f"⏭️ Punto con ID {qdrant_id} ya existe en Qdrant. No se insertará de nuevo.")
-        return
-
+    """Upsert idempotente: con IDs deterministas (point_id) no hace falta verificar si existe."""
     # 🏷️ Agregar etiquetas inferidas al payload
     tags = infer_tags_from_payload(payload, extracted_text)
     payload.update(tags)
 
-    client.upsert(
+    get_qdrant_client().upsert(
         collection_name=COLLECTION_NAME,
         points=[
             PointStruct(
@@ -749,7 +260,7 @@ def add_point_to_qdrant(qdrant_id: str, vector: list, payload: dict = {}, extrac
 
 def delete_point_from_qdrant(qdrant_id: str):
     try:
-        client.delete(
+        get_qdrant_client().delete(
             collection_name=COLLECTION_NAME,
             points_selector=PointIdsList([qdrant_id])
         )
@@ -758,9 +269,167 @@ def delete_point_from_qdrant(qdrant_id: str):
         print(f"❌ Error al eliminar punto {qdrant_id}: {e}")
 
 
+def delete_points_from_qdrant(qdrant_ids: list, route: Optional[TenantRoute] = None):
+    """Elimina varios puntos en una sola llamada (p.ej. indexación abortada)."""
+    if not qdrant_ids:
+        return
+    try:
+        get_qdrant_client().delete(
+            **(route.kwargs if route is not None else {"collection_name": COLLECTION_NAME}),
+            points_selector=PointIdsList(points=list(qdrant_ids))
+        )
+        print(f"🗑️ {len(qdrant_ids)} puntos eliminados de Qdrant.")
+    except Exception as e:
+        print(f"❌ Error al eliminar {len(qdrant_ids)} puntos: {e}")
+
+
 def list_all_points(limit=10):
-    points, next_page = client.scroll(
+    points, next_page = get_qdrant_client().scroll(
         collection_name=COLLECTION_NAME,
         limit=limit
     )
     return points
+
+
+# ============================================
+# ESCRITURA EN LOTES
+# ============================================
+
+_write_executor: Optional[ThreadPoolExecutor] = None
+_write_executor_lock = threading.Lock()
+
+
+def _get_write_executor() -> ThreadPoolExecutor:
+    global _write_executor
+
+    if _write_executor is None:
+        with _write_executor_lock:
+            if _write_executor is None:
+                _write_executor = ThreadPoolExecutor(
+                    max_workers=max(1, QDRANT_MAX_IN_FLIGHT),
+                    thread_name_prefix="qdrant-writer"
+                )
+    return _write_executor
+
+
+class PointWriter:
+    """
+    Escritor de puntos con buffer: acumula PointStructs y los envía en lotes
+    desde un pool de hilos, con un máximo de requests en vuelo.
+
+    Cada lote se envía con wait=True: su request solo responde cuando Qdrant
+    aplicó el lote en todos los shards que toca (con shard keys o en un
+    cluster distribuido no hay orden entre shards, así que un solo request
+    final con wait=True no confirma los demás). La latencia de cada request
+    queda cubierta por los que están en vuelo, y flush() solo espera a que
+    terminen. Debe llamarse antes de marcar el documento como indexado en MySQL.
+
+    Uso:
+        writer = PointWriter(client)
+        for point in points:
+            writer.add(point)
+        writer.flush()
+    """
+
+    def __init__(
+        self,
+        client=None,
+        collection_name: str = COLLECTION_NAME,
+        batch_size: int = QDRANT_UPSERT_BATCH_SIZE,
+        max_in_flight: int = QDRANT_MAX_IN_FLIGHT,
+        shard_key: Optional[str] = None
+    ):
+        """
+        Args:
+            client: Cliente Qdrant (default: el del proceso)
+            collection_name: Colección destino
+            batch_size: Puntos por request
+            max_in_flight: Requests sin confirmar de este escritor
+            shard_key: Shard key destino (modo shard)
+        """
+        self.client = client or get_qdrant_client()
+        self.collection_name = collection_name
+        self.shard_key = shard_key
+        self.batch_size = max(1, batch_size)
+        self.max_in_flight = max(1, max_in_flight)
+
+        self._buffer: List[PointStruct] = []
+        self._pending: List[Future] = []
+        self._slots = threading.BoundedSemaphore(self.max_in_flight)
+        self.stats = {
+            "points": 0,
+            "requests": 0,
+            "confirmed_flushes": 0,
+        }
+
+    def add(self, point) -> None:
+        """Agrega un punto (PointStruct o dict con id, vector y payload)."""
+        if isinstance(point, dict):
+            point = PointStruct(**point)
+        self._buffer.append(point)
+        self.stats["points"] += 1
+        if len(self._buffer) >= self.batch_size:
+            self._send_async()
+
+    def _send_async(self) -> None:
+        batch, self._buffer = self._buffer, []
+        self._raise_failed()
+
+        # Bloquea mientras haya max_in_flight requests sin responder
+        self._slots.acquire()
+        try:
+            future = _get_write_executor().submit(self._upsert, batch)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        self._pending.append(future)
+
+    def _upsert(self, batch: List[PointStruct]) -> None:
+        self.client.upsert(
+            collection_name=self.collection_name,
+            points=batch,
+            wait=True,
+            shard_key_selector=self.shard_key
+        )
+        self.stats["requests"] += 1
+
+    def _raise_failed(self) -> None:
+        """Propaga el error del primer request fallido y descarta los terminados."""
+        still_pending = []
+        for future in self._pending:
+            if not future.done():
+                still_pending.append(future)
+            elif future.exception() is not None:
+                raise future.exception()
+        self._pending = still_pending
+
+    def flush(self) -> None:
+        """Envía lo acumulado y espera la confirmación de todas las escrituras."""
+        batch, self._buffer = self._buffer, []
+        if batch:
+            self._upsert(batch)
+        for future in self._pending:
+            future.result()
+        self._pending = []
+        self.stats["confirmed_flushes"] += 1
+
+    def discard(self) -> None:
+        """Descarta lo acumulado y espera los requests en vuelo (sin propagar errores)."""
+        self._buffer = []
+        for future in self._pending:
+            try:
+                future.result()
+            except Exception:
+                pass
+        self._pending = []
+
+    def get_stats(self) -> Dict:
+        """Retorna estadísticas del escritor."""
+        return {
+            "batch_size": self.batch_size,
+            "max_in_flight": self.max_in_flight,
+            "buffered": len(self._buffer),
+            "in_flight": sum(1 for f in self._pending if not f.done()),
+            **self.stats,
+        }